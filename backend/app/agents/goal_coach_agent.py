@@ -37,7 +37,7 @@ def _fallback_plan(goal: str, horizon_days: int) -> CoachPlanResult:
     )
 
 
-def create_goal_plan(
+async def create_goal_plan(
     *,
     goal: str,
     horizon_days: int = 7,
@@ -67,7 +67,7 @@ def create_goal_plan(
     )
 
     try:
-        raw = llm.complete(prompt)
+        raw = await llm.complete(prompt)
         # LLMClient returns text; keep this robust and fallback if parsing fails.
         import json
 
@@ -90,19 +90,47 @@ def create_goal_plan(
         return _fallback_plan(goal, horizon_days)
 
 
-def adapt_plan_from_checkin(
+def _effective_adherence(checkin: Dict[str, Any], insights: Optional[Dict[str, Any]]) -> float:
+    """Latest adherence, smoothed with the plan's short rolling mean when there is history.
+
+    One bad (or great) day shouldn't flip the plan on its own.
+    """
+    adherence = float(checkin.get("adherence", 0.0) or 0.0)
+    if not insights or int(insights.get("checkins") or 0) < 3:
+        return adherence
+    rolling = (insights.get("adherence") or {}).get("mean_7")
+    if rolling is None:
+        return adherence
+    return 0.5 * adherence + 0.5 * float(rolling)
+
+
+def _insights_brief(insights: Dict[str, Any]) -> Dict[str, Any]:
+    adherence = insights.get("adherence") or {}
+    return {
+        "checkins": insights.get("checkins"),
+        "adherence_mean_7": adherence.get("mean_7"),
+        "adherence_mean_30": adherence.get("mean_30"),
+        "streaks": insights.get("streaks"),
+        "metric_slopes": {k: v.get("slope") for k, v in (insights.get("metric_trends") or {}).items()},
+    }
+
+
+async def adapt_plan_from_checkin(
     *,
     goal: str,
     prior_plan_steps: List[str],
     prior_next_actions: List[str],
     checkin: Dict[str, Any],
     llm: Optional[LLMClient] = None,
+    insights: Optional[Dict[str, Any]] = None,
 ) -> CoachPlanResult:
     """Simple adaptation loop: adjust based on adherence + notes.
 
     If user missed tasks, we shrink and simplify. If they succeeded, we gently progress.
+    `insights` is the plan's materialized analytics summary (rolling adherence,
+    streaks, metric trends); when given, decisions use the smoothed adherence.
     """
-    adherence = float(checkin.get("adherence", 0.0) or 0.0)
+    adherence = _effective_adherence(checkin, insights)
     notes = str(checkin.get("notes") or "").strip()
 
     if llm is None:
@@ -148,12 +176,13 @@ def adapt_plan_from_checkin(
         f"Prior plan steps: {prior_plan_steps}\n"
         f"Prior next actions: {prior_next_actions}\n"
         f"Check-in: {checkin}\n"
+        f"Recent trends: {_insights_brief(insights) if insights else 'none yet'}\n"
         f"Notes: {notes}\n"
         "Rules: if adherence is low, shrink tasks; if high, progress slightly; keep it simple and actionable."
     )
 
     try:
-        raw = llm.complete(prompt)
+        raw = await llm.complete(prompt)
         import json
 
         data = json.loads(raw)
@@ -163,12 +192,13 @@ def adapt_plan_from_checkin(
         reasoning_summary = str(data.get("reasoning_summary") or "LLM-assisted adaptation")
 
         if not plan_steps or not next_actions:
-            return adapt_plan_from_checkin(
+            return await adapt_plan_from_checkin(
                 goal=goal,
                 prior_plan_steps=prior_plan_steps,
                 prior_next_actions=prior_next_actions,
                 checkin=checkin,
                 llm=None,
+                insights=insights,
             )
 
         return CoachPlanResult(
@@ -178,10 +208,11 @@ def adapt_plan_from_checkin(
             reasoning_summary=reasoning_summary,
         )
     except Exception:
-        return adapt_plan_from_checkin(
+        return await adapt_plan_from_checkin(
             goal=goal,
             prior_plan_steps=prior_plan_steps,
             prior_next_actions=prior_next_actions,
             checkin=checkin,
             llm=None,
+            insights=insights,
         )
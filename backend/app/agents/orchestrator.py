@@ -1,25 +1,105 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import json
-from dataclasses import dataclass
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Any, Literal
 
-from app.agents.fitness_agent import build_fitness_plan
-from app.agents.nutrition_agent import build_meal_plan
-from app.agents.mental_agent import breathing_exercise, journal_prompt
-from app.agents.chronic_agent import chronic_lifestyle_support
+from app.agents.reply_templates import (
+    GENERAL_REPLY,
+    JOURNAL_KEY,
+    OFFLINE_GENERAL_REPLY,
+    breathing_key,
+    chronic_key,
+    fitness_key,
+    meal_key,
+    rendered_reply,
+)
 from app.llm.llm_client import LLMClient
+from app.llm.tokens import estimate_tokens
+from app.observability.metrics import RETRIEVAL_OUTCOMES, observe_stage_timings
+from app.observability.tracing import note
 from app.rules.safety_guardrails import enforce_guardrails, DISCLAIMER
+from app.vector.store import DocChunk, get_vector_store
 
 
 Domain = Literal["fitness", "nutrition", "mental", "chronic", "general"]
 
+log = logging.getLogger("healthyfy")
+
+# Retrieval is a best-effort enrichment: it must never make chat slower than
+# RAG_TIMEOUT_MS, so it runs on its own small pool and is abandoned on timeout.
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+RAG_TOKEN_BUDGET = int(os.getenv("RAG_TOKEN_BUDGET", "256"))
+RAG_TIMEOUT_MS = float(os.getenv("RAG_TIMEOUT_MS", "150"))
+
+_retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag")
+# An abandoned search keeps its pool slot until it finishes, so under a slow
+# index the pool queue would grow without bound. Cap searches running or
+# queued; past the cap a request skips retrieval (counted as a timeout).
+RAG_MAX_INFLIGHT = int(os.getenv("RAG_MAX_INFLIGHT", "8"))
+_retrieval_slots = threading.BoundedSemaphore(max(1, RAG_MAX_INFLIGHT))
+
+# Domain -> seed corpus topics used as a metadata filter. "general" searches everything.
+DOMAIN_TOPICS: dict[str, tuple[str, ...]] = {
+    "fitness": ("habits", "fitness"),
+    "nutrition": ("nutrition",),
+    "mental": ("stress", "sleep", "mental"),
+    "chronic": ("habits", "sleep", "nutrition", "stress", "chronic"),
+}
+
 
 @dataclass
 class OrchestratorResponse:
     domain: Domain
     reply: str
     tool_payload: dict[str, Any] | None = None
+    sources: list[str] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)
+    tokens: dict[str, int] = field(default_factory=dict)
+
+
+def _ms_since(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000.0, 3)
+
+
+def _retrieve_sync(user_text: str, domain: Domain) -> list[DocChunk]:
+    topics = DOMAIN_TOPICS.get(domain)
+    store = get_vector_store()
+    return store.search(user_text, k=RAG_TOP_K, where={"topic": topics} if topics else None)
+
+
+def _submit_retrieval(user_text: str, domain: Domain) -> asyncio.Future | None:
+    """Start a search on the retrieval pool, or None if RAG_MAX_INFLIGHT are already pending."""
+    if not _retrieval_slots.acquire(blocking=False):
+        return None
+    try:
+        fut = _retrieval_pool.submit(contextvars.copy_context().run, _retrieve_sync, user_text, domain)
+    except BaseException:
+        _retrieval_slots.release()
+        raise
+    # Released when the search finishes, fails or is cancelled before it starts.
+    fut.add_done_callback(lambda _: _retrieval_slots.release())
+    return asyncio.wrap_future(fut)
+
+
+def pack_chunks(chunks: list[DocChunk], token_budget: int = RAG_TOKEN_BUDGET) -> list[DocChunk]:
+    """Greedily keep chunks in rank order while they fit the token budget."""
+    packed: list[DocChunk] = []
+    used = 0
+    for c in chunks:
+        cost = estimate_tokens(c.text)
+        if used + cost > token_budget:
+            continue
+        packed.append(c)
+        used += cost
+    return packed
 
 
 def _detect_domain_rule_based(text: str) -> Domain:
@@ -39,72 +119,151 @@ class AgentOrchestrator:
     def __init__(self):
         self.llm = LLMClient()
 
-    async def handle(self, user_text: str, user_context: dict[str, Any] | None = None) -> OrchestratorResponse:
+    async def _await_retrieval(
+        self, fut: asyncio.Future | None, started: float, timings: dict[str, float]
+    ) -> list[DocChunk]:
+        remaining = RAG_TIMEOUT_MS / 1000.0 - (time.perf_counter() - started)
+        try:
+            if fut is None:
+                log.info("%d retrievals already in flight; continuing without context", RAG_MAX_INFLIGHT)
+                RETRIEVAL_OUTCOMES.inc(("timeout",))
+                chunks = []
+            else:
+                chunks = await asyncio.wait_for(fut, timeout=max(0.0, remaining))
+                RETRIEVAL_OUTCOMES.inc(("ok",))
+        except asyncio.TimeoutError:
+            log.info("Retrieval exceeded %.0fms budget; continuing without context", RAG_TIMEOUT_MS)
+            RETRIEVAL_OUTCOMES.inc(("timeout",))
+            chunks = []
+        except Exception as exc:
+            log.warning("Retrieval failed; continuing without context: %s", exc)
+            RETRIEVAL_OUTCOMES.inc(("error",))
+            chunks = []
+        packed = pack_chunks(chunks)
+        note("retrieved_chunks", {"fetched": len(chunks), "packed": len(packed)})
+        timings["retrieval_ms"] = _ms_since(started)
+        return packed
+
+    async def handle(
+        self,
+        user_text: str,
+        user_context: dict[str, Any] | None = None,
+        history: dict[str, Any] | None = None,
+    ) -> OrchestratorResponse:
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+
+        # Routing is a cheap keyword scan; it runs first because its domain is
+        # the retrieval filter. The search is then submitted to the pool right
+        # away so it overlaps with guardrails on the event loop.
+        t = time.perf_counter()
+        domain = _detect_domain_rule_based(user_text)
+        timings["routing_ms"] = _ms_since(t)
+
+        retrieval_started = time.perf_counter()
+        retrieval = _submit_retrieval(user_text, domain)
+
+        t = time.perf_counter()
         guard = enforce_guardrails(user_text)
+        timings["guardrails_ms"] = _ms_since(t)
         if not guard.allowed:
-            return OrchestratorResponse(domain="general", reply=guard.safe_response or DISCLAIMER)
+            if retrieval is not None:
+                retrieval.cancel()
+            timings["total_ms"] = _ms_since(started)
+            observe_stage_timings("orchestrator", timings)
+            return OrchestratorResponse(domain="general", reply=guard.safe_response or DISCLAIMER, timings=timings)
 
-        domain = _detect_domain_rule_based(user_text)
+        chunks = await self._await_retrieval(retrieval, retrieval_started, timings)
+
+        resp = await self._respond(user_text, domain, user_context or {}, chunks, history, timings)
+        resp.sources = [c.id for c in chunks]
+        resp.timings = timings
+        timings["total_ms"] = _ms_since(started)
+        observe_stage_timings("orchestrator", timings)
+        note("domain", domain)
+        note("reply_chars", len(resp.reply))
+        return resp
+
+    async def _respond(
+        self,
+        user_text: str,
+        domain: Domain,
+        user_context: dict[str, Any],
+        chunks: list[DocChunk],
+        history: dict[str, Any] | None,
+        timings: dict[str, float],
+    ) -> OrchestratorResponse:
+        # Try LLM tool JSON if configured and the circuit is closed; otherwise
+        # (or if the call fails) use deterministic agent tools.
+        if self.llm.is_available():
+            context: dict[str, Any] = {"disclaimer": DISCLAIMER, "domain_hint": domain, "user_context": user_context}
+            if chunks:
+                context["retrieved"] = [{"id": c.id, "text": c.text} for c in chunks]
+            if history and (history.get("summary") or history.get("turns")):
+                context["history"] = {"summary": history.get("summary", ""), "turns": history.get("turns", [])}
+            t = time.perf_counter()
+            try:
+                llm_resp = await self.llm.chat(user_text, context=context)
+            except Exception as exc:
+                log.warning("LLM call failed; answering offline: %s", exc)
+                note("llm_fallback", type(exc).__name__)
+                llm_resp = None
+            timings["llm_ms"] = _ms_since(t)
+            if llm_resp is not None:
+                tokens = dict(llm_resp.prompt_tokens or {})
+                note("prompt_tokens", tokens)
+                if llm_resp.usage:
+                    tokens.update({f"usage_{k}": int(v) for k, v in llm_resp.usage.items() if isinstance(v, int)})
 
-        # Try LLM tool JSON if configured; otherwise use deterministic agent tools.
-        if self.llm.is_configured():
-            context = {"disclaimer": DISCLAIMER, "domain_hint": domain, "user_context": user_context or {}}
-            llm_resp = await self.llm.chat(user_text, context=context)
-
-            # If LLM returns JSON tool call, execute; else return as-is.
-            text = (llm_resp.text or "").strip()
-            if text.startswith("{") and text.endswith("}"):
-                try:
-                    payload = json.loads(text)
-                    tool = payload.get("tool")
-                    args = payload.get("args") or {}
-                    tool_result = self._execute_tool(tool, args)
-                    return OrchestratorResponse(domain=domain, reply=tool_result, tool_payload=payload)
-                except Exception:
-                    return OrchestratorResponse(domain=domain, reply=text)
-
-            return OrchestratorResponse(domain=domain, reply=text)
+                # If LLM returns JSON tool call, execute; else return as-is.
+                text = (llm_resp.text or "").strip()
+                if text.startswith("{") and text.endswith("}"):
+                    try:
+                        payload = json.loads(text)
+                        tool = payload.get("tool")
+                        args = payload.get("args") or {}
+                        t = time.perf_counter()
+                        tool_result = self._execute_tool(tool, args)
+                        timings["render_ms"] = _ms_since(t)
+                        return OrchestratorResponse(
+                            domain=domain, reply=tool_result, tool_payload=payload, tokens=tokens
+                        )
+                    except Exception:
+                        return OrchestratorResponse(domain=domain, reply=text, tokens=tokens)
+
+                return OrchestratorResponse(domain=domain, reply=text, tokens=tokens)
 
         # Offline mode: call deterministic domain tools.
-        return OrchestratorResponse(domain=domain, reply=self._offline_reply(domain, user_text, user_context or {}))
+        t = time.perf_counter()
+        reply = self._offline_reply(domain, user_text, user_context)
+        if chunks:
+            reply = "\n".join([reply, "", "From the Healthyfy library:", *[f"- {c.text}" for c in chunks]])
+        timings["render_ms"] = _ms_since(t)
+        return OrchestratorResponse(domain=domain, reply=reply)
 
     def _execute_tool(self, tool: str, args: dict[str, Any]) -> str:
         if tool == "fitness_plan":
-            res = build_fitness_plan(args.get("goal", "general fitness"), args.get("level", "beginner"))
-            return "\n".join([f"{DISCLAIMER}", "", res.title, *[f"- {x}" for x in res.plan], "", "YouTube:", *[f"- {u}" for u in res.youtube_links]])
+            return rendered_reply(fitness_key(args.get("goal", "general fitness"), args.get("level", "beginner")))
         if tool == "meal_plan":
-            res = build_meal_plan(args.get("preference", "balanced"), args.get("allergies", ""))
-            return "\n".join([f"{DISCLAIMER}", "", res.title, "Meal ideas:", *[f"- {m}" for m in res.meal_plan], "Tips:", *[f"- {t}" for t in res.tips]])
+            return rendered_reply(meal_key(args.get("preference", "balanced"), args.get("allergies", "")))
         if tool == "breathing":
-            res = breathing_exercise(args.get("minutes", 2))
-            return "\n".join([f"{DISCLAIMER}", "", res.title, *[f"- {a}" for a in res.actions]])
+            return rendered_reply(breathing_key(args.get("minutes", 2)))
         if tool == "journal_prompt":
-            res = journal_prompt()
-            return "\n".join([f"{DISCLAIMER}", "", res.title, *[f"- {a}" for a in res.actions]])
+            return rendered_reply(JOURNAL_KEY)
         if tool == "chronic_support":
-            res = chronic_lifestyle_support(args.get("condition", ""))
-            return "\n".join([f"{DISCLAIMER}", "", res.title, "Lifestyle tips:", *[f"- {t}" for t in res.lifestyle_tips], "Stories:", *[f"- {s}" for s in res.community_stories]])
-        return f"{DISCLAIMER}\n\nI can help with fitness, nutrition, stress, and habit building. What’s your goal?"
+            return rendered_reply(chronic_key(args.get("condition", "")))
+        return GENERAL_REPLY
 
     def _offline_reply(self, domain: Domain, user_text: str, user_context: dict[str, Any]) -> str:
         if domain == "fitness":
-            res = build_fitness_plan("general fitness", user_context.get("fitness_level", "beginner"))
-            return "\n".join([f"{DISCLAIMER}", "", res.title, *[f"- {x}" for x in res.plan], "", "YouTube:", *[f"- {u}" for u in res.youtube_links]])
+            return rendered_reply(fitness_key("general fitness", user_context.get("fitness_level", "beginner")))
         if domain == "nutrition":
-            res = build_meal_plan(user_context.get("diet_preference", "balanced"), user_context.get("allergies", ""))
-            return "\n".join([f"{DISCLAIMER}", "", res.title, "Meal ideas:", *[f"- {m}" for m in res.meal_plan], "Tips:", *[f"- {t}" for t in res.tips]])
+            return rendered_reply(meal_key(user_context.get("diet_preference", "balanced"), user_context.get("allergies", "")))
         if domain == "mental":
             if "journal" in (user_text or "").lower():
-                res = journal_prompt()
-            else:
-                res = breathing_exercise(2)
-            return "\n".join([f"{DISCLAIMER}", "", res.title, *[f"- {a}" for a in res.actions]])
+                return rendered_reply(JOURNAL_KEY)
+            return rendered_reply(breathing_key(2))
         if domain == "chronic":
-            res = chronic_lifestyle_support("")
-            return "\n".join([f"{DISCLAIMER}", "", res.title, "Lifestyle tips:", *[f"- {t}" for t in res.lifestyle_tips], "Stories:", *[f"- {s}" for s in res.community_stories]])
-
-        return (
-            f"{DISCLAIMER}\n\n"
-            "Tell me what you want to improve (energy, sleep, stress, fitness, nutrition), "
-            "and I’ll suggest one small next step you can do today."
-        )
+            return rendered_reply(chronic_key(""))
+
+        return OFFLINE_GENERAL_REPLY
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Hashable
+
+from app.agents.chronic_agent import ChronicSupportResult, chronic_lifestyle_support
+from app.agents.fitness_agent import FitnessResult, build_fitness_plan
+from app.agents.mental_agent import MentalResult, breathing_exercise, journal_prompt
+from app.agents.nutrition_agent import NutritionResult, build_meal_plan
+from app.observability.metrics import CACHE_REQUESTS, lru_cache_source
+from app.rules.safety_guardrails import DISCLAIMER
+
+
+# The domain agents are pure functions of a small input space. Rendered replies
+# for every finite argument combination are built once at import (i.e. worker
+# startup); free-text arguments (levels, allergies, conditions) fall back to a
+# bounded LRU so the chat path is a dictionary lookup in the common case.
+KNOWN_LEVELS = ("beginner", "intermediate", "advanced")
+KNOWN_PREFERENCES = ("balanced", "vegetarian", "vegan", "high-protein", "high protein", "low-carb")
+BREATHING_MINUTES = range(1, 11)
+
+FREE_TEXT_CACHE_SIZE = 1024
+
+_TABLE_HIT = ("reply_table", "hit")
+_TABLE_MISS = ("reply_table", "miss")
+
+GENERAL_REPLY = f"{DISCLAIMER}\n\nI can help with fitness, nutrition, stress, and habit building. What’s your goal?"
+OFFLINE_GENERAL_REPLY = (
+    f"{DISCLAIMER}\n\n"
+    "Tell me what you want to improve (energy, sleep, stress, fitness, nutrition), "
+    "and I’ll suggest one small next step you can do today."
+)
+
+
+def render_fitness(res: FitnessResult) -> str:
+    return "\n".join([DISCLAIMER, "", res.title, *[f"- {x}" for x in res.plan], "", "YouTube:", *[f"- {u}" for u in res.youtube_links]])
+
+
+def render_nutrition(res: NutritionResult) -> str:
+    return "\n".join([DISCLAIMER, "", res.title, "Meal ideas:", *[f"- {m}" for m in res.meal_plan], "Tips:", *[f"- {t}" for t in res.tips]])
+
+
+def render_mental(res: MentalResult) -> str:
+    return "\n".join([DISCLAIMER, "", res.title, *[f"- {a}" for a in res.actions]])
+
+
+def render_chronic(res: ChronicSupportResult) -> str:
+    return "\n".join([DISCLAIMER, "", res.title, "Lifestyle tips:", *[f"- {t}" for t in res.lifestyle_tips], "Stories:", *[f"- {s}" for s in res.community_stories]])
+
+
+# Key normalization mirrors the branching inside each agent, so two inputs that
+# produce the same reply share one cache entry.
+def fitness_key(goal: Any, level: Any) -> tuple[Hashable, ...]:
+    return ("fitness_plan", "strength" in (goal or "").lower(), (level or "beginner").lower())
+
+
+def meal_key(preference: Any, allergies: Any) -> tuple[Hashable, ...]:
+    return ("meal_plan", (preference or "balanced").lower(), (allergies or "").strip())
+
+
+def breathing_key(minutes: Any) -> tuple[Hashable, ...]:
+    return ("breathing", max(1, min(int(minutes or 2), 10)))
+
+
+def chronic_key(condition: Any) -> tuple[Hashable, ...]:
+    return ("chronic_support", (condition or "").strip())
+
+
+JOURNAL_KEY: tuple[Hashable, ...] = ("journal_prompt",)
+
+
+def _render(key: tuple[Hashable, ...]) -> str:
+    tool = key[0]
+    if tool == "fitness_plan":
+        return render_fitness(build_fitness_plan("strength" if key[1] else "general fitness", str(key[2])))
+    if tool == "meal_plan":
+        return render_nutrition(build_meal_plan(str(key[1]), str(key[2])))
+    if tool == "breathing":
+        return render_mental(breathing_exercise(int(key[1])))
+    if tool == "journal_prompt":
+        return render_mental(journal_prompt())
+    if tool == "chronic_support":
+        return render_chronic(chronic_lifestyle_support(str(key[1])))
+    raise KeyError(tool)
+
+
+def build_reply_table() -> dict[tuple[Hashable, ...], str]:
+    keys: list[tuple[Hashable, ...]] = [JOURNAL_KEY, chronic_key("")]
+    for strength in (False, True):
+        keys.extend(("fitness_plan", strength, level) for level in KNOWN_LEVELS)
+    keys.extend(meal_key(pref, "") for pref in KNOWN_PREFERENCES)
+    keys.extend(breathing_key(m) for m in BREATHING_MINUTES)
+    return {key: _render(key) for key in keys}
+
+
+REPLY_TABLE = build_reply_table()
+
+
+@lru_cache(maxsize=FREE_TEXT_CACHE_SIZE)
+def _render_free_text(key: tuple[Hashable, ...]) -> str:
+    return _render(key)
+
+
+CACHE_REQUESTS.add_callback(lru_cache_source("reply_free_text", _render_free_text))
+
+
+def rendered_reply(key: tuple[Hashable, ...]) -> str:
+    hit = REPLY_TABLE.get(key)
+    if hit is not None:
+        CACHE_REQUESTS.inc(_TABLE_HIT)
+        return hit
+    CACHE_REQUESTS.inc(_TABLE_MISS)
+    return _render_free_text(key)
+
+
+def cache_info() -> dict[str, int]:
+    info = _render_free_text.cache_info()
+    return {
+        "table_size": len(REPLY_TABLE),
+        "lru_hits": info.hits,
+        "lru_misses": info.misses,
+        "lru_size": info.currsize,
+        "lru_maxsize": info.maxsize or 0,
+    }
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import contextlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from app.api.debug import require_admin_token
+from app.storage import datadir
+from app.vector import ingest
+from app.vector.chunk_table import DocChunk
+from app.vector.store import VectorStore, _resolve_data_dir, get_vector_store
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+
+class IngestRequest(BaseModel):
+    paths: List[str] = Field(..., min_length=1, description="Files or directories, relative to INGEST_ROOT.")
+    resume: bool = Field(True, description="Skip files already recorded in the ingestion checkpoint.")
+    near_dup: Optional[float] = Field(None, ge=0, le=1, description="Near-duplicate threshold; 0 disables.")
+
+
+class ChunkIn(BaseModel):
+    id: str = Field(..., min_length=1, max_length=512)
+    text: str = Field(..., min_length=1)
+    meta: Dict[str, Any] = Field(default_factory=dict)
+
+
+class UpsertRequest(BaseModel):
+    chunks: List[ChunkIn] = Field(..., min_length=1, max_length=10000)
+
+
+class DeleteRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=100000)
+
+
+class BackupRequest(BaseModel):
+    name: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_-][A-Za-z0-9._-]*$", max_length=100)
+
+
+def _resolve(raw: str, root: Path) -> Path:
+    path = (root / raw).resolve()
+    if path != root and root not in path.parents:
+        raise HTTPException(status_code=400, detail=f"Path must be inside INGEST_ROOT: {raw}")
+    if not path.exists():
+        raise HTTPException(status_code=400, detail=f"Path not found under INGEST_ROOT: {raw}")
+    return path
+
+
+@router.post("/admin/ingest", status_code=202)
+def start_ingest(req: IngestRequest):
+    """Ingest files into the vector index in the background; poll the returned job for progress."""
+    root = ingest.ingest_root()
+    paths = [str(_resolve(raw, root)) for raw in req.paths]
+    try:
+        job = ingest.start_job(paths, resume=req.resume, near_dup=req.near_dup)
+    except ingest.IngestBusyError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return job.status()
+
+
+@router.get("/admin/ingest")
+def list_ingest_jobs():
+    return {"root": str(ingest.ingest_root()), "jobs": [job.status() for job in ingest.list_jobs()]}
+
+
+@router.get("/admin/ingest/{job_id}")
+def get_ingest_job(job_id: str):
+    job = ingest.get_job(job_id)
+    if job is None:
+        return {"error": "ingest_job_not_found"}
+    return job.status()
+
+
+@router.post("/admin/ingest/{job_id}/cancel")
+def cancel_ingest_job(job_id: str):
+    """Stop after the current batch; chunks appended so far are saved and the job can be resumed."""
+    job = ingest.get_job(job_id)
+    if job is None:
+        return {"error": "ingest_job_not_found"}
+    job.ingestion.cancel()
+    return job.status()
+
+
+@contextlib.contextmanager
+def _writable_store() -> Iterator[VectorStore]:
+    # Holds the ingestion lock for the whole write: a running ingestion saves
+    # its own copy of the index at each checkpoint and would drop it.
+    try:
+        with ingest.store_write_lock():
+            yield get_vector_store()
+    except ingest.IngestBusyError:
+        raise HTTPException(status_code=409, detail="An ingestion job is running; retry when it finishes") from None
+
+
+@router.get("/admin/vector")
+def vector_stats():
+    return get_vector_store().stats()
+
+
+@router.post("/admin/vector/upsert")
+def upsert_chunks(req: UpsertRequest):
+    """Add chunks, replacing live chunks with the same id."""
+    with _writable_store() as store:
+        replaced = store.upsert_documents([DocChunk(id=c.id, text=c.text, meta=c.meta) for c in req.chunks])
+        return {"upserted": len(req.chunks), "replaced": replaced, **store.stats()}
+
+
+@router.post("/admin/vector/delete")
+def delete_chunks(req: DeleteRequest):
+    with _writable_store() as store:
+        return {"deleted": store.delete_documents(req.ids), **store.stats()}
+
+
+@router.post("/admin/vector/compact")
+def compact_index():
+    """Drop tombstoned rows now instead of waiting for VECTOR_COMPACT_RATIO."""
+    with _writable_store() as store:
+        return {"dropped": store.compact(), **store.stats()}
+
+
+@router.get("/admin/backups")
+def list_backups():
+    data_dir = _resolve_data_dir(None)
+    return {"current": datadir.status(data_dir), "backups": datadir.list_backups(data_dir)}
+
+
+@router.post("/admin/backups", status_code=201)
+def create_backup(req: BackupRequest):
+    """Hard-link snapshot of the live vector generation and the app data (restore with the CLI)."""
+    try:
+        return datadir.backup(_resolve_data_dir(None), name=req.name)
+    except FileExistsError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
@@ -1,18 +1,28 @@
 from __future__ import annotations
 
+import os
+
 from fastapi import APIRouter
 from pydantic import BaseModel, Field
 
 from app.agents.orchestrator import AgentOrchestrator
 from app.rules.safety_guardrails import DISCLAIMER
+from app.storage.conversation_store import ConversationStore
 
 router = APIRouter()
 orch = AgentOrchestrator()
+conversations = ConversationStore()
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKENS", "512"))
 
 
 class ChatRequest(BaseModel):
     message: str = Field(min_length=1, max_length=4000)
     user_context: dict = Field(default_factory=dict)
+    user_id: str = Field("demo", max_length=128, description="User identifier (frontend can pass auth user id).")
+    session_id: str | None = Field(
+        None, max_length=128, description="Opt-in server-side history; omit for a stateless request."
+    )
 
 
 class ChatResponse(BaseModel):
@@ -20,9 +30,35 @@ class ChatResponse(BaseModel):
     domain: str
     disclaimer: str = DISCLAIMER
     tool_payload: dict | None = None
+    sources: list[str] = Field(default_factory=list)
+    timings: dict[str, float] = Field(default_factory=dict)
+    tokens: dict[str, int] = Field(default_factory=dict)
+    session_id: str | None = None
 
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest):
-    result = await orch.handle(req.message, req.user_context)
-    return ChatResponse(reply=result.reply, domain=result.domain, tool_payload=result.tool_payload)
+    key = ConversationStore.key(req.user_id, req.session_id) if req.session_id else None
+    history = conversations.context(key, HISTORY_TOKEN_BUDGET) if key else None
+
+    result = await orch.handle(req.message, req.user_context, history=history)
+
+    if key:
+        conversations.append(key, "user", req.message)
+        # The disclaimer is repeated on every reply; keep it out of the history.
+        conversations.append(key, "assistant", result.reply.replace(DISCLAIMER, "").strip())
+
+    return ChatResponse(
+        reply=result.reply,
+        domain=result.domain,
+        tool_payload=result.tool_payload,
+        sources=result.sources,
+        timings=result.timings,
+        tokens=result.tokens,
+        session_id=req.session_id,
+    )
+
+
+@router.delete("/chat/session/{session_id}")
+async def chat_clear_session(session_id: str, user_id: str = "demo"):
+    return {"cleared": conversations.clear(ConversationStore.key(user_id, session_id))}
@@ -1,30 +1,50 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
 import os
-from datetime import datetime
-from typing import Any, Dict, Optional
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
 
 from app.agents.goal_coach_agent import adapt_plan_from_checkin, create_goal_plan
+from app.api.bodies import read_body
 from app.llm.llm_client import LLMClient
+from app.ml.insights import PlanInsights
+from app.ml.models import MODEL_CHOICES, forecast_with_model
 from app.rules.safety_guardrails import DISCLAIMER
-from app.storage.coach_store import CoachStore
+from app.storage.coach_store import AsyncCoachStore
+from app.storage.forecast_state_store import ForecastStateStore
+from app.storage.insights_store import InsightsStore
+from app.storage.io import run_io
+from app.storage.timeseries_store import TimeSeriesStore
 
 router = APIRouter()
+log = logging.getLogger("healthyfy")
 
+BULK_MAX_ITEMS = int(os.getenv("COACH_BULK_MAX_ITEMS", "5000"))
+BULK_ADAPT_CONCURRENCY = int(os.getenv("COACH_BULK_ADAPT_CONCURRENCY", "4"))
+BULK_MAX_LINE_BYTES = int(os.getenv("COACH_BULK_MAX_LINE_BYTES", "65536"))
+BULK_MAX_JSON_BYTES = int(os.getenv("COACH_BULK_MAX_JSON_BYTES", str(16 * 1024 * 1024)))
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
 
-def _store() -> CoachStore:
-    # CoachStore handles env and stable defaults internally.
-    return CoachStore()
+
+def _store() -> AsyncCoachStore:
+    # CoachStore handles env and stable defaults internally; file I/O runs on
+    # the coach I/O pool so these async routes never block the event loop.
+    return AsyncCoachStore()
 
 
 def _maybe_llm() -> Optional[LLMClient]:
-    # Uses existing LLM client config if environment is set; otherwise None.
+    # Uses existing LLM client config if environment is set and the LLM circuit
+    # isn't open; otherwise None (deterministic coaching).
     try:
         client = LLMClient()
-        if not client.is_configured:
+        if not client.is_available():
             return None
         return client
     except Exception:
@@ -39,11 +59,11 @@ class CreateGoalRequest(BaseModel):
 
 
 @router.post("/coach/goal")
-def coach_create_goal(req: CreateGoalRequest):
+async def coach_create_goal(req: CreateGoalRequest):
     llm = _maybe_llm()
-    res = create_goal_plan(goal=req.goal, horizon_days=req.horizon_days, user_context=req.context, llm=llm)
+    res = await create_goal_plan(goal=req.goal, horizon_days=req.horizon_days, user_context=req.context, llm=llm)
 
-    plan = _store().create_plan(
+    plan = await _store().create_plan(
         user_id=req.user_id,
         goal=req.goal,
         horizon_days=req.horizon_days,
@@ -70,35 +90,59 @@ class CheckinRequest(BaseModel):
 
 
 @router.post("/coach/checkin")
-def coach_checkin(req: CheckinRequest):
+async def coach_checkin(req: CheckinRequest):
     store = _store()
-    plan = store.get_plan(req.plan_id)
+    plan = await store.get_plan(req.plan_id)
     if not plan:
         return {"disclaimer": DISCLAIMER, "error": "plan_not_found"}
 
+    now = datetime.utcnow()
     checkin = {
-        "at": datetime.utcnow().isoformat() + "Z",
+        "at": now.isoformat() + "Z",
         "adherence": req.adherence,
         "metrics": req.metrics,
         "notes": req.notes,
     }
 
+    # Fold this check-in into the plan's materialized analytics first, so the
+    # adaptation sees rolling adherence/streaks without scanning history.
+    insights = None
+    try:
+        insights = (await InsightsStore().record_checkin_async(req.plan_id, checkin)).summary()
+    except Exception as exc:
+        log.warning("Insights update skipped: %s", exc)
+
     llm = _maybe_llm()
-    updated = adapt_plan_from_checkin(
+    updated = await adapt_plan_from_checkin(
         goal=plan.goal,
         prior_plan_steps=plan.plan_steps,
         prior_next_actions=plan.next_actions,
         checkin=checkin,
         llm=llm,
+        insights=insights,
     )
 
-    saved = store.update_plan(
+    saved = await store.update_plan(
         plan_id=req.plan_id,
         plan_steps=updated.plan_steps,
         next_actions=updated.next_actions,
         checkin=checkin,
     )
 
+    # `adherence` last: a client metric of that name must not replace the real value.
+    observed = {**req.metrics, "adherence": req.adherence}
+    # O(1) per metric: keep the per-user online trend state current.
+    try:
+        await ForecastStateStore().observe_metrics_async(plan.user_id, observed)
+    except Exception as exc:
+        log.warning("Forecast state update skipped: %s", exc)
+    # Columnar per-plan history, so forecasts never re-parse the plan JSON.
+    try:
+        at_ts = now.replace(tzinfo=timezone.utc).timestamp()
+        await run_io(TimeSeriesStore().append_metrics, req.plan_id, at_ts, observed)
+    except Exception as exc:
+        log.warning("Time series append skipped: %s", exc)
+
     return {
         "disclaimer": DISCLAIMER,
         "plan_id": req.plan_id,
@@ -107,12 +151,201 @@ def coach_checkin(req: CheckinRequest):
         "plan_steps": saved.plan_steps if saved else updated.plan_steps,
         "next_actions": saved.next_actions if saved else updated.next_actions,
         "last_checkin": checkin,
+        "insights": insights,
+    }
+
+
+class BulkCheckinItem(CheckinRequest):
+    at: Optional[datetime] = Field(None, description="When the check-in happened (defaults to receipt time).")
+
+
+def _utc_naive(at: datetime) -> datetime:
+    return at.astimezone(timezone.utc).replace(tzinfo=None) if at.tzinfo else at
+
+
+def _epoch(at: datetime) -> float:
+    return at.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def _bulk_items(request: Request) -> AsyncIterator[Any]:
+    """Yield raw items: NDJSON lines as bytes (streamed), JSON array elements as parsed values."""
+    media_type = (request.headers.get("content-type") or "application/json").split(";")[0].strip().lower()
+    if media_type in NDJSON_MEDIA_TYPES:
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            # Bounded per line, so a body without newlines isn't buffered whole.
+            if len(pending) > BULK_MAX_LINE_BYTES or any(len(line) > BULK_MAX_LINE_BYTES for line in lines):
+                raise HTTPException(status_code=413, detail=f"NDJSON lines are limited to {BULK_MAX_LINE_BYTES} bytes")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if pending.strip():
+            yield pending
+    elif media_type == "application/json":
+        raw = await read_body(request, BULK_MAX_JSON_BYTES)
+        try:
+            # Parsing a large array is CPU-bound: keep it off the event loop.
+            body = await run_in_threadpool(json.loads, raw or b"{}")
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {exc}") from exc
+        items = body.get("checkins") if isinstance(body, dict) else body
+        if not isinstance(items, list):
+            raise HTTPException(status_code=422, detail="Expected {\"checkins\": [...]} or a JSON array")
+        for item in items:
+            yield item
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {media_type}")
+
+
+def _record_bulk_history(
+    plans: Dict[str, Any], grouped: Dict[str, List[Dict[str, Any]]]
+) -> Tuple[Dict[str, Dict[str, Any]], List[int]]:
+    """Insights, online trend state and time series for every plan, one write per file.
+
+    The time series and online state are append-only and oldest-first, so
+    check-ins older than the plan's newest stored one (an offline batch synced
+    after live check-ins) are left out of them. Returns the insights summaries
+    and the item indexes of those check-ins.
+    """
+    insights_store, forecast_store, series_store = InsightsStore(), ForecastStateStore(), TimeSeriesStore()
+    summaries: Dict[str, Dict[str, Any]] = {}
+    out_of_order: List[int] = []
+    for plan_id, checkins in grouped.items():
+        try:
+            summaries[plan_id] = insights_store.record_checkins(plan_id, checkins).summary()
+            newest = series_store.last_timestamp(plan_id)
+            in_order = [c for c in checkins if newest is None or c["_ts"] >= newest]
+            out_of_order.extend(c["_index"] for c in checkins if newest is not None and c["_ts"] < newest)
+            observed = [{**c["metrics"], "adherence": c["adherence"]} for c in in_order]
+            if in_order:
+                forecast_store.observe_metrics_batch(plans[plan_id].user_id, observed)
+                series_store.append_rows(plan_id, [(c["_ts"], row) for c, row in zip(in_order, observed)])
+        except Exception as exc:
+            log.warning("Bulk history update skipped for %s: %s", plan_id, exc)
+    return summaries, out_of_order
+
+
+@router.post("/coach/checkins/bulk")
+async def coach_checkins_bulk(request: Request):
+    """Ingest many check-ins across plans (offline/wearable sync).
+
+    Bodies:
+      - application/json: {"checkins": [{plan_id, adherence, metrics, notes, at?}, ...]} or a bare array
+      - application/x-ndjson: one check-in object per line, parsed as it streams in
+
+    Items are validated individually; each plan is loaded once, adapted once on
+    its newest check-in, and all plans are written back in a single store write.
+    Check-ins older than the plan's newest recorded one are saved but left out
+    of the forecast history (status `accepted_out_of_order`). NDJSON lines over
+    COACH_BULK_MAX_LINE_BYTES and JSON bodies over COACH_BULK_MAX_JSON_BYTES
+    answer 413.
+    """
+    received = datetime.utcnow()
+    results: List[Dict[str, Any]] = []
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    index: Dict[str, List[int]] = {}
+
+    count = 0
+    async for raw in _bulk_items(request):
+        if count >= BULK_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"Bulk check-in limited to {BULK_MAX_ITEMS} items")
+        i, count = count, count + 1
+        try:
+            item = (
+                BulkCheckinItem.model_validate_json(raw)
+                if isinstance(raw, bytes)
+                else BulkCheckinItem.model_validate(raw)
+            )
+        except ValidationError as exc:
+            results.append(
+                {"index": i, "status": "invalid", "errors": exc.errors(include_url=False, include_context=False)}
+            )
+            continue
+        at = _utc_naive(item.at) if item.at else received
+        grouped.setdefault(item.plan_id, []).append(
+            {
+                "at": at.isoformat() + "Z",
+                "adherence": item.adherence,
+                "metrics": item.metrics,
+                "notes": item.notes,
+                "_ts": _epoch(at),
+                "_index": i,
+            }
+        )
+        index.setdefault(item.plan_id, []).append(i)
+        results.append({"index": i, "plan_id": item.plan_id, "status": "accepted"})
+
+    store = _store()
+    plans = await store.get_plans(grouped.keys()) if grouped else {}
+    for plan_id in [pid for pid in grouped if pid not in plans]:
+        for i in index[plan_id]:
+            results[i]["status"] = "plan_not_found"
+        del grouped[plan_id]
+    for checkins in grouped.values():
+        checkins.sort(key=lambda c: c["_ts"])
+
+    summaries, out_of_order = await run_io(_record_bulk_history, plans, grouped) if grouped else ({}, [])
+    for i in out_of_order:
+        results[i]["status"] = "accepted_out_of_order"
+    for checkins in grouped.values():
+        for c in checkins:
+            c.pop("_ts", None)
+            c.pop("_index", None)
+
+    llm = _maybe_llm()
+    gate = asyncio.Semaphore(max(1, BULK_ADAPT_CONCURRENCY))
+
+    async def adapt(plan_id: str) -> Tuple[str, Any]:
+        plan = plans[plan_id]
+        async with gate:
+            return plan_id, await adapt_plan_from_checkin(
+                goal=plan.goal,
+                prior_plan_steps=plan.plan_steps,
+                prior_next_actions=plan.next_actions,
+                checkin=grouped[plan_id][-1],
+                llm=llm,
+                insights=summaries.get(plan_id),
+            )
+
+    adapted = dict(await asyncio.gather(*(adapt(pid) for pid in grouped)))
+    saved = (
+        await store.apply_checkins(
+            {
+                pid: {
+                    "checkins": checkins,
+                    "plan_steps": adapted[pid].plan_steps,
+                    "next_actions": adapted[pid].next_actions,
+                }
+                for pid, checkins in grouped.items()
+            }
+        )
+        if grouped
+        else {}
+    )
+
+    return {
+        "disclaimer": DISCLAIMER,
+        "received": len(results),
+        "accepted": sum(1 for r in results if r["status"].startswith("accepted")),
+        "plans": {
+            pid: {
+                "checkins": len(grouped[pid]),
+                "title": adapted[pid].title,
+                "reasoning_summary": adapted[pid].reasoning_summary,
+                "next_actions": saved[pid].next_actions if pid in saved else adapted[pid].next_actions,
+                "last_checkin": grouped[pid][-1],
+            }
+            for pid in grouped
+        },
+        "results": results,
     }
 
 
 @router.get("/coach/state/{plan_id}")
-def coach_state(plan_id: str):
-    plan = _store().get_plan(plan_id)
+async def coach_state(plan_id: str):
+    plan = await _store().get_plan(plan_id)
     if not plan:
         return {"disclaimer": DISCLAIMER, "error": "plan_not_found"}
 
@@ -128,3 +361,57 @@ def coach_state(plan_id: str):
         "next_actions": plan.next_actions,
         "checkins": plan.checkins,
     }
+
+
+@router.get("/coach/{plan_id}/insights")
+async def coach_insights(plan_id: str):
+    insights = await InsightsStore().get_async(plan_id)
+    if insights is None:
+        # No check-ins yet (or unknown plan): only then consult the plan store.
+        if not await _store().get_plan(plan_id):
+            return {"disclaimer": DISCLAIMER, "error": "plan_not_found"}
+        insights = PlanInsights()
+    return {"disclaimer": DISCLAIMER, "plan_id": plan_id, **insights.summary()}
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+
+def _forecast_series(plan_id: str, metric: str, horizon: int, model: str) -> Optional[Dict[str, Any]]:
+    series = TimeSeriesStore().read(plan_id, metric)
+    if series is None or series[0].shape[0] == 0:
+        return None
+    ts, values = series
+    res = forecast_with_model(values, horizon, model)
+    payload: Dict[str, Any] = {
+        "observations": int(values.shape[0]),
+        "first_at": _iso(float(ts[0])),
+        "last_at": _iso(float(ts[-1])),
+        "model": res.model,
+        "intercept": res.intercept,
+        "slope": res.slope,
+        "r2": res.r2,
+        "forecast": res.forecast,
+    }
+    if res.backtest_mae is not None:
+        payload["backtest_mae"] = res.backtest_mae
+    return payload
+
+
+@router.get("/coach/{plan_id}/forecast")
+async def coach_forecast(
+    plan_id: str,
+    metric: str = Query("adherence", min_length=1, max_length=100, description="Check-in metric name."),
+    horizon: int = Query(7, ge=1, le=30),
+    model: str = Query("linear", pattern="^(" + "|".join(MODEL_CHOICES) + ")$"),
+):
+    # Reads memory-mapped columns and fits on the coach I/O pool.
+    res = await run_io(_forecast_series, plan_id, metric, horizon, model)
+    if res is None:
+        return {
+            "disclaimer": DISCLAIMER,
+            "error": "metric_not_found",
+            "available_metrics": await run_io(TimeSeriesStore().metrics, plan_id),
+        }
+    return {"disclaimer": DISCLAIMER, "plan_id": plan_id, "metric": metric, **res}
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from app.observability.profiler import profiler
+from app.observability.slow_requests import slow_log
+
+_LOOPBACK = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_debug_access(request: Request, x_debug_token: Optional[str] = Header(None)) -> None:
+    """With DEBUG_TOKEN set, require it in `X-Debug-Token`; otherwise allow loopback clients only."""
+    token = os.getenv("DEBUG_TOKEN", "")
+    if token:
+        if not hmac.compare_digest((x_debug_token or "").encode("utf-8"), token.encode("utf-8")):
+            raise HTTPException(status_code=403, detail="Invalid debug token")
+        return
+    host = request.client.host if request.client else ""
+    if host not in _LOOPBACK:
+        raise HTTPException(status_code=403, detail="Set DEBUG_TOKEN to use /debug endpoints from other hosts")
+
+
+def require_admin_token(request: Request, x_debug_token: Optional[str] = Header(None)) -> None:
+    """Like `require_debug_access`, but fails closed: 403 unless DEBUG_TOKEN is set.
+
+    Admin routes write the vector index and data dirs, and behind a same-host
+    reverse proxy every client looks like loopback.
+    """
+    if not os.getenv("DEBUG_TOKEN", ""):
+        raise HTTPException(status_code=403, detail="Set DEBUG_TOKEN to enable /api/admin endpoints")
+    require_debug_access(request, x_debug_token)
+
+
+router = APIRouter(dependencies=[Depends(require_debug_access)])
+
+
+@router.get("/debug/slow")
+def get_slow_requests(limit: int = Query(50, ge=1, le=1000)):
+    """Requests slower than SLOW_REQUEST_MS, newest first, with stage timings, sizes and cache outcomes."""
+    return {
+        "threshold_ms": slow_log.threshold_ms,
+        "capacity": slow_log.capacity,
+        "captured_total": slow_log.captured,
+        "requests": slow_log.entries(limit),
+    }
+
+
+@router.delete("/debug/slow")
+def clear_slow_requests():
+    return {"cleared": slow_log.clear()}
+
+
+@router.get("/debug/profile/status")
+def profile_status():
+    return profiler.status()
+
+
+@router.post("/debug/profile/start")
+def profile_start(interval_ms: Optional[float] = Query(None, ge=1, le=1000), reset: bool = False):
+    if reset:
+        profiler.reset()
+    started = profiler.start(interval_ms)
+    return {"started": started, **profiler.status()}
+
+
+@router.post("/debug/profile/stop")
+def profile_stop():
+    stopped = profiler.stop()
+    return {"stopped": stopped, **profiler.status()}
+
+
+@router.get("/debug/profile", response_class=PlainTextResponse)
+async def profile_collapsed(
+    seconds: Optional[float] = Query(None, gt=0, le=60, description="Sample for this long, then return."),
+    reset: bool = Query(False, description="Clear the collected stacks after returning them."),
+):
+    """Collapsed stacks (`frame;frame;... count`) for flamegraph.pl / speedscope.
+
+    With `seconds`, runs a one-off capture (the profiler must not already be running).
+    """
+    if seconds is not None:
+        if profiler.running:
+            raise HTTPException(status_code=409, detail="Profiler is already running; stop it or omit `seconds`")
+        profiler.reset()
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(profiler.stop)
+        return PlainTextResponse(profiler.collapsed(reset=True))
+    return PlainTextResponse(profiler.collapsed(reset=reset))
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Habit, HabitCheckin, HabitStreak
+from app.db.queries import checkins_between, habit_stats, keyset_page, upsert_checkins
+from app.db.rollups import apply_checkins, rollup_summary
+from app.db.session import get_async_db
+from app.rules.safety_guardrails import DISCLAIMER
+
+router = APIRouter()
+
+BULK_CHECKIN_MAX = 5000
+
+
+def habit_payload(habit: Habit) -> dict:
+    return {
+        "id": habit.id,
+        "user_id": habit.user_id,
+        "title": habit.title,
+        "description": habit.description,
+        "active": habit.active,
+        "created_at": habit.created_at.isoformat() + "Z",
+    }
+
+
+def checkin_payload(row: HabitCheckin) -> dict:
+    return {
+        "id": row.id,
+        "habit_id": row.habit_id,
+        "day": row.day.isoformat(),
+        "completed": row.completed,
+        "created_at": row.created_at.isoformat() + "Z",
+    }
+
+
+class CreateHabitRequest(BaseModel):
+    user_id: int
+    title: str = Field(..., min_length=1, max_length=140)
+    description: str = Field("", max_length=2000)
+
+
+class UpdateHabitRequest(BaseModel):
+    title: Optional[str] = Field(None, min_length=1, max_length=140)
+    description: Optional[str] = Field(None, max_length=2000)
+    active: Optional[bool] = None
+
+
+@router.post("/habits")
+async def create_habit(req: CreateHabitRequest, db: AsyncSession = Depends(get_async_db)):
+    habit = Habit(user_id=req.user_id, title=req.title, description=req.description)
+    db.add(habit)
+    await db.commit()
+    return {"disclaimer": DISCLAIMER, "habit": habit_payload(habit)}
+
+
+@router.get("/habits")
+async def list_habits(user_id: int, include_inactive: bool = False, db: AsyncSession = Depends(get_async_db)):
+    stmt = select(Habit).where(Habit.user_id == user_id)
+    if not include_inactive:
+        stmt = stmt.where(Habit.active.is_(True))
+    rows = (await db.execute(stmt.order_by(Habit.id))).scalars()
+    return {"disclaimer": DISCLAIMER, "habits": [habit_payload(h) for h in rows]}
+
+
+@router.patch("/habits/{habit_id}")
+async def update_habit(
+    habit_id: int, user_id: int, req: UpdateHabitRequest, db: AsyncSession = Depends(get_async_db)
+):
+    habit = await db.get(Habit, habit_id)
+    if habit is None or habit.user_id != user_id:
+        return {"disclaimer": DISCLAIMER, "error": "habit_not_found"}
+    for key, value in req.model_dump(exclude_none=True).items():
+        setattr(habit, key, value)
+    await db.commit()
+    return {"disclaimer": DISCLAIMER, "habit": habit_payload(habit)}
+
+
+class HabitCheckinItem(BaseModel):
+    habit_id: int
+    day: date = Field(..., description="Day the habit was done (YYYY-MM-DD).")
+    completed: bool = True
+
+
+class BulkHabitCheckinRequest(BaseModel):
+    user_id: int
+    checkins: List[HabitCheckinItem] = Field(default_factory=list, max_length=BULK_CHECKIN_MAX)
+
+
+@router.post("/habits/checkins/bulk")
+async def bulk_habit_checkins(req: BulkHabitCheckinRequest, db: AsyncSession = Depends(get_async_db)):
+    """Record many habit check-ins with one ownership query and multi-row upserts.
+
+    Idempotent: one row per (habit, day); replays update `completed` in place.
+    Streak rollups are updated in the same transaction.
+    """
+    habit_ids = {c.habit_id for c in req.checkins}
+    owned = set()
+    if habit_ids:
+        owned = set(
+            (await db.execute(select(Habit.id).where(Habit.user_id == req.user_id, Habit.id.in_(habit_ids)))).scalars()
+        )
+    now = datetime.utcnow()
+    # One day of slack for clients ahead of UTC.
+    latest_day = now.date() + timedelta(days=1)
+    accepted = [c.habit_id in owned and c.day <= latest_day for c in req.checkins]
+    rows = [
+        {
+            "user_id": req.user_id,
+            "habit_id": c.habit_id,
+            "day": c.day,
+            "completed": c.completed,
+            "created_at": now,
+        }
+        for c, ok in zip(req.checkins, accepted)
+        if ok
+    ]
+    upserted = await upsert_checkins(db, rows)
+    await apply_checkins(db, req.user_id, rows)
+    await db.commit()
+    return {
+        "disclaimer": DISCLAIMER,
+        "upserted": upserted,
+        "rejected": [i for i, ok in enumerate(accepted) if not ok],
+    }
+
+
+@router.get("/habits/checkins")
+async def list_habit_checkins(
+    user_id: int,
+    habit_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page."),
+    db: AsyncSession = Depends(get_async_db),
+):
+    filters = [HabitCheckin.habit_id == habit_id] if habit_id is not None else []
+    try:
+        rows, next_cursor = await keyset_page(db, HabitCheckin, user_id, limit, cursor, *filters)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"disclaimer": DISCLAIMER, "checkins": [checkin_payload(r) for r in rows], "next_cursor": next_cursor}
+
+
+@router.get("/habits/{habit_id}/checkins")
+async def habit_checkins_range(
+    habit_id: int,
+    user_id: int,
+    since: Optional[date] = Query(None, description="First day (default: 29 days before `until`)."),
+    until: Optional[date] = Query(None, description="Last day (default: today, UTC)."),
+    db: AsyncSession = Depends(get_async_db),
+):
+    until = until or datetime.utcnow().date()
+    since = since or until - timedelta(days=29)
+    if since > until or (until - since).days > 366:
+        raise HTTPException(status_code=400, detail="Date range must be 1-367 days with since <= until")
+    rows = await checkins_between(db, user_id, habit_id, since, until)
+    return {
+        "disclaimer": DISCLAIMER,
+        "habit_id": habit_id,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "checkins": [checkin_payload(r) for r in rows],
+    }
+
+
+@router.get("/habits/{habit_id}/streak")
+async def get_habit_streak(
+    habit_id: int,
+    user_id: int,
+    window_days: int = Query(30, ge=1, le=365),
+    db: AsyncSession = Depends(get_async_db),
+):
+    rollup = await db.get(HabitStreak, (user_id, habit_id))
+    return {
+        "disclaimer": DISCLAIMER,
+        "habit_id": habit_id,
+        **rollup_summary(rollup, datetime.utcnow().date(), window_days),
+    }
+
+
+@router.get("/habits/stats")
+async def get_habit_stats(
+    user_id: int,
+    window_days: int = Query(30, ge=1, le=365),
+    source: Literal["rollup", "raw"] = Query(
+        "rollup", description="rollup: habit_streaks rows (default); raw: aggregate habit_checkins in SQL (audit)."
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Streaks and completion rate per active habit."""
+    habits = list((await db.execute(select(Habit).where(Habit.user_id == user_id, Habit.active.is_(True)))).scalars())
+    today = datetime.utcnow().date()
+    if source == "rollup":
+        rollups = {
+            r.habit_id: r
+            for r in (await db.execute(select(HabitStreak).where(HabitStreak.user_id == user_id))).scalars()
+        }
+        return {
+            "disclaimer": DISCLAIMER,
+            "habits": [{**habit_payload(h), **rollup_summary(rollups.get(h.id), today, window_days)} for h in habits],
+        }
+
+    stats = await habit_stats(db, user_id, today, window_days, [h.id for h in habits])
+    empty = {
+        "current_streak": 0,
+        "longest_streak": 0,
+        "completed_days": 0,
+        "last_completed": None,
+        "window_days": window_days,
+        "completion_rate": 0.0,
+    }
+    return {
+        "disclaimer": DISCLAIMER,
+        "habits": [{**habit_payload(h), **stats.get(h.id, empty)} for h in habits],
+    }
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import JournalEntry, User
+from app.db.queries import keyset_page
+from app.db.session import get_async_db
+from app.rules.safety_guardrails import DISCLAIMER
+
+router = APIRouter()
+
+
+def journal_payload(entry: JournalEntry) -> dict:
+    return {
+        "id": entry.id,
+        "user_id": entry.user_id,
+        "prompt": entry.prompt,
+        "entry": entry.entry,
+        "created_at": entry.created_at.isoformat() + "Z",
+    }
+
+
+class JournalRequest(BaseModel):
+    user_id: int
+    prompt: str = Field("", max_length=255)
+    entry: str = Field(..., min_length=1, max_length=20000)
+
+
+@router.post("/journal")
+async def create_journal_entry(req: JournalRequest, db: AsyncSession = Depends(get_async_db)):
+    if await db.get(User, req.user_id) is None:
+        return {"disclaimer": DISCLAIMER, "error": "user_not_found"}
+    entry = JournalEntry(user_id=req.user_id, prompt=req.prompt, entry=req.entry)
+    db.add(entry)
+    await db.commit()
+    return {"disclaimer": DISCLAIMER, "entry": journal_payload(entry)}
+
+
+@router.get("/journal")
+async def list_journal_entries(
+    user_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page."),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        rows, next_cursor = await keyset_page(db, JournalEntry, user_id, limit, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"disclaimer": DISCLAIMER, "entries": [journal_payload(r) for r in rows], "next_cursor": next_cursor}
+
+
+@router.get("/journal/{entry_id}")
+async def get_journal_entry(entry_id: int, user_id: int, db: AsyncSession = Depends(get_async_db)):
+    entry = await db.get(JournalEntry, entry_id)
+    if entry is None or entry.user_id != user_id:
+        return {"disclaimer": DISCLAIMER, "error": "entry_not_found"}
+    return {"disclaimer": DISCLAIMER, "entry": journal_payload(entry)}
+
+
+@router.delete("/journal/{entry_id}")
+async def delete_journal_entry(entry_id: int, user_id: int, db: AsyncSession = Depends(get_async_db)):
+    res = await db.execute(
+        delete(JournalEntry).where(JournalEntry.id == entry_id, JournalEntry.user_id == user_id)
+    )
+    await db.commit()
+    if not res.rowcount:
+        return {"disclaimer": DISCLAIMER, "error": "entry_not_found"}
+    return {"disclaimer": DISCLAIMER, "deleted": entry_id}
@@ -1,27 +1,216 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
-from pydantic import BaseModel, Field
+import io
+import os
+from typing import Annotated, Literal
 
-from app.ml.forecast import forecast_linear
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.api.bodies import read_body
+from app.lazy import lazy_import
+from app.ml.forecast import LinearForecastBatchResult, LinearForecastResult, forecast_linear_batch
+from app.ml.models import forecast_with_model
 from app.rules.safety_guardrails import DISCLAIMER
+from app.storage.forecast_state_store import ForecastStateStore
+
+np = lazy_import("numpy")
 
 router = APIRouter()
 
+NPY_MEDIA_TYPE = "application/x-npy"
+NPZ_MEDIA_TYPE = "application/x-npz"
+BATCH_MAX_BYTES = int(os.getenv("ML_BATCH_MAX_BYTES", str(64 * 1024 * 1024)))
+FORECAST_MAX_POINTS = int(os.getenv("ML_FORECAST_MAX_POINTS", "10000"))
+BATCH_MAX_POINTS = int(os.getenv("ML_BATCH_MAX_POINTS", "1000000"))
+
+# inf/NaN would fit to NaN coefficients, which JSON responses can't encode.
+FiniteFloat = Annotated[float, Field(allow_inf_nan=False)]
+
+
+ForecastModelName = Literal["linear", "holt", "seasonal", "theil_sen", "auto"]
+
 
 class ForecastRequest(BaseModel):
-    series: list[float] = Field(default_factory=list, description="Numeric time series values (oldest->newest).")
+    series: list[FiniteFloat] = Field(
+        default_factory=list, max_length=FORECAST_MAX_POINTS, description="Numeric time series values (oldest->newest)."
+    )
     horizon: int = Field(7, ge=1, le=30, description="How many future points to forecast.")
+    model: ForecastModelName = Field(
+        "linear",
+        description="linear | holt (trend smoothing) | seasonal (weekly) | theil_sen (robust) | auto (best backtest).",
+    )
 
 
 @router.post("/ml/forecast")
 def ml_forecast(req: ForecastRequest):
-    res = forecast_linear(req.series, req.horizon)
+    res = forecast_with_model(req.series, req.horizon, req.model)
+    payload = {
+        "disclaimer": DISCLAIMER,
+        "model": res.model,
+        "intercept": res.intercept,
+        "slope": res.slope,
+        "r2": res.r2,
+        "forecast": res.forecast,
+    }
+    if res.backtest_mae is not None:
+        payload["backtest_mae"] = res.backtest_mae
+    return payload
+
+
+class BatchForecastRequest(BaseModel):
+    series: list[list[FiniteFloat | None]] = Field(default_factory=list, description="One list per series (oldest->newest).")
+    horizon: int = Field(7, ge=1, le=30, description="How many future points to forecast.")
+
+
+def _json_to_csr(series: list[list[float | None]]) -> tuple[np.ndarray, np.ndarray]:
+    """Flat values + CSR offsets; ragged JSON is never padded to its longest series."""
+    lengths = np.fromiter((len(s) for s in series), dtype=np.int64, count=len(series))
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    total = int(offsets[-1])
+    if total > BATCH_MAX_POINTS:
+        raise HTTPException(status_code=422, detail=f"Batch has {total} points; the limit is {BATCH_MAX_POINTS}")
+    values = np.fromiter(
+        (np.nan if x is None else x for s in series for x in s), dtype=np.float64, count=total
+    )
+    return values, offsets
+
+
+def _run_json_batch(req: BatchForecastRequest) -> LinearForecastBatchResult:
+    values, offsets = _json_to_csr(req.series)
+    return forecast_linear_batch(values, offsets=offsets, horizon=req.horizon)
+
+
+def _run_binary_batch(body: bytes, media_type: str, horizon: int) -> LinearForecastBatchResult:
+    try:
+        loaded = np.load(io.BytesIO(body), allow_pickle=False)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Unreadable {media_type} body: {exc}") from exc
+
+    is_npz = isinstance(loaded, np.lib.npyio.NpzFile)
+    if is_npz != (media_type == NPZ_MEDIA_TYPE):
+        if is_npz:
+            loaded.close()
+        kind = "an .npz archive" if is_npz else "a single .npy array"
+        raise HTTPException(status_code=415, detail=f"{media_type} body is {kind}")
+
+    try:
+        if not is_npz:
+            # Padded 2-D array; NaN marks padding/missing values.
+            return forecast_linear_batch(_finite_or_nan(_numeric(loaded, "values")), horizon=horizon)
+        with loaded as npz:
+            if "values" not in npz.files:
+                raise HTTPException(status_code=400, detail="npz body needs a 'values' array")
+            offsets = _numeric(npz["offsets"], "offsets") if "offsets" in npz.files else None
+            lengths = _numeric(npz["lengths"], "lengths") if "lengths" in npz.files else None
+            values = _finite_or_nan(_numeric(npz["values"], "values"))
+            return forecast_linear_batch(values, lengths=lengths, offsets=offsets, horizon=horizon)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _numeric(array: np.ndarray, name: str) -> np.ndarray:
+    # Structured, complex, bool, string or datetime arrays would fail the float
+    # cast (a 500) or silently lose data (a complex array's imaginary part).
+    if array.dtype.kind not in "fiu":
+        raise HTTPException(status_code=422, detail=f"'{name}' must be a float or integer array, not {array.dtype}")
+    return array
+
+
+def _finite_or_nan(values: np.ndarray) -> np.ndarray:
+    # NaN is padding/missing in binary bodies; infinities are rejected.
+    if values.dtype.kind == "f" and np.isinf(values).any():
+        raise HTTPException(status_code=422, detail="values must be finite (NaN marks missing)")
+    return values
+
+
+@router.post("/ml/forecast/batch")
+async def ml_forecast_batch(
+    request: Request,
+    horizon: int = Query(7, ge=1, le=30, description="Forecast horizon for binary bodies (JSON bodies carry their own)."),
+):
+    """Forecast many series in one vectorized pass.
+
+    Bodies:
+      - application/json: {"series": [[...], ...], "horizon": 7}
+      - application/x-npy: padded 2-D float array (NaN = padding/missing)
+      - application/x-npz: `values` plus optional `lengths` (padded 2-D) or `offsets` (flat, CSR-style)
+
+    Send `Accept: application/x-npz` to receive intercept/slope/r2/lengths/forecast arrays instead of JSON.
+    """
+    media_type = (request.headers.get("content-type") or "application/json").split(";")[0].strip().lower()
+    body = await read_body(request, BATCH_MAX_BYTES)
+
+    if media_type in (NPY_MEDIA_TYPE, NPZ_MEDIA_TYPE):
+        res = await run_in_threadpool(_run_binary_batch, body, media_type, horizon)
+    elif media_type == "application/json":
+        try:
+            req = BatchForecastRequest.model_validate_json(body or b"{}")
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors(include_url=False, include_input=False)) from exc
+        res = await run_in_threadpool(_run_json_batch, req)
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {media_type}")
+
+    if NPZ_MEDIA_TYPE in (request.headers.get("accept") or ""):
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            lengths=res.lengths,
+            intercept=res.intercept,
+            slope=res.slope,
+            r2=res.r2,
+            forecast=res.forecast,
+        )
+        return Response(content=buf.getvalue(), media_type=NPZ_MEDIA_TYPE, headers={"X-Model": res.model})
+
     return {
         "disclaimer": DISCLAIMER,
         "model": res.model,
+        "count": int(res.lengths.shape[0]),
+        "results": [
+            {"intercept": a, "slope": b, "r2": r, "forecast": f}
+            for a, b, r, f in zip(
+                res.intercept.tolist(), res.slope.tolist(), res.r2.tolist(), res.forecast.tolist()
+            )
+        ],
+    }
+
+
+class OnlineObserveRequest(BaseModel):
+    values: list[FiniteFloat] = Field(default_factory=list, description="New observations (oldest->newest).")
+    horizon: int = Field(7, ge=1, le=30)
+    decay: float | None = Field(None, gt=0.0, le=1.0, description="Per-update weight decay (new or reset states).")
+    window: int | None = Field(None, ge=0, le=3650, description="Sliding window size, 0 = unbounded (new or reset states).")
+    reset: bool = False
+
+
+def _online_payload(user_id: str, metric: str, observations: int, res: LinearForecastResult) -> dict:
+    return {
+        "disclaimer": DISCLAIMER,
+        "user_id": user_id,
+        "metric": metric,
+        "observations": observations,
+        "model": res.model,
         "intercept": res.intercept,
         "slope": res.slope,
         "r2": res.r2,
         "forecast": res.forecast,
     }
+
+
+@router.post("/ml/online/{user_id}/{metric}")
+def ml_online_observe(user_id: str, metric: str, req: OnlineObserveRequest):
+    state = ForecastStateStore().observe(
+        user_id, metric, req.values, decay=req.decay, window=req.window, reset=req.reset
+    )
+    return _online_payload(user_id, metric, state.count, state.forecast(req.horizon))
+
+
+@router.get("/ml/online/{user_id}/{metric}")
+def ml_online_forecast(user_id: str, metric: str, horizon: int = Query(7, ge=1, le=30)):
+    state = ForecastStateStore().get(user_id, metric)
+    if state is None:
+        return {"disclaimer": DISCLAIMER, "error": "state_not_found"}
+    return _online_payload(user_id, metric, state.count, state.forecast(horizon))
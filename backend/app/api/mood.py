@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import MoodEntry, User
+from app.db.queries import keyset_page
+from app.db.session import get_async_db
+from app.rules.safety_guardrails import DISCLAIMER
+
+router = APIRouter()
+
+
+def mood_payload(entry: MoodEntry) -> dict:
+    return {
+        "id": entry.id,
+        "user_id": entry.user_id,
+        "mood": entry.mood,
+        "note": entry.note,
+        "created_at": entry.created_at.isoformat() + "Z",
+    }
+
+
+class MoodRequest(BaseModel):
+    user_id: int
+    mood: str = Field(..., min_length=1, max_length=64)
+    note: str = Field("", max_length=2000)
+
+
+@router.post("/mood")
+async def create_mood(req: MoodRequest, db: AsyncSession = Depends(get_async_db)):
+    if await db.get(User, req.user_id) is None:
+        return {"disclaimer": DISCLAIMER, "error": "user_not_found"}
+    entry = MoodEntry(user_id=req.user_id, mood=req.mood, note=req.note)
+    db.add(entry)
+    await db.commit()
+    return {"disclaimer": DISCLAIMER, "entry": mood_payload(entry)}
+
+
+@router.get("/mood")
+async def list_mood(
+    user_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page."),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        rows, next_cursor = await keyset_page(db, MoodEntry, user_id, limit, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"disclaimer": DISCLAIMER, "entries": [mood_payload(r) for r in rows], "next_cursor": next_cursor}
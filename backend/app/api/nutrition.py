@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.agents.nutrition_agent import build_meal_plan
+from app.db.models import NutritionPreference
+from app.db.session import get_async_db
 from app.rules.safety_guardrails import DISCLAIMER
 
 router = APIRouter()
@@ -18,3 +22,40 @@ class NutritionRequest(BaseModel):
 def nutrition_plan(req: NutritionRequest):
     res = build_meal_plan(req.preference, req.allergies)
     return {"disclaimer": DISCLAIMER, "title": res.title, "meal_plan": res.meal_plan, "tips": res.tips}
+
+
+class PreferenceRequest(BaseModel):
+    preference: str = Field("balanced", max_length=64)
+    allergies: str = Field("", max_length=2000)
+
+
+def _preference_payload(row: NutritionPreference) -> dict:
+    return {
+        "user_id": row.user_id,
+        "preference": row.preference,
+        "allergies": row.allergies,
+        "updated_at": row.created_at.isoformat() + "Z",
+    }
+
+
+@router.get("/nutrition/preferences/{user_id}")
+async def get_nutrition_preferences(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    stmt = (
+        select(NutritionPreference)
+        .where(NutritionPreference.user_id == user_id)
+        .order_by(NutritionPreference.created_at.desc(), NutritionPreference.id.desc())
+        .limit(1)
+    )
+    row = (await db.execute(stmt)).scalars().first()
+    if row is None:
+        return {"disclaimer": DISCLAIMER, "error": "preferences_not_found"}
+    return {"disclaimer": DISCLAIMER, **_preference_payload(row)}
+
+
+@router.put("/nutrition/preferences/{user_id}")
+async def put_nutrition_preferences(user_id: int, req: PreferenceRequest, db: AsyncSession = Depends(get_async_db)):
+    # Append-only: the newest row is the current preference, older rows are history.
+    row = NutritionPreference(user_id=user_id, preference=req.preference, allergies=req.allergies)
+    db.add(row)
+    await db.commit()
+    return {"disclaimer": DISCLAIMER, **_preference_payload(row)}
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import User
+from app.db.session import get_async_db
+from app.rules.safety_guardrails import DISCLAIMER
+
+router = APIRouter()
+
+
+def user_payload(user: User) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "display_name": user.display_name,
+        "created_at": user.created_at.isoformat() + "Z",
+    }
+
+
+class CreateUserRequest(BaseModel):
+    email: str = Field(..., min_length=3, max_length=255)
+    display_name: str = Field("", max_length=120)
+
+
+@router.post("/users")
+async def create_user(req: CreateUserRequest, db: AsyncSession = Depends(get_async_db)):
+    if (await db.execute(select(User.id).where(User.email == req.email))).first():
+        return {"disclaimer": DISCLAIMER, "error": "email_taken"}
+    user = User(email=req.email, display_name=req.display_name)
+    db.add(user)
+    await db.commit()
+    return {"disclaimer": DISCLAIMER, "user": user_payload(user)}
+
+
+@router.get("/users/{user_id}")
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, user_id)
+    if user is None:
+        return {"disclaimer": DISCLAIMER, "error": "user_not_found"}
+    return {"disclaimer": DISCLAIMER, "user": user_payload(user)}
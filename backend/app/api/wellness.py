@@ -1,11 +1,10 @@
 from __future__ import annotations
 
-import os
 from fastapi import APIRouter
 from pydantic import BaseModel
 
 from app.rules.safety_guardrails import DISCLAIMER
-from app.vector.store import FaissVectorStore
+from app.vector.store import get_vector_store
 
 router = APIRouter()
 
@@ -17,7 +16,7 @@ class RetrieveRequest(BaseModel):
 
 @router.post("/wellness/retrieve")
 def retrieve(req: RetrieveRequest):
-    store = FaissVectorStore(data_dir=os.getenv("VECTOR_DATA_DIR", "./data"))
+    store = get_vector_store()
     chunks = store.search(req.query, k=req.k)
     return {
         "disclaimer": DISCLAIMER,
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+log = logging.getLogger("healthyfy")
+
+# Ordered, append-only list of (version, description, upgrade). Each upgrade
+# must be safe on a database that create_all() just built from the current
+# models (i.e. detect that there is nothing to do).
+Migration = Tuple[int, str, Callable[[Connection], None]]
+
+
+def _columns(conn: Connection, table: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _has_table(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def _drop_index_if_exists(conn: Connection, table: str, name: str) -> None:
+    if name not in {ix["name"] for ix in inspect(conn).get_indexes(table)}:
+        return
+    if conn.dialect.name == "mysql":
+        conn.execute(text(f"DROP INDEX {name} ON {table}"))
+    else:
+        conn.execute(text(f"DROP INDEX {name}"))
+
+
+def _habit_checkins_native_date(conn: Connection) -> None:
+    """habit_checkins.date_ymd VARCHAR(10) -> day DATE, unique per (user_id, habit_id, day)."""
+    if not _has_table(conn, "habit_checkins") or "date_ymd" not in _columns(conn, "habit_checkins"):
+        return
+    if "day" not in _columns(conn, "habit_checkins"):
+        conn.execute(text("ALTER TABLE habit_checkins ADD COLUMN day DATE NULL"))
+    # 'YYYY-MM-DD' strings convert implicitly on MySQL and are SQLite's DATE storage format.
+    conn.execute(text("UPDATE habit_checkins SET day = date_ymd WHERE day IS NULL"))
+    # Duplicate days were possible before; keep the newest row of each group so
+    # the unique index can be built. The derived table keeps MySQL happy.
+    conn.execute(
+        text(
+            "DELETE FROM habit_checkins WHERE id NOT IN ("
+            " SELECT id FROM (SELECT MAX(id) AS id FROM habit_checkins GROUP BY user_id, habit_id, day) AS keep)"
+        )
+    )
+    for name in (
+        "ix_habit_checkins_user_habit_date",
+        "ix_habit_checkins_date_ymd",
+        "ix_habit_checkins_user_id",
+        "ix_habit_checkins_habit_id",
+    ):
+        _drop_index_if_exists(conn, "habit_checkins", name)
+    conn.execute(text("ALTER TABLE habit_checkins DROP COLUMN date_ymd"))
+    if conn.dialect.name == "mysql":
+        conn.execute(text("ALTER TABLE habit_checkins MODIFY day DATE NOT NULL"))
+    conn.execute(
+        text("CREATE UNIQUE INDEX ux_habit_checkins_user_habit_day ON habit_checkins (user_id, habit_id, day)")
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    (1, "habit_checkins native DATE + unique (user_id, habit_id, day)", _habit_checkins_native_date),
+]
+
+
+def run_migrations(bind: Engine) -> List[int]:
+    """Apply pending migrations in order, recording each in `schema_migrations`.
+
+    Each migration runs in its own transaction (MySQL DDL still auto-commits,
+    so upgrades are written to be re-runnable). Returns the versions applied.
+    """
+    with bind.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY)"))
+        done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    applied: List[int] = []
+    for version, description, upgrade in MIGRATIONS:
+        if version in done:
+            continue
+        with bind.begin() as conn:
+            upgrade(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {"v": version})
+        log.info("Applied migration %s: %s", version, description)
+        applied.append(version)
+    return applied
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from datetime import datetime
-from sqlalchemy import String, DateTime, Integer, Text, ForeignKey, Boolean
+from datetime import date, datetime
+from sqlalchemy import String, Date, DateTime, Integer, Text, ForeignKey, Boolean, Index, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -21,9 +21,11 @@ class User(Base):
 
 class MoodEntry(Base):
     __tablename__ = "mood_entries"
+    # Keyset pagination: WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+    __table_args__ = (Index("ix_mood_entries_user_created", "user_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     mood: Mapped[str] = mapped_column(String(64))
     note: Mapped[str] = mapped_column(Text, default="")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -33,9 +35,10 @@ class MoodEntry(Base):
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
+    __table_args__ = (Index("ix_journal_entries_user_created", "user_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     prompt: Mapped[str] = mapped_column(String(255))
     entry: Mapped[str] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -45,9 +48,10 @@ class JournalEntry(Base):
 
 class Habit(Base):
     __tablename__ = "habits"
+    __table_args__ = (Index("ix_habits_user_active", "user_id", "active", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, index=True)
+    user_id: Mapped[int] = mapped_column(Integer)
     title: Mapped[str] = mapped_column(String(140))
     description: Mapped[str] = mapped_column(Text, default="")
     active: Mapped[bool] = mapped_column(Boolean, default=True)
@@ -56,20 +60,45 @@ class Habit(Base):
 
 class HabitCheckin(Base):
     __tablename__ = "habit_checkins"
+    __table_args__ = (
+        # One row per user/habit/day: upsert target, per-habit date ranges and
+        # streak aggregates are all range scans on this index.
+        Index("ux_habit_checkins_user_habit_day", "user_id", "habit_id", "day", unique=True),
+        # Keyset pagination over a user's check-ins.
+        Index("ix_habit_checkins_user_created", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, index=True)
-    habit_id: Mapped[int] = mapped_column(Integer, index=True)
-    date_ymd: Mapped[str] = mapped_column(String(10), index=True)  # YYYY-MM-DD
+    user_id: Mapped[int] = mapped_column(Integer)
+    habit_id: Mapped[int] = mapped_column(Integer)
+    day: Mapped[date] = mapped_column(Date)  # partition/retention key, see app.db.retention
     completed: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
+class HabitStreak(Base):
+    """Per user/habit streak rollup, kept in step with habit_checkins (see app.db.rollups)."""
+
+    __tablename__ = "habit_streaks"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    habit_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    current_streak: Mapped[int] = mapped_column(Integer, default=0)  # run ending at last_completed
+    longest_streak: Mapped[int] = mapped_column(Integer, default=0)
+    completed_days: Mapped[int] = mapped_column(Integer, default=0)
+    last_completed: Mapped[date | None] = mapped_column(Date, nullable=True)
+    # Bit i set = completed on (last_completed - i days), for the last 365 days.
+    recent_bitmap: Mapped[bytes] = mapped_column(LargeBinary(46), default=b"")
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class NutritionPreference(Base):
     __tablename__ = "nutrition_preferences"
+    # Latest preference per user: WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT 1
+    __table_args__ = (Index("ix_nutrition_preferences_user_created", "user_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, index=True)
+    user_id: Mapped[int] = mapped_column(Integer)
     preference: Mapped[str] = mapped_column(String(64), default="balanced")
     allergies: Mapped[str] = mapped_column(Text, default="")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
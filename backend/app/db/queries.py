@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import base64
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Date, Integer, and_, bindparam, case, func, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.db.models import HabitCheckin
+
+BULK_INSERT_CHUNK = 1000  # rows per INSERT ... VALUES statement
+# Dialects with a native multi-row upsert; others use `_upsert_checkins_portable`.
+NATIVE_UPSERT_DIALECTS = ("mysql", "sqlite", "postgresql")
+
+
+# --- keyset pagination -----------------------------------------------------
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of `encode_cursor`; raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        at, row_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(at), int(row_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+async def keyset_page(
+    db: AsyncSession, model: Any, user_id: int, limit: int, cursor: Optional[str] = None, *filters: Any
+) -> Tuple[List[Any], Optional[str]]:
+    """One page of `model` rows for a user, newest first, plus the next cursor.
+
+    Served by the `(user_id, created_at, id)` index: a range scan that starts
+    after the cursor, so deep pages cost the same as the first one.
+    """
+    stmt = select(model).where(model.user_id == user_id, *filters)
+    if cursor:
+        at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(model.created_at < at, and_(model.created_at == at, model.id < row_id)))
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+    rows = list((await db.execute(stmt)).scalars())
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+# --- habit check-ins -------------------------------------------------------
+
+
+class day_number(FunctionElement):
+    """Whole-day number of a DATE value, so consecutive dates differ by 1."""
+
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(day_number)
+def _day_number_default(element, compiler, **kw):  # PostgreSQL and others
+    return "(CAST(%s AS DATE) - DATE '1970-01-01')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, "sqlite")
+def _day_number_sqlite(element, compiler, **kw):
+    return "CAST(julianday(%s) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, "mysql")
+def _day_number_mysql(element, compiler, **kw):
+    return "TO_DAYS(%s)" % compiler.process(element.clauses, **kw)
+
+
+def _upsert_checkins_stmt(dialect_name: str, rows: List[Dict[str, Any]]):
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(HabitCheckin).values(rows)
+        return stmt.on_duplicate_key_update(completed=stmt.inserted.completed)
+    if dialect_name in ("sqlite", "postgresql"):
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        stmt = (sqlite_insert if dialect_name == "sqlite" else pg_insert)(HabitCheckin).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[HabitCheckin.user_id, HabitCheckin.habit_id, HabitCheckin.day],
+            set_={"completed": stmt.excluded.completed},
+        )
+    raise ValueError(f"no native upsert for {dialect_name}; use _upsert_checkins_portable")
+
+
+async def _upsert_checkins_portable(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Upsert without dialect support: SELECT the existing keys, UPDATE those, INSERT the rest.
+
+    The INSERT runs in a savepoint; if a concurrent writer inserted one of the
+    keys first, the unique index rejects it and the batch is retried as updates.
+    """
+    table = HabitCheckin.__table__
+    for attempt in range(2):
+        found = await db.execute(
+            select(table.c.id, table.c.user_id, table.c.habit_id, table.c.day).where(
+                table.c.user_id.in_(sorted({r["user_id"] for r in rows})),
+                table.c.habit_id.in_(sorted({r["habit_id"] for r in rows})),
+                table.c.day.in_(sorted({r["day"] for r in rows})),
+            )
+        )
+        existing = {(user_id, habit_id, day): row_id for row_id, user_id, habit_id, day in found}
+        updates, inserts = [], []
+        for r in rows:
+            row_id = existing.get((r["user_id"], r["habit_id"], r["day"]))
+            if row_id is None:
+                inserts.append(r)
+            else:
+                updates.append({"row_id": row_id, "new_completed": r["completed"]})
+        if updates:
+            stmt = update(table).where(table.c.id == bindparam("row_id")).values(completed=bindparam("new_completed"))
+            await db.execute(stmt, updates)
+        if not inserts:
+            return
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(table), inserts)
+            return
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+async def upsert_checkins(db: AsyncSession, rows: Sequence[Dict[str, Any]]) -> int:
+    """Idempotently record habit check-ins with multi-row INSERT ... ON CONFLICT/DUPLICATE KEY.
+
+    Keyed by the unique (user_id, habit_id, day) index: replaying the same
+    batch leaves one row per day, with `completed` taken from the latest write
+    and the original `created_at` kept.
+    """
+    # Last write wins inside a batch too (a single statement can't touch a row twice on PostgreSQL).
+    latest = {(r["user_id"], r["habit_id"], r["day"]): r for r in rows}
+    unique = list(latest.values())
+    dialect_name = db.get_bind().dialect.name
+    for start in range(0, len(unique), BULK_INSERT_CHUNK):
+        chunk = unique[start : start + BULK_INSERT_CHUNK]
+        if dialect_name in NATIVE_UPSERT_DIALECTS:
+            await db.execute(_upsert_checkins_stmt(dialect_name, chunk))
+        else:
+            await _upsert_checkins_portable(db, chunk)
+    return len(unique)
+
+
+async def checkins_between(
+    db: AsyncSession, user_id: int, habit_id: int, since: date, until: date
+) -> List[HabitCheckin]:
+    """One habit's check-ins over a date range: a single unique-index range scan."""
+    stmt = (
+        select(HabitCheckin)
+        .where(
+            HabitCheckin.user_id == user_id,
+            HabitCheckin.habit_id == habit_id,
+            HabitCheckin.day >= since,
+            HabitCheckin.day <= until,
+        )
+        .order_by(HabitCheckin.day)
+    )
+    return list((await db.execute(stmt)).scalars())
+
+
+async def habit_stats(
+    db: AsyncSession,
+    user_id: int,
+    today: date,
+    window_days: int = 30,
+    habit_ids: Optional[Iterable[int]] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """Current/longest streak and completion rate per habit, aggregated in SQL.
+
+    Streaks use gaps-and-islands: over a habit's completed days (unique per day),
+    `day - row_number()` is constant within a run of consecutive days, so each
+    run is one GROUP BY bucket. A run is "current" if it ends today or
+    yesterday. The completion rate is distinct completed days within the last
+    `window_days` (including today) divided by `window_days`.
+    """
+    d = HabitCheckin.day
+    filters = [HabitCheckin.user_id == user_id, HabitCheckin.completed.is_(True)]
+    if habit_ids is not None:
+        filters.append(HabitCheckin.habit_id.in_(list(habit_ids)))
+
+    days = (
+        select(HabitCheckin.habit_id.label("habit_id"), day_number(d).label("day_n"), d.label("day"))
+        .where(*filters)
+        .subquery("days")
+    )
+    islands = select(
+        days.c.habit_id,
+        days.c.day_n,
+        (days.c.day_n - func.row_number().over(partition_by=days.c.habit_id, order_by=days.c.day_n)).label("grp"),
+    ).subquery("islands")
+    runs = (
+        select(
+            islands.c.habit_id,
+            func.count().label("length"),
+            func.max(islands.c.day_n).label("end_day"),
+        )
+        .group_by(islands.c.habit_id, islands.c.grp)
+        .subquery("runs")
+    )
+    today_n = day_number(literal(today, Date()))
+    streaks = (
+        select(
+            runs.c.habit_id,
+            func.max(runs.c.length).label("longest"),
+            func.max(case((runs.c.end_day >= today_n - 1, runs.c.length), else_=0)).label("current"),
+        )
+        .group_by(runs.c.habit_id)
+        .subquery("streaks")
+    )
+    totals = (
+        select(
+            days.c.habit_id,
+            func.count().label("completed_days"),
+            func.sum(case((days.c.day_n > today_n - window_days, 1), else_=0)).label("window_completed"),
+            func.max(days.c.day).label("last_completed"),
+        )
+        .group_by(days.c.habit_id)
+        .subquery("totals")
+    )
+    stmt = select(
+        totals.c.habit_id,
+        totals.c.completed_days,
+        totals.c.window_completed,
+        totals.c.last_completed,
+        streaks.c.longest,
+        streaks.c.current,
+    ).join(streaks, streaks.c.habit_id == totals.c.habit_id)
+
+    out: Dict[int, Dict[str, Any]] = {}
+    for row in (await db.execute(stmt)).mappings():
+        window_completed = int(row["window_completed"] or 0)
+        out[int(row["habit_id"])] = {
+            "current_streak": int(row["current"] or 0),
+            "longest_streak": int(row["longest"] or 0),
+            "completed_days": int(row["completed_days"] or 0),
+            "last_completed": str(row["last_completed"]) if row["last_completed"] is not None else None,
+            "window_days": window_days,
+            "completion_rate": window_completed / window_days if window_days else 0.0,
+        }
+    return out
@@ -0,0 +1,206 @@
+"""Retention and partitioning for `habit_checkins`.
+
+Scheme (keyed on the `day` DATE column):
+
+  - MySQL: RANGE COLUMNS(day) partitions, one per calendar month, plus a
+    catch-all `pmax`. MySQL requires the partition column in every unique key,
+    so the primary key becomes (id, day); the (user_id, habit_id, day) unique
+    index already includes it. Queries filtered on `day` prune to the matching
+    months, and retention is `DROP PARTITION` (metadata only, no row deletes).
+    `rollover` splits `pmax` to keep HABIT_PARTITIONS_AHEAD future months.
+  - Other databases (SQLite in dev): retention deletes rows older than the
+    cutoff in primary-key batches, so no single statement holds long locks.
+
+Streak history that must outlive retention belongs in the rollup table, not
+in raw check-ins.
+
+Run from backend/:
+  python -m app.db.retention plan                   # print the DDL / deletes that would run
+  python -m app.db.retention apply                  # execute them
+  python -m app.db.retention partition-init         # MySQL: one-time PARTITION BY (prints unless --apply)
+
+Env vars:
+  - HABIT_RETENTION_DAYS (default: 730)
+  - HABIT_PARTITIONS_AHEAD (default: 3) — future monthly partitions to keep ready
+  - HABIT_PURGE_BATCH (default: 5000) — rows per DELETE on non-partitioned databases
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger("healthyfy")
+
+TABLE = "habit_checkins"
+_PARTITION_RE = re.compile(r"^p(\d{4})(\d{2})$")
+
+
+def retention_days() -> int:
+    return int(os.getenv("HABIT_RETENTION_DAYS", "730"))
+
+
+def partitions_ahead() -> int:
+    return int(os.getenv("HABIT_PARTITIONS_AHEAD", "3"))
+
+
+def purge_batch() -> int:
+    return int(os.getenv("HABIT_PURGE_BATCH", "5000"))
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _add_months(d: date, months: int) -> date:
+    total = d.year * 12 + (d.month - 1) + months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def _partition_clause(month: date) -> str:
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{_add_months(month, 1).isoformat()}')"
+
+
+def partition_init_ddl(first_month: date, today: date, ahead: int) -> List[str]:
+    """One-time MySQL DDL: (id, day) primary key and monthly RANGE COLUMNS partitions."""
+    months = []
+    m = _month_start(first_month)
+    end = _add_months(_month_start(today), ahead)
+    while m <= end:
+        months.append(m)
+        m = _add_months(m, 1)
+    parts = ",\n  ".join([_partition_clause(m) for m in months] + ["PARTITION pmax VALUES LESS THAN (MAXVALUE)"])
+    return [
+        f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, day)",
+        f"ALTER TABLE {TABLE} PARTITION BY RANGE COLUMNS(day) (\n  {parts}\n)",
+    ]
+
+
+@dataclass
+class RetentionPlan:
+    cutoff: date  # rows with day < cutoff are expired
+    statements: List[str]
+
+
+def plan_partitioned(existing: List[str], today: date, keep_days: int, ahead: int) -> RetentionPlan:
+    """MySQL: drop whole months that end before the cutoff; split `pmax` for future months."""
+    cutoff = today - timedelta(days=keep_days)
+    months = sorted(
+        date(int(m.group(1)), int(m.group(2)), 1) for m in (_PARTITION_RE.match(p) for p in existing) if m
+    )
+    statements: List[str] = []
+
+    # A month is dropped only when all of it is older than the cutoff.
+    expired = [m for m in months if _add_months(m, 1) <= cutoff]
+    if expired:
+        statements.append(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(partition_name(m) for m in expired)}")
+
+    last = months[-1] if months else _add_months(_month_start(today), -1)
+    target = _add_months(_month_start(today), ahead)
+    new = []
+    m = _add_months(last, 1)
+    while m <= target:
+        new.append(m)
+        m = _add_months(m, 1)
+    if new:
+        parts = ", ".join([_partition_clause(m) for m in new] + ["PARTITION pmax VALUES LESS THAN (MAXVALUE)"])
+        statements.append(f"ALTER TABLE {TABLE} REORGANIZE PARTITION pmax INTO ({parts})")
+    return RetentionPlan(cutoff=cutoff, statements=statements)
+
+
+def mysql_partitions(engine: Engine) -> List[str]:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL"
+            ),
+            {"t": TABLE},
+        )
+        return [r[0] for r in rows]
+
+
+def purge_before(engine: Engine, cutoff: date, batch: Optional[int] = None) -> int:
+    """Delete expired rows in primary-key batches; returns the number deleted."""
+    batch = batch or purge_batch()
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            ids = [
+                r[0]
+                for r in conn.execute(
+                    text(f"SELECT id FROM {TABLE} WHERE day < :cutoff ORDER BY id LIMIT :n"),
+                    {"cutoff": cutoff, "n": batch},
+                )
+            ]
+            if not ids:
+                return deleted
+            conn.execute(
+                text(f"DELETE FROM {TABLE} WHERE id IN ({', '.join(str(int(i)) for i in ids)})")
+            )
+        deleted += len(ids)
+
+
+def enforce_retention(engine: Engine, today: Optional[date] = None, apply: bool = False) -> RetentionPlan:
+    today = today or date.today()
+    keep = retention_days()
+    if engine.dialect.name == "mysql":
+        existing = mysql_partitions(engine)
+        if existing:
+            plan = plan_partitioned(existing, today, keep, partitions_ahead())
+            if apply:
+                with engine.begin() as conn:
+                    for stmt in plan.statements:
+                        conn.execute(text(stmt))
+            return plan
+        log.warning("%s is not partitioned; falling back to batched deletes", TABLE)
+
+    cutoff = today - timedelta(days=keep)
+    plan = RetentionPlan(cutoff=cutoff, statements=[f"DELETE FROM {TABLE} WHERE day < '{cutoff.isoformat()}' (batched)"])
+    if apply:
+        n = purge_before(engine, cutoff)
+        log.info("Purged %s expired habit check-ins (day < %s)", n, cutoff)
+    return plan
+
+
+def main() -> None:
+    from app.db.session import get_engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["plan", "apply", "partition-init"])
+    parser.add_argument("--apply", action="store_true", help="partition-init: execute instead of printing.")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.command == "partition-init":
+        if engine.dialect.name != "mysql":
+            raise SystemExit("partition-init is MySQL-only")
+        with engine.connect() as conn:
+            first = conn.execute(text(f"SELECT MIN(day) FROM {TABLE}")).scalar() or date.today()
+        statements = partition_init_ddl(first, date.today(), partitions_ahead())
+        if args.apply:
+            with engine.begin() as conn:
+                for stmt in statements:
+                    conn.execute(text(stmt))
+        print(";\n".join(statements) + ";")
+        return
+
+    plan = enforce_retention(engine, apply=args.command == "apply")
+    print(f"cutoff: {plan.cutoff.isoformat()}")
+    for stmt in plan.statements:
+        print(stmt)
+
+
+if __name__ == "__main__":
+    main()
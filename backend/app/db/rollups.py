@@ -0,0 +1,344 @@
+"""Habit streak rollups (`habit_streaks`), maintained with every check-in write.
+
+Each (user, habit) row stores the current and longest streak, the number of
+completed days, the last completed day and a 365-bit bitmap of recent days
+anchored at `last_completed`. Dashboards read one row per habit by primary
+key instead of scanning `habit_checkins`.
+
+Updates are applied in the same transaction as the check-in upsert. Most
+writes (today / a recent day) are O(1) bit operations. Cases the bitmap can't
+decide exactly fall back to recomputing that one habit from its raw rows, a
+range scan on the (user_id, habit_id, day) unique index. Those cases are
+un-completing a day, or a run that extends past the 365-day window.
+
+Rebuild every rollup from raw rows (batched by user):
+  python -m app.db.rollups rebuild [--batch-users 500] [--user-id N]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import HabitCheckin, HabitStreak
+
+log = logging.getLogger("healthyfy")
+
+WINDOW_DAYS = 365
+BITMAP_BYTES = (WINDOW_DAYS + 7) // 8
+_MASK = (1 << WINDOW_DAYS) - 1
+
+
+def _bits(r: HabitStreak) -> int:
+    return int.from_bytes(r.recent_bitmap or b"", "little")
+
+
+def _set_bits(r: HabitStreak, bits: int) -> None:
+    r.recent_bitmap = (bits & _MASK).to_bytes(BITMAP_BYTES, "little")
+
+
+def _run_at(bits: int, pos: int) -> Tuple[int, int]:
+    """Bit range [lo, hi] of the run of set bits containing `pos`."""
+    lo = hi = pos
+    while lo > 0 and (bits >> (lo - 1)) & 1:
+        lo -= 1
+    while hi < WINDOW_DAYS - 1 and (bits >> (hi + 1)) & 1:
+        hi += 1
+    return lo, hi
+
+
+def new_rollup(user_id: int, habit_id: int) -> HabitStreak:
+    r = HabitStreak(user_id=user_id, habit_id=habit_id)
+    reset_rollup(r, [])
+    return r
+
+
+def reset_rollup(r: HabitStreak, days: Sequence[date]) -> None:
+    """Recompute a rollup exactly from all completed days (ascending, unique)."""
+    r.completed_days = len(days)
+    r.last_completed = days[-1] if days else None
+    longest = current = 0
+    prev: Optional[date] = None
+    bits = 0
+    for d in days:
+        current = current + 1 if prev is not None and (d - prev).days == 1 else 1
+        longest = max(longest, current)
+        prev = d
+        age = (days[-1] - d).days
+        if age < WINDOW_DAYS:
+            bits |= 1 << age
+    r.current_streak = current
+    r.longest_streak = longest
+    _set_bits(r, bits)
+
+
+def _apply_completed(r: HabitStreak, day: date) -> bool:
+    """Mark `day` completed; False if the result can't be derived from the rollup alone."""
+    last = r.last_completed
+    bits = _bits(r)
+    if last is None:
+        r.last_completed, r.current_streak, r.completed_days = day, 1, 1
+        r.longest_streak = max(r.longest_streak or 0, 1)
+        _set_bits(r, 1)
+        return True
+
+    if day > last:
+        shift = (day - last).days
+        r.current_streak = r.current_streak + 1 if shift == 1 else 1
+        r.last_completed = day
+        r.completed_days += 1
+        r.longest_streak = max(r.longest_streak, r.current_streak)
+        _set_bits(r, ((bits << shift) | 1) if shift < WINDOW_DAYS else 1)
+        return True
+
+    pos = (last - day).days
+    if pos >= WINDOW_DAYS:
+        return False
+    if (bits >> pos) & 1:
+        return True  # already counted
+    bits |= 1 << pos
+    r.completed_days += 1
+    lo, hi = _run_at(bits, pos)
+    if hi == WINDOW_DAYS - 1:
+        return False  # the run may continue before the window
+    length = hi - lo + 1
+    if lo == 0:
+        r.current_streak = length
+    r.longest_streak = max(r.longest_streak, length)
+    _set_bits(r, bits)
+    return True
+
+
+def _apply(r: HabitStreak, day: date, completed: bool) -> bool:
+    if completed:
+        return _apply_completed(r, day)
+    last = r.last_completed
+    if last is None or day > last:
+        return True  # was never completed
+    pos = (last - day).days
+    if pos < WINDOW_DAYS and not (_bits(r) >> pos) & 1:
+        return True
+    # Un-completing can split a run or lower the longest streak: recompute.
+    return False
+
+
+async def _completed_days(db: AsyncSession, user_id: int, habit_id: int) -> List[date]:
+    stmt = (
+        select(HabitCheckin.day)
+        .where(
+            HabitCheckin.user_id == user_id,
+            HabitCheckin.habit_id == habit_id,
+            HabitCheckin.completed.is_(True),
+        )
+        .order_by(HabitCheckin.day)
+    )
+    return list((await db.execute(stmt)).scalars())
+
+
+def _empty_rows(user_id: int, habit_ids: Sequence[int]) -> List[Dict[str, Any]]:
+    empty = new_rollup(user_id, 0)
+    return [
+        {
+            "user_id": user_id,
+            "habit_id": habit_id,
+            "current_streak": empty.current_streak,
+            "longest_streak": empty.longest_streak,
+            "completed_days": empty.completed_days,
+            "last_completed": empty.last_completed,
+            "recent_bitmap": empty.recent_bitmap,
+        }
+        for habit_id in habit_ids
+    ]
+
+
+def _insert_missing_stmt(dialect_name: str, user_id: int, habit_ids: Sequence[int]):
+    """INSERT empty rollups for (user_id, habit_id) pairs, skipping rows that already exist.
+
+    None for dialects without an insert-if-absent form (see `_insert_missing`).
+    """
+    rows = _empty_rows(user_id, habit_ids)
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        # A no-op update rather than INSERT IGNORE: on a duplicate, IGNORE takes a
+        # shared lock, and two writers upgrading it for FOR UPDATE deadlock.
+        stmt = mysql_insert(HabitStreak).values(rows)
+        return stmt.on_duplicate_key_update(user_id=stmt.inserted.user_id)
+    if dialect_name in ("sqlite", "postgresql"):
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        stmt = (sqlite_insert if dialect_name == "sqlite" else pg_insert)(HabitStreak).values(rows)
+        return stmt.on_conflict_do_nothing(index_elements=[HabitStreak.user_id, HabitStreak.habit_id])
+    return None
+
+
+async def _insert_missing(db: AsyncSession, user_id: int, habit_ids: Sequence[int]) -> None:
+    stmt = _insert_missing_stmt(db.get_bind().dialect.name, user_id, habit_ids)
+    if stmt is not None:
+        await db.execute(stmt)
+        return
+    # Other dialects: insert the rows a SELECT doesn't find, one savepoint per
+    # row so a rollup a concurrent writer just created is simply skipped.
+    found = await db.execute(
+        select(HabitStreak.habit_id).where(HabitStreak.user_id == user_id, HabitStreak.habit_id.in_(habit_ids))
+    )
+    have = set(found.scalars())
+    for row in _empty_rows(user_id, [h for h in habit_ids if h not in have]):
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(HabitStreak), [row])
+        except IntegrityError:
+            pass
+
+
+async def apply_checkins(db: AsyncSession, user_id: int, rows: Iterable[Dict[str, Any]]) -> Dict[int, HabitStreak]:
+    """Fold written check-ins into the rollups, inside the caller's transaction.
+
+    Call after the check-in rows are written and before commit. Missing rollup
+    rows are inserted first (insert-if-absent), then all are locked with
+    SELECT ... FOR UPDATE in habit order, so concurrent writers serialize per habit.
+    """
+    latest: Dict[Tuple[int, date], bool] = {}
+    for row in rows:
+        latest[(int(row["habit_id"]), row["day"])] = bool(row.get("completed", True))
+    changes: Dict[int, List[Tuple[date, bool]]] = {}
+    for (habit_id, day), completed in sorted(latest.items(), key=lambda kv: kv[0][1]):
+        changes.setdefault(habit_id, []).append((day, completed))
+    if not changes:
+        return {}
+
+    habit_ids = sorted(changes)
+    # FOR UPDATE locks nothing for a missing row, so create absent rollups
+    # first; two first check-ins for a habit then queue on the same row lock.
+    await _insert_missing(db, user_id, habit_ids)
+    stmt = (
+        select(HabitStreak)
+        .where(HabitStreak.user_id == user_id, HabitStreak.habit_id.in_(habit_ids))
+        .order_by(HabitStreak.habit_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    rollups = {r.habit_id: r for r in (await db.execute(stmt)).scalars()}
+    for habit_id, habit_changes in changes.items():
+        r = rollups[habit_id]
+        if not all(_apply(r, day, completed) for day, completed in habit_changes):
+            reset_rollup(r, await _completed_days(db, user_id, habit_id))
+    return rollups
+
+
+def rollup_summary(r: Optional[HabitStreak], today: date, window_days: int = 30) -> Dict[str, Any]:
+    """Dashboard view of a rollup as of `today` (a streak is current if it reached today or yesterday)."""
+    window_days = max(1, min(window_days, WINDOW_DAYS))
+    if r is None or r.last_completed is None:
+        return {
+            "current_streak": 0,
+            "longest_streak": 0,
+            "completed_days": 0,
+            "last_completed": None,
+            "window_days": window_days,
+            "completion_rate": 0.0,
+            "last_7_days": [False] * 7,
+        }
+    bits = _bits(r)
+    offset = (today - r.last_completed).days  # bit i is the day (today - offset - i)
+
+    def done(days_ago: int) -> bool:
+        i = days_ago - offset
+        return 0 <= i < WINDOW_DAYS and bool((bits >> i) & 1)
+
+    in_window = sum(1 for k in range(window_days) if done(k))
+    return {
+        "current_streak": r.current_streak if offset <= 1 else 0,
+        "longest_streak": r.longest_streak,
+        "completed_days": r.completed_days,
+        "last_completed": r.last_completed.isoformat(),
+        "window_days": window_days,
+        "completion_rate": in_window / window_days,
+        "last_7_days": [done(k) for k in range(6, -1, -1)],  # oldest -> today
+    }
+
+
+def rebuild(engine: Engine, batch_users: int = 500, user_id: Optional[int] = None) -> int:
+    """Recompute rollups from raw check-ins, one transaction per batch of users.
+
+    Only rows still present count, so after a retention purge (app.db.retention)
+    rebuilt longest streaks and totals reflect the retained period.
+    """
+    from sqlalchemy.orm import Session
+
+    rebuilt = 0
+    after = -1
+    while True:
+        with Session(engine) as db, db.begin():
+            if user_id is not None:
+                users = [user_id] if after < user_id else []
+            else:
+                users = list(
+                    db.execute(
+                        select(HabitCheckin.user_id)
+                        .where(HabitCheckin.user_id > after)
+                        .distinct()
+                        .order_by(HabitCheckin.user_id)
+                        .limit(batch_users)
+                    ).scalars()
+                )
+            if not users:
+                return rebuilt
+
+            days: Dict[Tuple[int, int], List[date]] = {}
+            rows = db.execute(
+                select(HabitCheckin.user_id, HabitCheckin.habit_id, HabitCheckin.day)
+                .where(HabitCheckin.user_id.in_(users), HabitCheckin.completed.is_(True))
+                .order_by(HabitCheckin.user_id, HabitCheckin.habit_id, HabitCheckin.day)
+            )
+            for uid, hid, day in rows:
+                days.setdefault((uid, hid), []).append(day)
+
+            values = []
+            for (uid, hid), habit_days in days.items():
+                r = new_rollup(uid, hid)
+                reset_rollup(r, habit_days)
+                values.append(
+                    {
+                        "user_id": uid,
+                        "habit_id": hid,
+                        "current_streak": r.current_streak,
+                        "longest_streak": r.longest_streak,
+                        "completed_days": r.completed_days,
+                        "last_completed": r.last_completed,
+                        "recent_bitmap": r.recent_bitmap,
+                    }
+                )
+            db.execute(delete(HabitStreak).where(HabitStreak.user_id.in_(users)))
+            if values:
+                db.execute(insert(HabitStreak).values(values))
+            rebuilt += len(values)
+        after = users[-1]
+        log.info("Rebuilt habit streak rollups through user %s (%s total)", after, rebuilt)
+
+
+def main() -> None:
+    from app.db.session import Base, get_engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--batch-users", type=int, default=500)
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine, tables=[HabitStreak.__table__])
+    n = rebuild(engine, batch_users=args.batch_users, user_id=args.user_id)
+    print(f"rebuilt {n} habit streak rollups")
+
+
+if __name__ == "__main__":
+    main()
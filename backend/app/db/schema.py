@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import logging
+from typing import List
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app.db import models  # noqa: F401  (registers tables on Base.metadata)
+from app.db.session import Base
+
+log = logging.getLogger("healthyfy")
+
+
+def ensure_indexes(bind: Engine) -> List[str]:
+    """Create model indexes that are missing from existing tables.
+
+    `create_all` only emits indexes together with new tables, so databases
+    created before an index was added to the models would never get it.
+    Returns the names of the indexes created.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    created: List[str] = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name and index.name not in present:
+                index.create(bind=bind)
+                created.append(index.name)
+    if created:
+        log.info("Created missing indexes: %s", ", ".join(created))
+    return created
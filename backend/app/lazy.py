@@ -0,0 +1,54 @@
+"""Deferred imports for heavy optional dependencies (numpy, faiss, httpx).
+
+`np = lazy_import("numpy")` binds a placeholder module; the real import runs
+on the first attribute access (a request or startup warm-up) instead of when
+the worker imports the app. After that the placeholder holds the real
+module's namespace, so later lookups cost the same as a normal import.
+
+Annotations stay valid because every module using this has
+`from __future__ import annotations`.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+import types
+from typing import Any, Dict
+
+_lock = threading.Lock()
+_proxies: Dict[str, "_LazyModule"] = {}
+
+
+class _LazyModule(types.ModuleType):
+    def _load(self) -> types.ModuleType:
+        with _lock:
+            module = self.__dict__.get("_lazy_module")
+            if module is None:
+                module = importlib.import_module(self.__name__)
+                self.__dict__.update(module.__dict__)
+                self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        # Only called for names not in __dict__, i.e. before the first load.
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if "_lazy_module" in self.__dict__ else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> Any:
+    """Module placeholder that imports `name` on first use (the real module if already imported)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    with _lock:
+        proxy = _proxies.get(name)
+        if proxy is None:
+            proxy = _proxies[name] = _LazyModule(name)
+    return proxy
+
+
+def is_loaded(name: str) -> bool:
+    return name in sys.modules
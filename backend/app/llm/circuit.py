@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the provider while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for the hosted LLM.
+
+    closed: calls go through; `failure_threshold` consecutive failures open it.
+    open: calls fail fast (callers fall back to offline replies) until
+    `reset_after_s` has passed, then one probe call is let through (half_open).
+    The probe's outcome closes or re-opens the circuit.
+
+    Env vars:
+      - LLM_CIRCUIT_FAILURES (default: 5)
+      - LLM_CIRCUIT_RESET_S (default: 30)
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_after_s: Optional[float] = None) -> None:
+        self.failure_threshold = max(1, failure_threshold or int(os.getenv("LLM_CIRCUIT_FAILURES", "5")))
+        self.reset_after_s = reset_after_s if reset_after_s is not None else float(os.getenv("LLM_CIRCUIT_RESET_S", "30"))
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.last_error: Optional[str] = None
+        self.opened_total = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_after_s:
+                return "half_open"
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.reset_after_s:
+                    return False
+                self._state = "half_open"
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def abandon(self) -> None:
+        """A call ended without an outcome (e.g. cancelled): free the half-open probe slot."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Any = None) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if error is not None:
+                self.last_error = f"{type(error).__name__}: {error}"[:200]
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.opened_total += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            retry_in = max(0.0, self.reset_after_s - (time.monotonic() - self._opened_at)) if state == "open" else 0.0
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_after_s": self.reset_after_s,
+                "retry_in_s": round(retry_in, 3),
+                "opened_total": self.opened_total,
+                "last_error": self.last_error,
+            }
@@ -1,18 +1,108 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import os
 from dataclasses import dataclass
 from typing import Any, Optional
 
-import httpx
+from app.lazy import lazy_import
+from app.llm.circuit import CircuitBreaker, CircuitOpenError
+from app.llm.prompt_builder import PromptBuilder
+from app.observability.metrics import LLM_REQUESTS, record_llm_usage
 
-from app.llm.prompts import SYSTEM_PROMPT
+# Loaded with the first client (warm-up or first hosted LLM call).
+httpx = lazy_import("httpx")
 
 
 @dataclass
 class LLMResponse:
     text: str
+    # Estimated prompt token breakdown (see PromptBuilder) and provider-reported usage.
+    prompt_tokens: Optional[dict[str, int]] = None
+    usage: Optional[dict[str, int]] = None
+
+
+# Shared so per-request token metrics aggregate across client instances.
+default_prompt_builder = PromptBuilder()
+
+# One breaker per process: every client talks to the same provider.
+llm_circuit = CircuitBreaker()
+
+# Keep-alive connection pool shared by all clients, bound to the event loop
+# that created it (opened at startup, closed at shutdown, or when that loop
+# ends; see `_close_with_loop`).
+_http: Optional[httpx.AsyncClient] = None
+_http_loop: Optional[asyncio.AbstractEventLoop] = None
+_http_pin: Any = None
+
+
+async def _close_with_loop(client: httpx.AsyncClient):
+    """Async generator parked on the client's loop until that loop shuts down.
+
+    asyncio.run() (uvicorn, TestClient's portal, bench runs) closes pending
+    async generators before closing the loop, so the pool's connections are
+    closed while their loop can still run the close. Once it is closed the
+    sockets can't be shut down cleanly any more.
+    """
+    try:
+        yield
+    finally:
+        if not client.is_closed:
+            await client.aclose()
+
+
+def _retire(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    # A client replaced while its loop still runs (another thread) is closed there;
+    # one whose loop ended was already closed by `_close_with_loop`.
+    if client.is_closed or loop is None or loop.is_closed() or not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    except RuntimeError:  # the loop closed in between
+        pass
+
+
+def http_client() -> httpx.AsyncClient:
+    global _http, _http_loop, _http_pin
+    loop = asyncio.get_running_loop()
+    if _http is None or _http.is_closed or _http_loop is not loop:
+        if _http is not None:
+            _retire(_http, _http_loop)
+        _http = httpx.AsyncClient(
+            timeout=float(os.getenv("LLM_TIMEOUT_S", "30")),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+            ),
+        )
+        _http_loop = loop
+        _http_pin = _close_with_loop(_http)
+        loop.create_task(_park(_http_pin))
+    return _http
+
+
+async def _park(pin: Any) -> None:
+    # First iteration inside the loop registers the generator with it.
+    await pin.__anext__()
+
+
+def http_client_open() -> bool:
+    return _http is not None and not _http.is_closed
+
+
+async def close_http_client() -> None:
+    global _http, _http_loop, _http_pin
+    client, _http, _http_loop, _http_pin = _http, None, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def _counts_as_failure(exc: BaseException) -> bool:
+    # Provider trouble trips the breaker; a request the provider rejects as invalid does not.
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return code >= 500 or code in (408, 429)
+    return True
 
 
 class LLMClient:
@@ -25,16 +115,36 @@ class LLMClient:
       - LLM_BASE_URL (default: https://api.openai.com/v1)
       - LLM_API_KEY
       - LLM_MODEL (default: gpt-4o-mini)
+      - LLM_PROMPT_TOKEN_BUDGET (default: 1200; see PromptBuilder)
+      - LLM_TIMEOUT_S (default: 30) / LLM_MAX_CONNECTIONS (default: 20) — shared connection pool
+      - LLM_CIRCUIT_FAILURES / LLM_CIRCUIT_RESET_S — see CircuitBreaker
     """
 
-    def __init__(self):
+    temperature = 0.4
+
+    def __init__(self, prompt_builder: Optional[PromptBuilder] = None):
         self.base_url = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1").rstrip("/")
         self.api_key = os.getenv("LLM_API_KEY", "")
         self.model = os.getenv("LLM_MODEL", "gpt-4o-mini")
+        self.prompt_builder = prompt_builder or default_prompt_builder
 
     def is_configured(self) -> bool:
         return bool(self.api_key)
 
+    def is_available(self) -> bool:
+        """Configured and the circuit is not open (a half-open probe counts as available)."""
+        return self.is_configured() and llm_circuit.state != "open"
+
+    async def warm(self) -> dict[str, Any]:
+        """Open the shared pool and, when configured, one keep-alive connection to the provider."""
+        client = http_client()
+        if not self.is_configured():
+            return {"connected": False}
+        resp = await client.get(
+            f"{self.base_url}/models", headers={"Authorization": f"Bearer {self.api_key}"}, timeout=5.0
+        )
+        return {"connected": True, "status": resp.status_code}
+
     async def chat(self, user_text: str, context: Optional[dict[str, Any]] = None) -> LLMResponse:
         if not self.is_configured():
             # Deterministic fallback: still provides usable, non-medical help.
@@ -45,27 +155,44 @@ class LLMClient:
                 )
             )
 
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-        ]
-        if context:
-            messages.append({"role": "system", "content": f"Context: {json.dumps(context, ensure_ascii=False)}"})
-        messages.append({"role": "user", "content": user_text})
+        # Context is trimmed by priority to fit the prompt token budget.
+        prompt = self.prompt_builder.build(model=self.model, user_text=user_text, context=context, temperature=self.temperature)
+        return await self._post(prompt.body, prompt.stats.as_dict())
 
+    async def complete(self, prompt: str) -> str:
+        """Single-turn completion returning raw text (the goal coach asks for JSON)."""
+        if not self.is_configured():
+            raise RuntimeError("LLM is not configured (LLM_API_KEY unset)")
+        built = self.prompt_builder.build(model=self.model, user_text=prompt, temperature=self.temperature)
+        resp = await self._post(built.body, built.stats.as_dict())
+        return resp.text
+
+    async def _post(self, body: bytes, prompt_tokens: dict[str, int]) -> LLMResponse:
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.4,
-        }
-
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(f"{self.base_url}/chat/completions", headers=headers, json=payload)
+        if not llm_circuit.allow():
+            LLM_REQUESTS.inc(("short_circuited",))
+            raise CircuitOpenError("LLM circuit is open")
+        try:
+            resp = await http_client().post(f"{self.base_url}/chat/completions", headers=headers, content=body)
             resp.raise_for_status()
             data = resp.json()
             text = data["choices"][0]["message"]["content"]
-            return LLMResponse(text=text)
+            usage = data.get("usage") or None
+        except Exception as exc:
+            LLM_REQUESTS.inc(("error",))
+            if _counts_as_failure(exc):
+                llm_circuit.record_failure(exc)
+            else:
+                llm_circuit.abandon()
+            raise
+        except BaseException:
+            llm_circuit.abandon()
+            raise
+        llm_circuit.record_success()
+        LLM_REQUESTS.inc(("ok",))
+        record_llm_usage(prompt_tokens, usage)
+        return LLMResponse(text=text, prompt_tokens=prompt_tokens, usage=usage)
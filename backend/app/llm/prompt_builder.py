@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import copy
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Optional
+
+from app.llm.prompts import SYSTEM_PROMPT
+from app.llm.tokens import estimate_tokens
+from app.observability.metrics import CACHE_REQUESTS, lru_cache_source
+
+
+# Known user_context fields, most important first. Unknown keys rank below all of these.
+USER_CONTEXT_PRIORITY = (
+    "fitness_level",
+    "diet_preference",
+    "allergies",
+    "goals",
+    "stress_level",
+    "sleep_hours",
+    "equipment",
+    "display_name",
+)
+
+MAX_LIST_ITEMS = 3
+MAX_STRING_CHARS = 120
+
+# Every chat message carries a few tokens of role/format overhead.
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+@dataclass
+class PromptStats:
+    budget: int
+    system_tokens: int
+    context_tokens: int
+    user_tokens: int
+    trimmed: list[str] = field(default_factory=list)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.system_tokens + self.context_tokens + self.user_tokens
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "budget": self.budget,
+            "system": self.system_tokens,
+            "context": self.context_tokens,
+            "user": self.user_tokens,
+            "total": self.total_tokens,
+            "trimmed": len(self.trimmed),
+        }
+
+
+@dataclass
+class BuiltPrompt:
+    body: bytes
+    stats: PromptStats
+
+
+@lru_cache(maxsize=8)
+def _static_prefix(model: str, temperature: float) -> bytes:
+    """Serialized request body up to (and including) the static system message."""
+    head = _dumps({"model": model, "temperature": temperature})[:-1]
+    system = _dumps({"role": "system", "content": SYSTEM_PROMPT})
+    return f'{head},"messages":[{system}'.encode("utf-8")
+
+
+CACHE_REQUESTS.add_callback(lru_cache_source("prompt_prefix", _static_prefix))
+
+
+@lru_cache(maxsize=1)
+def _system_tokens() -> int:
+    return estimate_tokens(SYSTEM_PROMPT) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def prime(model: str, temperature: float) -> None:
+    """Build the cached static prefix and system token count ahead of the first request."""
+    _static_prefix(model, temperature)
+    _system_tokens()
+
+
+def _clip(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_clip(v) for v in value[:MAX_LIST_ITEMS]]
+    if isinstance(value, str) and len(value) > MAX_STRING_CHARS:
+        return value[: MAX_STRING_CHARS - 1] + "…"
+    return value
+
+
+def _trim_steps(ctx: dict[str, Any]) -> Iterator[tuple[str, Callable[[], None]]]:
+    """Context reductions, least important first.
+
+    Each yielded step mutates `ctx` in place; the caller applies it before
+    resuming the generator, so loop conditions see the updated context.
+    """
+    uc = ctx.get("user_context")
+    if isinstance(uc, dict):
+        unknown = [k for k in uc if k not in USER_CONTEXT_PRIORITY]
+        unknown.sort(key=lambda k: -len(_dumps(uc[k])))
+        for k in unknown:
+            yield f"user_context.{k}", lambda k=k: uc.pop(k, None)
+
+    retrieved = ctx.get("retrieved")
+    if isinstance(retrieved, list):
+        while len(retrieved) > 1:
+            yield "retrieved[-1]", retrieved.pop
+
+    history = ctx.get("history")
+    if isinstance(history, dict) and isinstance(history.get("turns"), list):
+        turns = history["turns"]
+        while turns:
+            yield "history.turns[0]", lambda: turns.pop(0)
+
+    if isinstance(uc, dict):
+        for k in list(uc):
+            if isinstance(uc[k], (list, str)):
+                yield f"user_context.{k}:clip", lambda k=k: uc.__setitem__(k, _clip(uc[k]))
+
+    if isinstance(history, dict) and history.get("summary"):
+        yield "history", lambda: ctx.pop("history", None)
+    if ctx.get("retrieved"):
+        yield "retrieved", lambda: ctx.pop("retrieved", None)
+
+    if isinstance(uc, dict):
+        for k in reversed(USER_CONTEXT_PRIORITY):
+            if k in uc:
+                yield f"user_context.{k}", lambda k=k: uc.pop(k, None)
+
+    if "domain_hint" in ctx:
+        yield "domain_hint", lambda: ctx.pop("domain_hint", None)
+
+
+class PromptBuilder:
+    """Assembles the chat-completions request body under a token budget.
+
+    Token counts are local estimates (see `app.llm.tokens`), so budgets are
+    approximate. The system prompt prefix is serialized once and reused.
+
+    Env vars:
+      - LLM_PROMPT_TOKEN_BUDGET (default: 1200)
+    """
+
+    def __init__(self, budget_tokens: Optional[int] = None) -> None:
+        self.budget_tokens = budget_tokens or int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "1200"))
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._tokens_sent = 0
+        self._trimmed_requests = 0
+
+    def _context_tokens(self, ctx: dict[str, Any]) -> int:
+        if not ctx:
+            return 0
+        return estimate_tokens(f"Context: {_dumps(ctx)}") + _MESSAGE_OVERHEAD_TOKENS
+
+    def fit_context(self, context: Optional[dict[str, Any]], available: int) -> tuple[dict[str, Any], int, list[str]]:
+        ctx = copy.deepcopy(context or {})
+        tokens = self._context_tokens(ctx)
+        trimmed: list[str] = []
+        if tokens <= available:
+            return ctx, tokens, trimmed
+
+        for name, apply in _trim_steps(ctx):
+            apply()
+            trimmed.append(name)
+            tokens = self._context_tokens(ctx)
+            if tokens <= available:
+                break
+        return ctx, tokens, trimmed
+
+    def build(
+        self,
+        *,
+        model: str,
+        user_text: str,
+        context: Optional[dict[str, Any]] = None,
+        temperature: float = 0.4,
+    ) -> BuiltPrompt:
+        system_tokens = _system_tokens()
+        user_tokens = estimate_tokens(user_text) + _MESSAGE_OVERHEAD_TOKENS
+        available = max(0, self.budget_tokens - system_tokens - user_tokens)
+        ctx, context_tokens, trimmed = self.fit_context(context, available)
+
+        parts = [_static_prefix(model, temperature)]
+        if ctx:
+            parts.append(b"," + _dumps({"role": "system", "content": f"Context: {_dumps(ctx)}"}).encode("utf-8"))
+        parts.append(b"," + _dumps({"role": "user", "content": user_text}).encode("utf-8"))
+        parts.append(b"]}")
+
+        stats = PromptStats(
+            budget=self.budget_tokens,
+            system_tokens=system_tokens,
+            context_tokens=context_tokens,
+            user_tokens=user_tokens,
+            trimmed=trimmed,
+        )
+        with self._lock:
+            self._requests += 1
+            self._tokens_sent += stats.total_tokens
+            self._trimmed_requests += 1 if trimmed else 0
+        return BuiltPrompt(body=b"".join(parts), stats=stats)
+
+    def metrics(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "tokens_sent_estimate": self._tokens_sent,
+                "trimmed_requests": self._trimmed_requests,
+            }
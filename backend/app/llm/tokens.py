@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import re
+
+
+# Approximate BPE token counting without a tokenizer dependency: short words and
+# punctuation are ~1 token each, longer words split into ~4-character pieces.
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    n = 0
+    for m in _TOKEN_RE.finditer(text or ""):
+        width = m.end() - m.start()
+        n += 1 if width <= 4 else (width + 3) // 4
+    return n
@@ -1,8 +1,13 @@
 import os
 import logging
+import threading
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.api.chatbot import router as chatbot_router
 from app.api.fitness import router as fitness_router
@@ -12,9 +17,18 @@ from app.api.chronic import router as chronic_router
 from app.api.wellness import router as wellness_router
 from app.api.ml import router as ml_router
 from app.api.coach import router as coach_router
-from app.db.session import Base, engine
-from app.vector.seed_docs import wellness_seed_documents
-from app.vector.store import FaissVectorStore
+from app.api.users import router as users_router
+from app.api.mood import router as mood_router
+from app.api.journal import router as journal_router
+from app.api.habits import router as habits_router
+from app.api.admin import router as admin_router
+from app.api.debug import router as debug_router
+from app.db.session import dispose_async_engine
+from app.llm.llm_client import close_http_client
+from app.observability.metrics import CONTENT_TYPE, MetricsMiddleware, metrics_enabled, render_latest
+from app.observability.profiler import profiler, profiler_enabled
+from app.observability.readiness import readiness
+from app.observability.slow_requests import SlowRequestMiddleware
 
 
 def _parse_cors_origins(value: str | None) -> list[str]:
@@ -23,6 +37,15 @@ def _parse_cors_origins(value: str | None) -> list[str]:
     return [part.strip() for part in value.split(",") if part.strip()]
 
 
+async def _validation_error(request: Request, exc: RequestValidationError) -> Response:
+    try:
+        return await request_validation_exception_handler(request, exc)
+    except ValueError:
+        # A rejected inf/NaN input can't be echoed back in strict JSON.
+        errors = [{k: v for k, v in err.items() if k != "input"} for err in exc.errors()]
+        return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Healthyfy API",
@@ -55,10 +78,30 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    app.add_exception_handler(RequestValidationError, _validation_error)
+
     @app.get("/health")
     def health():
+        # Liveness only; /ready reports whether the subsystems are usable.
         return {"status": "ok"}
 
+    @app.get("/ready")
+    async def ready(response: Response):
+        ok, report = await readiness.check()
+        response.status_code = 200 if ok else 503
+        return report
+
+    # Slow-request capture (SLOW_REQUEST_MS) sits inside the metrics middleware.
+    app.add_middleware(SlowRequestMiddleware, routes=lambda: app.routes)
+
+    if metrics_enabled():
+        # Added last so it is outermost and times CORS handling too.
+        app.add_middleware(MetricsMiddleware, routes=lambda: app.routes)
+
+        @app.get("/metrics", include_in_schema=False)
+        def metrics():
+            return Response(content=render_latest(), media_type=CONTENT_TYPE)
+
     app.include_router(chatbot_router, prefix="/api", tags=["chatbot"])
     app.include_router(fitness_router, prefix="/api", tags=["fitness"])
     app.include_router(nutrition_router, prefix="/api", tags=["nutrition"])
@@ -67,6 +110,12 @@ def create_app() -> FastAPI:
     app.include_router(wellness_router, prefix="/api", tags=["wellness"])
     app.include_router(ml_router, prefix="/api", tags=["ml"])
     app.include_router(coach_router, prefix="/api", tags=["coach"])
+    app.include_router(users_router, prefix="/api", tags=["users"])
+    app.include_router(mood_router, prefix="/api", tags=["mood"])
+    app.include_router(journal_router, prefix="/api", tags=["journal"])
+    app.include_router(habits_router, prefix="/api", tags=["habits"])
+    app.include_router(admin_router, prefix="/api", tags=["admin"])
+    app.include_router(debug_router, tags=["debug"])
 
     return app
 
@@ -78,17 +127,25 @@ log = logging.getLogger("healthyfy")
 
 
 @app.on_event("startup")
-def on_startup() -> None:
-    # DB may not be available during import/local dev; attempt initialization on startup.
-    try:
-        Base.metadata.create_all(bind=engine)
-    except Exception as exc:
-        log.warning("DB init skipped (database unavailable): %s", exc)
+async def start_diagnostics() -> None:
+    # Runs on the event loop thread, so profiles can label it. Started before
+    # warm-up so a profile can cover cold start.
+    profiler.set_loop_thread(threading.get_ident())
+    if profiler_enabled():
+        profiler.start()
 
-    # Vector store is local and safe to initialize even if DB is down.
-    try:
-        store = FaissVectorStore(data_dir=os.getenv("VECTOR_DATA_DIR", "./data"))
-        if store.index.ntotal == 0:
-            store.add_documents(wellness_seed_documents())
-    except Exception as exc:
-        log.warning("Vector store init skipped: %s", exc)
+
+@app.on_event("startup")
+async def on_startup() -> None:
+    # Warm every subsystem, before uvicorn accepts connections unless
+    # STARTUP_MODE=fast. Failures (e.g. no database in local dev) are logged
+    # and reported by /ready rather than stopping the server.
+    await readiness.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await readiness.stop()
+    profiler.stop()
+    await close_http_client()
+    await dispose_async_engine()
@@ -3,7 +3,10 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Tuple
 
-import numpy as np
+from app.lazy import lazy_import
+from app.observability.metrics import STAGE_SECONDS
+
+np = lazy_import("numpy")
 
 
 @dataclass
@@ -48,14 +51,23 @@ def _fit_simple_linear_regression(y: np.ndarray) -> Tuple[float, float, float]:
     return intercept, slope, r2
 
 
-def forecast_linear(series: List[float], horizon: int = 7) -> LinearForecastResult:
-    cleaned = [float(x) for x in (series or []) if x is not None]
+def _as_series(series: List[float] | np.ndarray) -> np.ndarray:
+    # Arrays (e.g. memory-mapped columns) are used as-is, with NaN as missing;
+    # lists drop None values.
+    if isinstance(series, np.ndarray):
+        y = np.asarray(series, dtype=np.float64).ravel()
+        return y[~np.isnan(y)]
+    return np.array([float(x) for x in (series or []) if x is not None], dtype=np.float64)
+
+
+@STAGE_SECONDS.labels("forecast", "linear").time()
+def forecast_linear(series: List[float] | np.ndarray, horizon: int = 7) -> LinearForecastResult:
+    y = _as_series(series)
     if horizon < 1:
         horizon = 1
-    if len(cleaned) == 0:
+    if y.shape[0] == 0:
         return LinearForecastResult(model="linear_regression", intercept=0.0, slope=0.0, r2=0.0, forecast=[0.0] * horizon)
 
-    y = np.array(cleaned, dtype=np.float64)
     intercept, slope, r2 = _fit_simple_linear_regression(y)
 
     n = int(y.shape[0])
@@ -69,3 +81,110 @@ def forecast_linear(series: List[float], horizon: int = 7) -> LinearForecastResu
         r2=float(r2),
         forecast=[float(x) for x in y_future.tolist()],
     )
+
+
+@dataclass
+class LinearForecastBatchResult:
+    model: str
+    lengths: np.ndarray  # (m,) observations used per series
+    intercept: np.ndarray  # (m,)
+    slope: np.ndarray  # (m,)
+    r2: np.ndarray  # (m,)
+    forecast: np.ndarray  # (m, horizon)
+
+
+def _segment_sums(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    # Cumulative-sum differences handle empty segments (unlike np.add.reduceat).
+    csum = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return csum[offsets[1:]] - csum[offsets[:-1]]
+
+
+def _padded_to_csr(values: np.ndarray, lengths: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 2:
+        raise ValueError("padded values must be a 2-D array (series x time)")
+    m, width = values.shape
+    if lengths is None:
+        lengths = np.full(m, width, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if lengths.shape != (m,) or (lengths < 0).any() or (lengths > width).any():
+        raise ValueError("lengths must have one entry per row, each within [0, row width]")
+    mask = np.arange(width)[None, :] < lengths[:, None]
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    return values[mask], offsets
+
+
+def forecast_linear_batch(
+    values: np.ndarray,
+    *,
+    lengths: np.ndarray | None = None,
+    offsets: np.ndarray | None = None,
+    horizon: int = 7,
+) -> LinearForecastBatchResult:
+    """Fit `forecast_linear` for many series at once with NumPy reductions.
+
+    Accepts either a padded 2-D `values` array (optionally with per-row
+    `lengths`; defaults to full rows) or a flat 1-D `values` array with
+    CSR-style `offsets` (len = series + 1). NaNs are treated as missing and
+    dropped, mirroring how `forecast_linear` drops None values. Results match
+    the single-series function, including the n=0 and n=1 cases.
+    """
+    if horizon < 1:
+        horizon = 1
+
+    if offsets is not None:
+        flat = np.asarray(values, dtype=np.float64).ravel()
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if offsets.ndim != 1 or offsets.shape[0] < 1 or offsets[0] != 0 or offsets[-1] != flat.shape[0] or (np.diff(offsets) < 0).any():
+            raise ValueError("offsets must be non-decreasing, start at 0 and end at len(values)")
+    else:
+        flat, offsets = _padded_to_csr(values, lengths)
+
+    nan = np.isnan(flat)
+    if nan.any():
+        valid_counts = _segment_sums((~nan).astype(np.float64), offsets).astype(np.int64)
+        flat = flat[~nan]
+        offsets = np.concatenate(([0], np.cumsum(valid_counts)))
+
+    n = np.diff(offsets)
+    m = int(n.shape[0])
+    safe_n = np.maximum(n, 1).astype(np.float64)
+
+    # Time index restarts at 0 for every series.
+    t = np.arange(flat.shape[0], dtype=np.float64) - np.repeat(offsets[:-1], n).astype(np.float64)
+
+    t_mean = (n - 1) / 2.0
+    y_mean = _segment_sums(flat, offsets) / safe_n
+
+    tc = t - np.repeat(t_mean, n)
+    yc = flat - np.repeat(y_mean, n)
+    denom = _segment_sums(tc * tc, offsets)
+    cov = _segment_sums(tc * yc, offsets)
+
+    fit = n >= 2
+    slope = np.zeros(m, dtype=np.float64)
+    np.divide(cov, denom, out=slope, where=fit & (denom != 0.0))
+    intercept = np.where(fit, y_mean - slope * t_mean, 0.0)
+    # A single observation forecasts itself (matches _fit_simple_linear_regression).
+    single = n == 1
+    if single.any():
+        intercept[single] = flat[offsets[:-1][single]]
+
+    resid = flat - (np.repeat(intercept, n) + np.repeat(slope, n) * t)
+    ss_res = _segment_sums(resid * resid, offsets)
+    ss_tot = _segment_sums(yc * yc, offsets)
+    r2 = np.zeros(m, dtype=np.float64)
+    np.divide(ss_res, ss_tot, out=r2, where=fit & (ss_tot != 0.0))
+    r2 = np.where(fit & (ss_tot != 0.0), np.maximum(0.0, 1.0 - r2), 0.0)
+
+    tf = n[:, None].astype(np.float64) + np.arange(horizon, dtype=np.float64)[None, :]
+    forecast = intercept[:, None] + slope[:, None] * tf
+
+    return LinearForecastBatchResult(
+        model="linear_regression",
+        lengths=n,
+        intercept=intercept,
+        slope=slope,
+        r2=r2,
+        forecast=forecast,
+    )
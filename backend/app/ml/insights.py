@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.ml.online import OnlineRegressionState
+
+ROLLING_SHORT = 7  # check-ins
+ROLLING_LONG = 30  # check-ins
+HISTOGRAM_DAYS = 14
+HISTOGRAM_BINS = 5  # adherence buckets of width 0.2
+ADHERENT_THRESHOLD = 0.6
+METRIC_WINDOW = 30  # slope window per metric (check-ins)
+MAX_METRICS = 32  # free-form metrics tracked per plan
+
+
+def _day(at: str) -> int:
+    return datetime.fromisoformat(at.rstrip("Z")).date().toordinal()
+
+
+def _bin(adherence: float) -> int:
+    return min(HISTOGRAM_BINS - 1, max(0, int(adherence * HISTOGRAM_BINS)))
+
+
+@dataclass
+class PlanInsights:
+    """Materialized per-plan analytics, updated in O(1) per check-in.
+
+    Only bounded state is kept (the last ROLLING_LONG adherence values, the
+    last HISTOGRAM_DAYS of per-day adherence bins, and a windowed
+    `OnlineRegressionState` per metric), so reading or updating never scans
+    the plan's full check-in history.
+    """
+
+    checkins: int = 0
+    first_at: str = ""
+    last_at: str = ""
+    adherence_sum: float = 0.0
+    recent_adherence: Deque[float] = field(default_factory=deque)
+    last_day: int = 0
+    day_streak: int = 0
+    longest_day_streak: int = 0
+    adherent_streak: int = 0
+    longest_adherent_streak: int = 0
+    # day ordinal -> checkin count per adherence bin
+    daily_bins: Dict[int, List[int]] = field(default_factory=dict)
+    metrics: Dict[str, OnlineRegressionState] = field(default_factory=dict)
+
+    def update(self, at: str, adherence: float, metrics: Optional[Dict[str, float]] = None) -> None:
+        """Fold one check-in in; `metrics` are finite numeric values only."""
+        adherence = float(adherence)
+        day = _day(at)
+        self.checkins += 1
+        self.first_at = min(self.first_at or at, at)
+        self.last_at = max(self.last_at, at)
+
+        self.adherence_sum += adherence
+        self.recent_adherence.append(adherence)
+        while len(self.recent_adherence) > ROLLING_LONG:
+            self.recent_adherence.popleft()
+
+        if self.last_day and day <= self.last_day:
+            pass  # same day (already counted) or a late-synced older check-in
+        elif self.last_day and day == self.last_day + 1:
+            self.day_streak += 1
+        else:
+            self.day_streak = 1
+        self.last_day = max(self.last_day, day)
+        self.longest_day_streak = max(self.longest_day_streak, self.day_streak)
+
+        self.adherent_streak = self.adherent_streak + 1 if adherence >= ADHERENT_THRESHOLD else 0
+        self.longest_adherent_streak = max(self.longest_adherent_streak, self.adherent_streak)
+
+        self.daily_bins.setdefault(day, [0] * HISTOGRAM_BINS)[_bin(adherence)] += 1
+        for old in [d for d in self.daily_bins if d <= self.last_day - HISTOGRAM_DAYS]:
+            del self.daily_bins[old]
+
+        for name, value in (metrics or {}).items():
+            state = self.metrics.get(name)
+            if state is None:
+                if len(self.metrics) >= MAX_METRICS:
+                    continue
+                state = self.metrics[name] = OnlineRegressionState(window=METRIC_WINDOW)
+            state.update(value)
+
+    def rolling_adherence(self, n: int) -> Optional[float]:
+        if not self.recent_adherence:
+            return None
+        tail = list(self.recent_adherence)[-n:]
+        return sum(tail) / len(tail)
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-ready view served by the insights endpoint and read by adaptation."""
+        histogram = [0] * HISTOGRAM_BINS
+        for bins in self.daily_bins.values():
+            for i, c in enumerate(bins):
+                histogram[i] += c
+        slopes = {}
+        for name, state in sorted(self.metrics.items()):
+            _, slope, r2 = state.fit()
+            slopes[name] = {"slope": slope, "r2": r2, "observations": state.count, "last": state.last_y}
+        return {
+            "checkins": self.checkins,
+            "first_at": self.first_at or None,
+            "last_at": self.last_at or None,
+            "adherence": {
+                "last": self.recent_adherence[-1] if self.recent_adherence else None,
+                f"mean_{ROLLING_SHORT}": self.rolling_adherence(ROLLING_SHORT),
+                f"mean_{ROLLING_LONG}": self.rolling_adherence(ROLLING_LONG),
+                "mean_all": self.adherence_sum / self.checkins if self.checkins else None,
+            },
+            "streaks": {
+                "days": self.day_streak,
+                "longest_days": self.longest_day_streak,
+                "adherent_checkins": self.adherent_streak,
+                "longest_adherent_checkins": self.longest_adherent_streak,
+            },
+            "metric_trends": slopes,
+            "last_days": {
+                "days": HISTOGRAM_DAYS,
+                "checkins_per_day": {
+                    date.fromordinal(d).isoformat(): sum(b) for d, b in sorted(self.daily_bins.items())
+                },
+                "adherence_histogram": {
+                    f"{i / HISTOGRAM_BINS:.1f}-{(i + 1) / HISTOGRAM_BINS:.1f}": c for i, c in enumerate(histogram)
+                },
+            },
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "checkins": self.checkins,
+            "first_at": self.first_at,
+            "last_at": self.last_at,
+            "adherence_sum": self.adherence_sum,
+            "recent_adherence": list(self.recent_adherence),
+            "last_day": self.last_day,
+            "day_streak": self.day_streak,
+            "longest_day_streak": self.longest_day_streak,
+            "adherent_streak": self.adherent_streak,
+            "longest_adherent_streak": self.longest_adherent_streak,
+            "daily_bins": {str(d): b for d, b in self.daily_bins.items()},
+            "metrics": {name: s.to_dict() for name, s in self.metrics.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "PlanInsights":
+        ints: Tuple[str, ...] = (
+            "checkins",
+            "last_day",
+            "day_streak",
+            "longest_day_streak",
+            "adherent_streak",
+            "longest_adherent_streak",
+        )
+        insights = cls(
+            first_at=str(raw.get("first_at") or ""),
+            last_at=str(raw.get("last_at") or ""),
+            adherence_sum=float(raw.get("adherence_sum", 0.0)),
+            recent_adherence=deque(float(x) for x in raw.get("recent_adherence") or []),
+            daily_bins={int(d): [int(c) for c in b] for d, b in (raw.get("daily_bins") or {}).items()},
+            metrics={
+                name: OnlineRegressionState.from_dict(s) for name, s in (raw.get("metrics") or {}).items()
+            },
+        )
+        for key in ints:
+            setattr(insights, key, int(raw.get(key, 0)))
+        return insights
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.lazy import lazy_import
+from app.ml.forecast import _as_series, forecast_linear
+
+np = lazy_import("numpy")
+
+# Forecast model registry. Every model fits a 2-D array of equal-length series
+# (rows) with NumPy ops vectorized across rows, so the same code path serves a
+# single request (one row) and the batched rolling-origin backtest used by
+# `auto` (one row per origin). Like `forecast_linear`, no sklearn/statsmodels.
+
+SEASON_LENGTH = 7  # daily wellness metrics: weekly seasonality
+
+# Small parameter grids, searched in one vectorized pass (grid x series rows).
+_HOLT_GRID = [(a, b) for a in (0.2, 0.5, 0.8) for b in (0.05, 0.2)]
+_SEASONAL_GRID = [(a, b, g) for a in (0.2, 0.5) for b in (0.05, 0.2) for g in (0.1, 0.3)]
+_THEIL_SEN_MAX_PAIRS = 20_000
+
+
+@dataclass
+class ModelFit:
+    intercept: np.ndarray  # (m,) equivalent line at t=0
+    slope: np.ndarray  # (m,)
+    fitted: np.ndarray  # (m, n) in-sample fit (one-step-ahead for smoothing models)
+    forecast: np.ndarray  # (m, horizon)
+    skip: int = 0  # leading fitted columns that are initialization, not predictions
+
+
+@dataclass
+class ForecastModel:
+    name: str  # reported in responses
+    min_length: int
+    fit: Callable[[np.ndarray, int], ModelFit]
+
+
+@dataclass
+class ForecastResult:
+    model: str
+    intercept: float
+    slope: float
+    r2: float
+    forecast: List[float]
+    backtest_mae: Optional[Dict[str, float]] = None
+
+
+def _fit_linear(Y: np.ndarray, horizon: int) -> ModelFit:
+    m, n = Y.shape
+    t = np.arange(n, dtype=np.float64)
+    tc = t - t.mean()
+    y_mean = Y.mean(axis=1)
+    denom = float(tc @ tc)
+    slope = (Y - y_mean[:, None]) @ tc / denom if denom > 0 else np.zeros(m)
+    intercept = y_mean - slope * t.mean()
+    fitted = intercept[:, None] + slope[:, None] * t
+    tf = np.arange(n, n + horizon, dtype=np.float64)
+    return ModelFit(intercept, slope, fitted, intercept[:, None] + slope[:, None] * tf)
+
+
+def _pick_best(Y: np.ndarray, fitted: np.ndarray, grid_size: int, skip: int) -> np.ndarray:
+    """Row index (into the grid-tiled arrays) of the lowest in-sample SSE per series."""
+    m = Y.shape[0]
+    err = fitted[:, skip:] - np.tile(Y, (grid_size, 1))[:, skip:]
+    sse = (err * err).sum(axis=1).reshape(grid_size, m)
+    return np.argmin(sse, axis=0) * m + np.arange(m)
+
+
+def _fit_holt(Y: np.ndarray, horizon: int) -> ModelFit:
+    """Holt's linear trend (double exponential smoothing), grid-searched alpha/beta."""
+    m, n = Y.shape
+    g = len(_HOLT_GRID)
+    alpha = np.repeat([a for a, _ in _HOLT_GRID], m)
+    beta = np.repeat([b for _, b in _HOLT_GRID], m)
+    Yg = np.tile(Y, (g, 1))
+
+    level = Yg[:, 0].copy()
+    trend = Yg[:, 1] - Yg[:, 0]
+    fitted = np.empty_like(Yg)
+    fitted[:, 0] = Yg[:, 0]
+    for i in range(1, n):
+        pred = level + trend
+        fitted[:, i] = pred
+        new_level = alpha * Yg[:, i] + (1.0 - alpha) * pred
+        trend = beta * (new_level - level) + (1.0 - beta) * trend
+        level = new_level
+
+    best = _pick_best(Y, fitted, g, skip=2)
+    level, trend, fitted = level[best], trend[best], fitted[best]
+    steps = np.arange(1, horizon + 1, dtype=np.float64)
+    return ModelFit(
+        intercept=level - trend * (n - 1),
+        slope=trend,
+        fitted=fitted,
+        forecast=level[:, None] + trend[:, None] * steps,
+        skip=2,
+    )
+
+
+def _fit_seasonal(Y: np.ndarray, horizon: int) -> ModelFit:
+    """Additive Holt-Winters with a weekly season, grid-searched alpha/beta/gamma."""
+    m, n = Y.shape
+    p = SEASON_LENGTH
+    g = len(_SEASONAL_GRID)
+    alpha = np.repeat([a for a, _, _ in _SEASONAL_GRID], m)
+    beta = np.repeat([b for _, b, _ in _SEASONAL_GRID], m)
+    gamma = np.repeat([c for _, _, c in _SEASONAL_GRID], m)
+    Yg = np.tile(Y, (g, 1))
+
+    first = Yg[:, :p].mean(axis=1)
+    second = Yg[:, p : 2 * p].mean(axis=1)
+    level = first
+    trend = (second - first) / p
+    season = Yg[:, :p] - first[:, None]
+    fitted = np.empty_like(Yg)
+    fitted[:, :p] = first[:, None] + season
+    for i in range(p, n):
+        s = season[:, i % p]
+        pred = level + trend + s
+        fitted[:, i] = pred
+        new_level = alpha * (Yg[:, i] - s) + (1.0 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1.0 - beta) * trend
+        season[:, i % p] = gamma * (Yg[:, i] - new_level) + (1.0 - gamma) * s
+        level = new_level
+
+    best = _pick_best(Y, fitted, g, skip=p)
+    level, trend, season, fitted = level[best], trend[best], season[best], fitted[best]
+    steps = np.arange(1, horizon + 1)
+    season_idx = (n - 1 + steps) % p
+    forecast = level[:, None] + trend[:, None] * steps + season[:, season_idx]
+    return ModelFit(
+        intercept=level - trend * (n - 1),
+        slope=trend,
+        fitted=fitted,
+        forecast=forecast,
+        skip=p,
+    )
+
+
+def _pairs(n: int, max_pairs: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(i, j) with i < j: all pairs, or `max_pairs` evenly spaced ones in row-major order.
+
+    The subsample is computed from the pair ranks directly, so memory stays
+    O(max_pairs) however long the series is.
+    """
+    total = n * (n - 1) // 2
+    if total <= max_pairs:
+        return np.triu_indices(n, k=1)
+    k = np.linspace(0, total - 1, max_pairs).astype(np.int64)
+    # Row i starts at rank i * (2n - i - 1) / 2; invert that, then fix float rounding.
+    def start(r: np.ndarray) -> np.ndarray:
+        return r * (2 * n - r - 1) // 2
+
+    b = 2 * n - 1
+    i = np.floor((b - np.sqrt(np.maximum(b * b - 8.0 * k, 0.0))) / 2.0).astype(np.int64)
+    i = np.where(start(i) > k, i - 1, i)
+    i = np.where(start(i + 1) <= k, i + 1, i)
+    return i, k - start(i) + i + 1
+
+
+def _fit_theil_sen(Y: np.ndarray, horizon: int) -> ModelFit:
+    """Theil-Sen: median of pairwise slopes, robust to outlier days."""
+    m, n = Y.shape
+    i, j = _pairs(n, _THEIL_SEN_MAX_PAIRS)
+    slopes = (Y[:, j] - Y[:, i]) / (j - i).astype(np.float64)
+    slope = np.median(slopes, axis=1)
+    t = np.arange(n, dtype=np.float64)
+    intercept = np.median(Y - slope[:, None] * t, axis=1)
+    tf = np.arange(n, n + horizon, dtype=np.float64)
+    return ModelFit(
+        intercept=intercept,
+        slope=slope,
+        fitted=intercept[:, None] + slope[:, None] * t,
+        forecast=intercept[:, None] + slope[:, None] * tf,
+    )
+
+
+MODELS: Dict[str, ForecastModel] = {
+    "linear": ForecastModel(name="linear_regression", min_length=2, fit=_fit_linear),
+    "holt": ForecastModel(name="holt_linear_trend", min_length=3, fit=_fit_holt),
+    "seasonal": ForecastModel(name="seasonal_additive_weekly", min_length=2 * SEASON_LENGTH, fit=_fit_seasonal),
+    "theil_sen": ForecastModel(name="theil_sen", min_length=2, fit=_fit_theil_sen),
+}
+
+MODEL_CHOICES = (*MODELS.keys(), "auto")
+
+
+def _r2(y: np.ndarray, fitted: np.ndarray, skip: int) -> float:
+    y, fitted = y[skip:], fitted[skip:]
+    if y.shape[0] < 2:
+        return 0.0
+    ss_tot = float(((y - y.mean()) ** 2).sum())
+    if ss_tot == 0.0:
+        return 0.0
+    ss_res = float(((y - fitted) ** 2).sum())
+    return float(max(0.0, 1.0 - ss_res / ss_tot))
+
+
+def backtest_mae(y: np.ndarray, horizon: int, max_origins: int = 8) -> Dict[str, float]:
+    """Rolling-origin backtest: mean absolute error per model.
+
+    Every origin uses a fixed-length training window, so all origins are fitted
+    as one batch (one row each) per model.
+    """
+    n = int(y.shape[0])
+    h = max(1, min(horizon, n // 5))
+    k = max(1, min(max_origins, n // 3))
+    width = n - h - k + 1
+    if width < 3:
+        return {}
+
+    windows = np.lib.stride_tricks.sliding_window_view(y, width + h)[-k:]
+    train, test = windows[:, :width], windows[:, width:]
+    scores: Dict[str, float] = {}
+    for key, model in MODELS.items():
+        if width < model.min_length:
+            continue
+        fit = model.fit(np.ascontiguousarray(train), h)
+        scores[key] = float(np.abs(fit.forecast - test).mean())
+    return scores
+
+
+def forecast_with_model(series: List[float] | np.ndarray, horizon: int = 7, model: str = "linear") -> ForecastResult:
+    """Forecast one series with a registry model (or `auto` to pick by backtest).
+
+    Series shorter than a model's minimum length fall back to `forecast_linear`;
+    the response `model` field always names the model actually used.
+    """
+    y = _as_series(series)
+    horizon = max(1, int(horizon))
+
+    scores: Optional[Dict[str, float]] = None
+    key = model
+    if model == "auto":
+        scores = backtest_mae(y, horizon)
+        key = min(scores, key=scores.get) if scores else "linear"
+    if key not in MODELS:
+        raise ValueError(f"Unknown forecast model: {model}")
+
+    spec = MODELS[key]
+    if key == "linear" or y.shape[0] < spec.min_length:
+        res = forecast_linear(y, horizon)
+        return ForecastResult(res.model, res.intercept, res.slope, res.r2, res.forecast, scores)
+
+    fit = spec.fit(y[None, :], horizon)
+    return ForecastResult(
+        model=spec.name,
+        intercept=float(fit.intercept[0]),
+        slope=float(fit.slope[0]),
+        r2=_r2(y, fit.fitted[0], fit.skip),
+        forecast=[float(x) for x in fit.forecast[0].tolist()],
+        backtest_mae=scores,
+    )
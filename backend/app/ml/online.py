@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List
+
+from app.ml.forecast import LinearForecastResult
+
+# With a sliding window the sums are maintained by add/subtract; re-derive them
+# exactly from the window every so often so floating-point drift can't build up.
+_RESYNC_EVERY = 1024
+
+
+@dataclass
+class OnlineRegressionState:
+    """Sufficient statistics for y ~= a + b*t, updated in O(1) per observation.
+
+    t is the observation index (0, 1, 2, ...). Optional recency weighting:
+      - decay in (0, 1]: every update multiplies prior weights by `decay`
+      - window > 0: only the most recent `window` observations count
+
+    With decay=1 and no window, `forecast()` matches `forecast_linear` on the
+    full series; with a window it matches `forecast_linear` on the window.
+    """
+
+    decay: float = 1.0
+    window: int = 0
+    count: int = 0  # observations currently contributing
+    next_t: int = 0
+    n: float = 0.0  # weighted count
+    st: float = 0.0
+    sy: float = 0.0
+    stt: float = 0.0
+    sty: float = 0.0
+    syy: float = 0.0
+    last_y: float = 0.0
+    recent: Deque[float] = field(default_factory=deque)
+    _since_resync: int = 0
+
+    def __post_init__(self) -> None:
+        if not 0.0 < self.decay <= 1.0:
+            raise ValueError("decay must be in (0, 1]")
+        if self.window < 0:
+            raise ValueError("window must be >= 0")
+        self.recent = deque(self.recent)
+
+    def _add(self, w: float, t: float, y: float) -> None:
+        self.n += w
+        self.st += w * t
+        self.sy += w * y
+        self.stt += w * t * t
+        self.sty += w * t * y
+        self.syy += w * y * y
+
+    def update(self, y: float) -> None:
+        y = float(y)
+        t = float(self.next_t)
+        if self.decay < 1.0:
+            d = self.decay
+            self.n *= d
+            self.st *= d
+            self.sy *= d
+            self.stt *= d
+            self.sty *= d
+            self.syy *= d
+        self._add(1.0, t, y)
+        self.count += 1
+        self.next_t += 1
+        self.last_y = y
+
+        if self.window:
+            self.recent.append(y)
+            if len(self.recent) > self.window:
+                y_old = self.recent.popleft()
+                t_old = t - self.window
+                # Its weight has decayed once per update since it was added.
+                self._add(-(self.decay ** self.window), t_old, y_old)
+                self.count -= 1
+            self._since_resync += 1
+            if self._since_resync >= _RESYNC_EVERY:
+                self._resync()
+
+    def _resync(self) -> None:
+        self.n = self.st = self.sy = self.stt = self.sty = self.syy = 0.0
+        start = self.next_t - len(self.recent)
+        k = len(self.recent)
+        for i, y in enumerate(self.recent):
+            self._add(self.decay ** (k - 1 - i), float(start + i), y)
+        self._since_resync = 0
+
+    def fit(self) -> tuple[float, float, float]:
+        """Return (intercept, slope, r2); intercept is at the first counted observation."""
+        if self.count == 0:
+            return 0.0, 0.0, 0.0
+        if self.count == 1:
+            return self.last_y, 0.0, 0.0
+
+        t_mean = self.st / self.n
+        y_mean = self.sy / self.n
+        s_tt = self.stt - self.n * t_mean * t_mean
+        s_ty = self.sty - self.n * t_mean * y_mean
+        s_yy = max(0.0, self.syy - self.n * y_mean * y_mean)
+        if s_tt <= 0.0:
+            return y_mean, 0.0, 0.0
+
+        slope = s_ty / s_tt
+        t0 = float(self.next_t - self.count)
+        intercept = y_mean - slope * (t_mean - t0)
+        ss_res = max(0.0, s_yy - slope * s_ty)
+        # Relative tolerance: a perfectly flat series leaves only rounding noise in s_yy.
+        r2 = 0.0 if s_yy <= 1e-12 * max(1.0, abs(self.syy)) else max(0.0, 1.0 - ss_res / s_yy)
+        return intercept, slope, r2
+
+    def forecast(self, horizon: int = 7) -> LinearForecastResult:
+        horizon = max(1, int(horizon))
+        intercept, slope, r2 = self.fit()
+        return LinearForecastResult(
+            model="online_linear_regression",
+            intercept=float(intercept),
+            slope=float(slope),
+            r2=float(r2),
+            forecast=[float(intercept + slope * (self.count + h)) for h in range(horizon)],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "decay": self.decay,
+            "window": self.window,
+            "count": self.count,
+            "next_t": self.next_t,
+            "n": self.n,
+            "st": self.st,
+            "sy": self.sy,
+            "stt": self.stt,
+            "sty": self.sty,
+            "syy": self.syy,
+            "last_y": self.last_y,
+            "recent": list(self.recent),
+            "since_resync": self._since_resync,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "OnlineRegressionState":
+        state = cls(
+            decay=float(raw.get("decay", 1.0)),
+            window=int(raw.get("window", 0)),
+            recent=deque(float(x) for x in raw.get("recent") or []),
+        )
+        for key in ("count", "next_t"):
+            setattr(state, key, int(raw.get(key, 0)))
+        for key in ("n", "st", "sy", "stt", "sty", "syy", "last_y"):
+            setattr(state, key, float(raw.get(key, 0.0)))
+        state._since_resync = int(raw.get("since_resync", 0))
+        return state
+
+    @classmethod
+    def from_series(cls, series: List[float], decay: float = 1.0, window: int = 0) -> "OnlineRegressionState":
+        state = cls(decay=decay, window=window)
+        for y in series:
+            state.update(y)
+        return state
@@ -0,0 +1,160 @@
+"""Opt-in sampling profiler producing flamegraph-compatible collapsed stacks.
+
+A daemon thread wakes every PROFILER_INTERVAL_MS, reads every other thread's
+current frame (`sys._current_frames()`) and counts the stack as one line of
+`thread;module:function;... <count>`, the format flamegraph.pl and
+speedscope import. The event loop thread is labelled `event-loop`, so time
+spent idle in the selector shows apart from time spent blocking the loop;
+pool threads are grouped by pool name. Nothing is installed on the profiled
+threads, and the cost is one stack walk per thread per tick, paid by the
+sampler thread while it holds the GIL.
+
+Env vars:
+  - PROFILER_ENABLED (default: 0) — start sampling at startup
+  - PROFILER_INTERVAL_MS (default: 19) — sampling period (off the 10ms grid to avoid lockstep with timers)
+  - PROFILER_MAX_STACKS (default: 5000) — distinct stacks kept; the rest count as `[other]`
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+_POOL_SUFFIX = re.compile(r"[_-]\d+$")
+MAX_DEPTH = 96
+
+
+def profiler_enabled() -> bool:
+    return os.getenv("PROFILER_ENABLED", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def profiler_interval_ms() -> float:
+    return float(os.getenv("PROFILER_INTERVAL_MS", "19"))
+
+
+def profiler_max_stacks() -> int:
+    return int(os.getenv("PROFILER_MAX_STACKS", "5000"))
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms: Optional[float] = None, max_stacks: Optional[int] = None) -> None:
+        self.interval_ms = interval_ms or profiler_interval_ms()
+        self.max_stacks = max_stacks or profiler_max_stacks()
+        self._stacks: Dict[str, int] = {}
+        self._labels: Dict[Any, str] = {}  # code object -> "module:function"
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop_thread_id: Optional[int] = None
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def set_loop_thread(self, thread_id: int) -> None:
+        self._loop_thread_id = thread_id
+
+    def start(self, interval_ms: Optional[float] = None) -> bool:
+        """Start sampling; False if already running."""
+        with self._lock:
+            if self.running:
+                return False
+            if interval_ms:
+                self.interval_ms = max(1.0, float(interval_ms))
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="healthyfy-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> bool:
+        """Stop sampling and keep the collected stacks; False if it wasn't running."""
+        thread = self._thread
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join(timeout=2.0)
+        self._thread = None
+        return True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks = {}
+            self.samples = 0
+            self.sampling_seconds = 0.0
+
+    def _run(self) -> None:
+        interval = self.interval_ms / 1000.0
+        own = threading.get_ident()
+        while not self._stop.wait(interval):
+            t = time.perf_counter()
+            self._sample(own)
+            self.sampling_seconds += time.perf_counter() - t
+
+    def _label(self, code: Any, module: str) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{module}:{code.co_name}".replace(";", ",").replace(" ", "_")
+        return label
+
+    def _thread_label(self, thread_id: int, names: Dict[int, str]) -> str:
+        if thread_id == self._loop_thread_id:
+            return "event-loop"
+        return _POOL_SUFFIX.sub("", names.get(thread_id, "thread")).replace(" ", "_").replace(";", ",")
+
+    def _sample(self, own: int) -> None:
+        names = {t.ident: t.name for t in threading.enumerate() if t.ident is not None}
+        frames = sys._current_frames()
+        stacks = []
+        for thread_id, frame in frames.items():
+            if thread_id == own:
+                continue
+            parts = []
+            depth = 0
+            while frame is not None and depth < MAX_DEPTH:
+                parts.append(self._label(frame.f_code, frame.f_globals.get("__name__", "?")))
+                frame = frame.f_back
+                depth += 1
+            parts.append(self._thread_label(thread_id, names))
+            parts.reverse()
+            stacks.append(";".join(parts))
+        del frames
+        with self._lock:
+            for key in stacks:
+                if key not in self._stacks and len(self._stacks) >= self.max_stacks:
+                    key = "[other]"
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def collapsed(self, reset: bool = False) -> str:
+        """`stack count` lines, heaviest first."""
+        with self._lock:
+            stacks = dict(self._stacks)
+            if reset:
+                self._stacks = {}
+                self.samples = 0
+                self.sampling_seconds = 0.0
+        lines = [f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda kv: -kv[1])]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            distinct = len(self._stacks)
+        return {
+            "running": self.running,
+            "interval_ms": self.interval_ms,
+            "samples": self.samples,
+            "distinct_stacks": distinct,
+            "max_stacks": self.max_stacks,
+            "sampler_busy_ms": round(self.sampling_seconds * 1000.0, 3),
+            "started_at": self.started_at,
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,328 @@
+"""Warm startup and deep readiness (GET /ready).
+
+`warm_up()` runs at startup. It
+initialises the schema and opens DB connections, loads (and seeds) the
+vector index and runs one search, compiles the guardrail matchers, primes
+the reply/prompt caches, checks the coach store and opens the LLM
+connection pool. Each step is timed (`cold_start_ms`); a failing step is
+logged and reported instead of aborting startup.
+
+STARTUP_MODE picks when that happens. `warm` (default) awaits warm-up before
+the server accepts connections, so the first request never pays for cold
+subsystems. `fast` starts warm-up as a background task and lets the worker
+take traffic immediately: blocking steps run on a worker thread, the app's
+heavy dependencies (NumPy, FAISS, the DB driver, httpx) load there or on
+first use, and /ready stays "starting" until warm-up finishes, so a load
+balancer gating on /ready still waits for a warm worker.
+
+`check()` re-tests each subsystem live for /ready, which returns 503 until
+warm-up has finished and every required subsystem is ok. The LLM is
+reported but never required: while its circuit is open, chat and the goal
+coach answer offline and /ready says "degraded".
+
+Env vars:
+  - STARTUP_MODE (default: warm) — warm | fast
+  - READY_REQUIRE (default: db,vector_index,coach_store,guardrails)
+  - READY_CHECK_TIMEOUT_S (default: 2) — limit for live checks that do I/O
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+log = logging.getLogger("healthyfy")
+
+SUBSYSTEMS = ("db", "vector_index", "guardrails", "caches", "coach_store", "llm")
+STARTUP_MODES = ("warm", "fast")
+
+
+def startup_mode() -> str:
+    mode = os.getenv("STARTUP_MODE", "warm").strip().lower()
+    if mode not in STARTUP_MODES:
+        log.warning("Unknown STARTUP_MODE %r; using 'warm'", mode)
+        return "warm"
+    return mode
+
+
+def required_subsystems() -> Tuple[str, ...]:
+    raw = os.getenv("READY_REQUIRE", "db,vector_index,coach_store,guardrails")
+    return tuple(part.strip() for part in raw.split(",") if part.strip())
+
+
+def check_timeout_s() -> float:
+    return float(os.getenv("READY_CHECK_TIMEOUT_S", "2"))
+
+
+# --- warm-up steps ---------------------------------------------------------
+
+
+def _init_schema() -> Dict[str, Any]:
+    from app.db.migrations import run_migrations
+    from app.db.schema import ensure_indexes
+    from app.db.session import Base, get_engine
+
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations(engine)
+    ensure_indexes(engine)
+    # One connection in each pool, so the first request doesn't pay for connect/auth.
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return {"dialect": engine.dialect.name, "migrations_applied": applied}
+
+
+async def _warm_db() -> Dict[str, Any]:
+    from app.db.session import get_async_engine
+
+    result = await asyncio.to_thread(_init_schema)
+    async with get_async_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return result
+
+
+def _warm_vector_index() -> Dict[str, Any]:
+    from app.vector.seed_docs import wellness_seed_documents
+    from app.vector.store import get_vector_store, vector_backend
+
+    store = get_vector_store()
+    seeded = 0
+    if store.index.ntotal == 0:
+        seeded = store.add_documents(wellness_seed_documents())
+    store.search("sleep and stress", k=1)  # first search pays for lazy setup (embedding matrix, BLAS)
+    return {"backend": vector_backend(), "ntotal": int(store.index.ntotal), "seeded": seeded}
+
+
+def _warm_guardrails() -> Dict[str, Any]:
+    from app.rules.safety_guardrails import enforce_guardrails, guardrail_pack
+
+    pack = guardrail_pack()
+    enforce_guardrails("warm up")
+    return {"pack_version": pack.version, "rules": pack.rules}
+
+
+def _warm_caches() -> Dict[str, Any]:
+    from app.agents.reply_templates import REPLY_TABLE
+    from app.llm.llm_client import LLMClient
+    from app.llm.prompt_builder import prime
+    from app.ml.forecast import forecast_linear
+
+    client = LLMClient()
+    prime(client.model, client.temperature)
+    forecast_linear([1.0, 2.0, 3.0], horizon=1)
+    return {"reply_table": len(REPLY_TABLE)}
+
+
+def _coach_store_state() -> Dict[str, Any]:
+    from app.storage.coach_store import CoachStore
+
+    store = CoachStore()
+    writable = os.access(store.data_dir, os.W_OK)
+    return {
+        "ok": store.data_dir.is_dir() and writable,
+        "data_dir": str(store.data_dir),
+        "writable": writable,
+        "plans_bytes": store.path.stat().st_size if store.path.exists() else 0,
+    }
+
+
+def _warm_coach_store() -> Dict[str, Any]:
+    from app.storage.coach_store import CoachStore
+
+    state = _coach_store_state()
+    state["plans"] = len(CoachStore()._load_all().get("plans", {}))
+    if not state.pop("ok"):
+        raise RuntimeError(f"coach data dir {state['data_dir']} is not writable")
+    return state
+
+
+async def _warm_llm() -> Dict[str, Any]:
+    from app.llm.llm_client import LLMClient
+
+    return await LLMClient().warm()
+
+
+_WARM_STEPS: Tuple[Tuple[str, Callable[[], Any]], ...] = (
+    ("db", _warm_db),
+    ("vector_index", _warm_vector_index),
+    ("guardrails", _warm_guardrails),
+    ("caches", _warm_caches),
+    ("coach_store", _warm_coach_store),
+    ("llm", _warm_llm),
+)
+
+
+# --- live checks -----------------------------------------------------------
+
+
+async def _check_db() -> Dict[str, Any]:
+    from app.db.session import async_engine_or_none, get_async_engine, get_engine, pool_status
+
+    engine = get_engine()
+    t = time.perf_counter()
+    async with get_async_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    out: Dict[str, Any] = {
+        "ok": True,
+        "dialect": engine.dialect.name,
+        "ping_ms": round((time.perf_counter() - t) * 1000.0, 3),
+        "pool": pool_status(engine.pool),
+    }
+    async_engine = async_engine_or_none()
+    if async_engine is not None:
+        out["async_pool"] = pool_status(async_engine.pool)
+    return out
+
+
+def _check_vector_index() -> Dict[str, Any]:
+    from app.vector.snapshot import SnapshotVectorStore
+    from app.vector.store import loaded_vector_store, vector_backend
+
+    store = loaded_vector_store()
+    if store is None:
+        return {"ok": False, "loaded": False, "backend": vector_backend(), "ntotal": 0}
+    out = {"ok": True, "loaded": True, "backend": vector_backend(), "ntotal": int(store.index.ntotal)}
+    if isinstance(store, SnapshotVectorStore):
+        out["snapshot"] = store.status()
+        out["ok"] = out["snapshot"]["version"] is not None
+    else:
+        out["generation"] = store.generation
+        out["tombstones"] = store.tombstones()
+    return out
+
+
+def _check_guardrails() -> Dict[str, Any]:
+    from app.rules.safety_guardrails import guardrail_pack
+
+    compiled = guardrail_pack.cache_info().currsize > 0
+    pack = guardrail_pack()
+    return {"ok": True, "compiled_at_startup": compiled, "pack_version": pack.version, "rules": pack.rules}
+
+
+def _check_llm() -> Dict[str, Any]:
+    from app.llm.llm_client import LLMClient, http_client_open, llm_circuit
+
+    client = LLMClient()
+    circuit = llm_circuit.snapshot()
+    return {
+        "ok": True,
+        "configured": client.is_configured(),
+        "model": client.model if client.is_configured() else None,
+        "pool_open": http_client_open(),
+        "circuit": circuit,
+        "degraded": client.is_configured() and circuit["state"] == "open",
+    }
+
+
+class Readiness:
+    def __init__(self) -> None:
+        self.warmed = False
+        self.started_at: Optional[str] = None
+        self.ready_at: Optional[str] = None
+        self.cold_start_ms: Dict[str, float] = {}
+        self.warm_results: Dict[str, Any] = {}
+        self.warm_errors: Dict[str, str] = {}
+        self.mode = "warm"
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def _step(self, name: str, fn: Callable[[], Any], offload: bool = False) -> None:
+        t = time.perf_counter()
+        try:
+            if offload and not inspect.iscoroutinefunction(fn):
+                # Background warm-up shares the loop with live requests.
+                result = await asyncio.to_thread(fn)
+            else:
+                result = fn()
+            if inspect.isawaitable(result):
+                result = await result
+            self.warm_results[name] = result
+        except Exception as exc:
+            log.warning("Warm-up of %s failed: %s", name, exc)
+            self.warm_errors[name] = f"{type(exc).__name__}: {exc}"[:300]
+        finally:
+            self.cold_start_ms[name] = round((time.perf_counter() - t) * 1000.0, 3)
+
+    async def warm_up(self, offload: bool = False) -> None:
+        self.started_at = datetime.utcnow().isoformat() + "Z"
+        t = time.perf_counter()
+        for name, fn in _WARM_STEPS:
+            await self._step(name, fn, offload=offload)
+        self.cold_start_ms["total"] = round((time.perf_counter() - t) * 1000.0, 3)
+        self.warmed = True
+        self.ready_at = datetime.utcnow().isoformat() + "Z"
+        log.info("Warm-up finished in %.0fms: %s", self.cold_start_ms["total"], self.cold_start_ms)
+
+    async def start(self, mode: Optional[str] = None) -> None:
+        """Startup hook: warm up now (`warm`) or in a background task (`fast`)."""
+        self.mode = mode or startup_mode()
+        if self.mode == "fast":
+            self._task = asyncio.create_task(self.warm_up(offload=True), name="healthyfy-warm-up")
+        else:
+            await self.warm_up()
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run_check(self, fn: Callable[[], Any]) -> Dict[str, Any]:
+        try:
+            result = fn()
+            if inspect.isawaitable(result):
+                result = await asyncio.wait_for(result, timeout=check_timeout_s())
+            return result
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": f"timed out after {check_timeout_s():g}s"}
+        except Exception as exc:
+            return {"ok": False, "error": f"{type(exc).__name__}: {exc}"[:300]}
+
+    async def check(self) -> Tuple[bool, Dict[str, Any]]:
+        checks: Dict[str, Callable[[], Any]] = {
+            "db": _check_db,
+            "vector_index": _check_vector_index,
+            "coach_store": _coach_store_state,
+            "guardrails": _check_guardrails,
+            "llm": _check_llm,
+        }
+        subsystems: Dict[str, Any] = {}
+        for name, fn in checks.items():
+            subsystems[name] = await self._run_check(fn)
+            subsystems[name]["cold_start_ms"] = self.cold_start_ms.get(name)
+            if name in self.warm_errors:
+                subsystems[name]["warm_error"] = self.warm_errors[name]
+
+        required = required_subsystems()
+        failing = [name for name in required if not subsystems.get(name, {}).get("ok")]
+        ready = self.warmed and not failing
+        if not self.warmed:
+            status = "starting"
+        elif failing:
+            status = "not_ready"
+        elif subsystems["llm"].get("degraded"):
+            status = "degraded"
+        else:
+            status = "ready"
+        return ready, {
+            "ready": ready,
+            "status": status,
+            "startup_mode": self.mode,
+            "required": list(required),
+            "failing": failing,
+            "started_at": self.started_at,
+            "ready_at": self.ready_at,
+            "cold_start_ms": dict(self.cold_start_ms),
+            "subsystems": subsystems,
+        }
+
+
+readiness = Readiness()
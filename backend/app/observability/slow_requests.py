@@ -0,0 +1,116 @@
+"""Capture of slow requests into a bounded in-memory ring buffer.
+
+Every HTTP request runs with a `RequestTrace` in context. When one takes at
+least SLOW_REQUEST_MS, its trace is kept: route, status, duration, request
+and response sizes, per-stage timings, cache and retrieval outcomes, and
+notes such as retrieved chunk counts and prompt token estimates. Faster
+requests drop the trace. Served from GET /debug/slow.
+
+Env vars:
+  - SLOW_REQUEST_MS (default: 1000; 0 disables capture)
+  - SLOW_REQUEST_BUFFER (default: 100) — captured requests kept, newest first
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from app.observability.metrics import RouteTemplates
+from app.observability.tracing import RequestTrace, current_trace
+
+
+def slow_request_ms() -> float:
+    return float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+
+def slow_request_buffer() -> int:
+    return int(os.getenv("SLOW_REQUEST_BUFFER", "100"))
+
+
+class SlowRequestLog:
+    def __init__(self, threshold_ms: Optional[float] = None, capacity: Optional[int] = None) -> None:
+        self.threshold_ms = slow_request_ms() if threshold_ms is None else threshold_ms
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max(1, capacity or slow_request_buffer()))
+        self._lock = threading.Lock()
+        self.captured = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._entries.maxlen or 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.append(entry)
+            self.captured += 1
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._entries)
+        items.reverse()
+        return items[:limit] if limit else items
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._entries)
+            self._entries.clear()
+            return n
+
+
+slow_log = SlowRequestLog()
+
+
+class SlowRequestMiddleware:
+    """Pure ASGI middleware: trace each request, keep the slow ones in `slow_log`."""
+
+    def __init__(
+        self, app: Any, routes: Callable[[], Iterable[Any]] = lambda: (), log: SlowRequestLog = slow_log
+    ) -> None:
+        self.app = app
+        self.log = log
+        self._template = RouteTemplates(routes)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or self.log.threshold_ms <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = current_trace.set(trace)
+        sizes = {"request_bytes": 0, "response_bytes": 0}
+        status = [500]
+
+        async def receive_wrapper() -> Dict[str, Any]:
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            current_trace.reset(token)
+            duration_ms = (time.perf_counter() - trace.started) * 1000.0
+            if duration_ms >= self.log.threshold_ms:
+                self.log.add(
+                    {
+                        "at": datetime.utcnow().isoformat() + "Z",
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": self._template(scope.get("route")),
+                        "status": status[0],
+                        "duration_ms": round(duration_ms, 3),
+                        **sizes,
+                        **trace.as_dict(),
+                    }
+                )
@@ -0,0 +1,53 @@
+"""Per-request trace context for slow-request capture.
+
+The slow-request middleware puts a `RequestTrace` in a context variable for
+the duration of each request. Traced metrics (stage timers, cache counters)
+and `note()` add to it; work handed to thread pools sees it only when run
+under a copied context (`run_io` and chat retrieval do this).
+"""
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+# A request records at most this many stage timings; later ones are counted, not kept.
+MAX_STAGES = 256
+
+
+class RequestTrace:
+    __slots__ = ("started", "stages", "dropped_stages", "counters", "notes")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, str, float]] = []  # (component, stage, seconds), in completion order
+        self.dropped_stages = 0
+        self.counters: Dict[str, float] = {}
+        self.notes: Dict[str, Any] = {}
+
+    def stage(self, component: str, stage: str, seconds: float) -> None:
+        if len(self.stages) >= MAX_STAGES:
+            self.dropped_stages += 1
+            return
+        self.stages.append((component, stage, seconds))
+
+    def count(self, key: str, amount: float = 1) -> None:
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": [{"component": c, "stage": s, "ms": round(d * 1000.0, 3)} for c, s, d in self.stages],
+            "dropped_stages": self.dropped_stages,
+            "counters": dict(self.counters),
+            "notes": dict(self.notes),
+        }
+
+
+current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("healthyfy_request_trace", default=None)
+
+
+def note(key: str, value: Any) -> None:
+    """Attach a size or outcome to the current request's trace (no-op outside a request)."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.notes[key] = value
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import hashlib
 import re
 from dataclasses import dataclass
+from functools import lru_cache
+from typing import Pattern
+
+# Bump the name when the rules change meaningfully; the hash suffix tracks any edit.
+GUARDRAIL_PACK = "core-1"
 
 
 MEDICAL_BLOCK_PATTERNS = [
@@ -41,11 +47,24 @@ class GuardrailResult:
     safe_response: str | None = None
 
 
-def _matches_any(text: str, patterns: list[str]) -> bool:
-    for pat in patterns:
-        if re.search(pat, text, flags=re.IGNORECASE):
-            return True
-    return False
+@dataclass(frozen=True)
+class GuardrailPack:
+    version: str
+    red_flag: Pattern[str]
+    medical: Pattern[str]
+    rules: int
+
+
+@lru_cache(maxsize=1)
+def guardrail_pack() -> GuardrailPack:
+    """Rule lists compiled to one alternation per category; built once (at warm-up or first use)."""
+    digest = hashlib.sha256("\n".join(RED_FLAG_PATTERNS + ["--"] + MEDICAL_BLOCK_PATTERNS).encode("utf-8"))
+    return GuardrailPack(
+        version=f"{GUARDRAIL_PACK}+{digest.hexdigest()[:12]}",
+        red_flag=re.compile("|".join(f"(?:{p})" for p in RED_FLAG_PATTERNS), re.IGNORECASE),
+        medical=re.compile("|".join(f"(?:{p})" for p in MEDICAL_BLOCK_PATTERNS), re.IGNORECASE),
+        rules=len(RED_FLAG_PATTERNS) + len(MEDICAL_BLOCK_PATTERNS),
+    )
 
 
 def enforce_guardrails(user_text: str) -> GuardrailResult:
@@ -53,7 +72,8 @@ def enforce_guardrails(user_text: str) -> GuardrailResult:
     if not text:
         return GuardrailResult(allowed=True)
 
-    if _matches_any(text, RED_FLAG_PATTERNS):
+    pack = guardrail_pack()
+    if pack.red_flag.search(text):
         return GuardrailResult(
             allowed=False,
             reason="red_flag",
@@ -65,7 +85,7 @@ def enforce_guardrails(user_text: str) -> GuardrailResult:
             ),
         )
 
-    if _matches_any(text, MEDICAL_BLOCK_PATTERNS):
+    if pack.medical.search(text):
         return GuardrailResult(
             allowed=False,
             reason="medical_request",
@@ -5,9 +5,12 @@ import os
 from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 from uuid import uuid4
 
+from app.observability.metrics import STAGE_SECONDS
+from app.storage.io import default_data_dir, lock_for, run_io
+
 
 @dataclass
 class CoachPlan:
@@ -24,22 +27,15 @@ class CoachPlan:
 
 class CoachStore:
     def __init__(self, data_dir: str | None = None) -> None:
-        # Prefer explicit env configuration, but fall back to a stable default
-        # anchored at the repository root so local runs from different CWDs
-        # still persist to the same place.
-        resolved = (
-            data_dir
-            or os.getenv("COACH_DATA_DIR")
-            or os.getenv("VECTOR_DATA_DIR")
-            or str(Path(__file__).resolve().parents[3] / "data")
-        )
-        self.data_dir = Path(resolved)
+        self.data_dir = Path(data_dir) if data_dir else default_data_dir()
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.path = self.data_dir / "coach_plans.json"
+        self._lock = lock_for(self.path)
 
     def _now_iso(self) -> str:
         return datetime.utcnow().isoformat() + "Z"
 
+    @STAGE_SECONDS.labels("coach_store", "load").time()
     def _load_all(self) -> Dict[str, Any]:
         if not self.path.exists():
             return {"plans": {}}
@@ -48,6 +44,7 @@ class CoachStore:
         except Exception:
             return {"plans": {}}
 
+    @STAGE_SECONDS.labels("coach_store", "save").time()
     def _save_all(self, payload: Dict[str, Any]) -> None:
         tmp = self.path.with_suffix(".tmp")
         tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -74,10 +71,11 @@ class CoachStore:
             checkins=[],
         )
 
-        payload = self._load_all()
-        payload.setdefault("plans", {})
-        payload["plans"][plan.plan_id] = asdict(plan)
-        self._save_all(payload)
+        with self._lock:
+            payload = self._load_all()
+            payload.setdefault("plans", {})
+            payload["plans"][plan.plan_id] = asdict(plan)
+            self._save_all(payload)
         return plan
 
     def get_plan(self, plan_id: str) -> Optional[CoachPlan]:
@@ -94,22 +92,81 @@ class CoachStore:
         next_actions: Optional[List[str]] = None,
         checkin: Optional[Dict[str, Any]] = None,
     ) -> Optional[CoachPlan]:
-        payload = self._load_all()
-        plans = payload.get("plans") or {}
-        raw = plans.get(plan_id)
-        if not raw:
-            return None
+        with self._lock:
+            payload = self._load_all()
+            plans = payload.get("plans") or {}
+            raw = plans.get(plan_id)
+            if not raw:
+                return None
+
+            raw["updated_at"] = self._now_iso()
+            if plan_steps is not None:
+                raw["plan_steps"] = plan_steps
+            if next_actions is not None:
+                raw["next_actions"] = next_actions
+            if checkin is not None:
+                raw.setdefault("checkins", [])
+                raw["checkins"].insert(0, checkin)
 
-        raw["updated_at"] = self._now_iso()
-        if plan_steps is not None:
-            raw["plan_steps"] = plan_steps
-        if next_actions is not None:
-            raw["next_actions"] = next_actions
-        if checkin is not None:
-            raw.setdefault("checkins", [])
-            raw["checkins"].insert(0, checkin)
-
-        plans[plan_id] = raw
-        payload["plans"] = plans
-        self._save_all(payload)
+            plans[plan_id] = raw
+            payload["plans"] = plans
+            self._save_all(payload)
         return CoachPlan(**raw)
+
+    def get_plans(self, plan_ids: Iterable[str]) -> Dict[str, CoachPlan]:
+        """Load several plans with a single read of the store; unknown ids are omitted."""
+        plans = self._load_all().get("plans") or {}
+        return {pid: CoachPlan(**plans[pid]) for pid in plan_ids if plans.get(pid)}
+
+    def apply_checkins(self, updates: Dict[str, Dict[str, Any]]) -> Dict[str, CoachPlan]:
+        """Batched `update_plan`: one read and one write for many plans.
+
+        `updates` maps plan_id -> {"checkins": [...], "plan_steps"?, "next_actions"?}.
+        Check-ins stay newest-first by their `at` timestamp, so replayed offline
+        check-ins land in order even if newer ones were already recorded.
+        """
+        saved: Dict[str, CoachPlan] = {}
+        with self._lock:
+            payload = self._load_all()
+            plans = payload.setdefault("plans", {})
+            now = self._now_iso()
+            for plan_id, update in updates.items():
+                raw = plans.get(plan_id)
+                if not raw:
+                    continue
+                raw["updated_at"] = now
+                if update.get("plan_steps") is not None:
+                    raw["plan_steps"] = update["plan_steps"]
+                if update.get("next_actions") is not None:
+                    raw["next_actions"] = update["next_actions"]
+                merged = list(update.get("checkins") or []) + list(raw.get("checkins") or [])
+                merged.sort(key=lambda c: str(c.get("at") or ""), reverse=True)
+                raw["checkins"] = merged
+                saved[plan_id] = CoachPlan(**raw)
+            self._save_all(payload)
+        return saved
+
+
+class AsyncCoachStore:
+    """Awaitable facade over CoachStore for async routes.
+
+    Each call runs the blocking file I/O on the dedicated storage I/O pool.
+    """
+
+    def __init__(self, store: Optional[CoachStore] = None) -> None:
+        self.store = store or CoachStore()
+
+    async def create_plan(self, **kwargs: Any) -> CoachPlan:
+        return await run_io(self.store.create_plan, **kwargs)
+
+    async def get_plan(self, plan_id: str) -> Optional[CoachPlan]:
+        return await run_io(self.store.get_plan, plan_id=plan_id)
+
+    async def update_plan(self, **kwargs: Any) -> Optional[CoachPlan]:
+        return await run_io(self.store.update_plan, **kwargs)
+
+    async def get_plans(self, plan_ids: Iterable[str]) -> Dict[str, CoachPlan]:
+        return await run_io(self.store.get_plans, list(plan_ids))
+
+    async def apply_checkins(self, updates: Dict[str, Dict[str, Any]]) -> Dict[str, CoachPlan]:
+        return await run_io(self.store.apply_checkins, updates)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.llm.tokens import estimate_tokens
+
+
+# (user_id, session_id); a tuple so ids containing ":" can't collide.
+SessionKey = Tuple[str, str]
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+class Turn:
+    __slots__ = ("role", "text", "tokens", "at")
+
+    def __init__(self, role: str, text: str) -> None:
+        self.role = role
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.at = time.time()
+
+
+class Conversation:
+    __slots__ = ("turns", "pending", "summary_lines", "summary_tokens", "last_seen")
+
+    def __init__(self, max_turns: int) -> None:
+        # Ring buffer of recent turns; overflow is queued for summarization.
+        self.turns: deque[Turn] = deque(maxlen=max_turns)
+        self.pending: List[Turn] = []
+        self.summary_lines: deque[str] = deque()
+        self.summary_tokens = 0
+        self.last_seen = time.time()
+
+
+def _gist(turn: Turn, max_tokens: int) -> str:
+    """First sentence of a turn, clipped to roughly `max_tokens`."""
+    first = _SENTENCE_END.split(turn.text.strip(), maxsplit=1)[0].replace("\n", " ")
+    words = first.split()
+    out: List[str] = []
+    used = 0
+    for w in words:
+        cost = estimate_tokens(w)
+        if used + cost > max_tokens:
+            out.append("…")
+            break
+        out.append(w)
+        used += cost
+    return f"{turn.role}: {' '.join(out)}"
+
+
+class ConversationStore:
+    """In-memory chat history keyed by user/session.
+
+    Each session keeps the last `max_turns` turns verbatim; older turns are
+    rolled into a short extractive summary off the request path (scheduled on
+    the event loop after the response is produced). Sessions are kept in LRU
+    order and the least recently used one is evicted past `max_sessions`.
+
+    Env vars:
+      - CHAT_MAX_SESSIONS (default: 2000)
+      - CHAT_MAX_TURNS (default: 12)
+      - CHAT_SUMMARY_TOKENS (default: 160)
+    """
+
+    def __init__(
+        self,
+        max_sessions: int | None = None,
+        max_turns: int | None = None,
+        summary_token_cap: int | None = None,
+    ) -> None:
+        self.max_sessions = max_sessions or int(os.getenv("CHAT_MAX_SESSIONS", "2000"))
+        self.max_turns = max_turns or int(os.getenv("CHAT_MAX_TURNS", "12"))
+        self.summary_token_cap = summary_token_cap or int(os.getenv("CHAT_SUMMARY_TOKENS", "160"))
+        self._sessions: "OrderedDict[SessionKey, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id: str, session_id: str) -> SessionKey:
+        return (user_id, session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _touch(self, key: SessionKey) -> Conversation:
+        conv = self._sessions.get(key)
+        if conv is None:
+            conv = Conversation(self.max_turns)
+            self._sessions[key] = conv
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(key)
+        conv.last_seen = time.time()
+        return conv
+
+    def append(self, key: SessionKey, role: str, text: str) -> None:
+        with self._lock:
+            conv = self._touch(key)
+            if len(conv.turns) == conv.turns.maxlen:
+                conv.pending.append(conv.turns[0])
+            conv.turns.append(Turn(role, text))
+            needs_summary = bool(conv.pending)
+
+        if needs_summary:
+            try:
+                asyncio.get_running_loop().call_soon(self._roll_summary, conv)
+            except RuntimeError:
+                self._roll_summary(conv)
+
+    def _roll_summary(self, conv: Conversation) -> None:
+        with self._lock:
+            pending, conv.pending = conv.pending, []
+            for turn in pending:
+                line = _gist(turn, max_tokens=24)
+                conv.summary_lines.append(line)
+                conv.summary_tokens += estimate_tokens(line)
+            # Oldest summary lines fall off first once the cap is hit.
+            while conv.summary_tokens > self.summary_token_cap and conv.summary_lines:
+                conv.summary_tokens -= estimate_tokens(conv.summary_lines.popleft())
+
+    def context(self, key: SessionKey, token_budget: int) -> Optional[Dict[str, Any]]:
+        """Summary + newest turns that fit `token_budget`, oldest first."""
+        with self._lock:
+            conv = self._sessions.get(key)
+            if conv is None:
+                return None
+            self._sessions.move_to_end(key)
+            summary = " | ".join(conv.summary_lines)
+            used = conv.summary_tokens if summary else 0
+            recent: List[Dict[str, str]] = []
+            for turn in reversed(conv.turns):
+                if used + turn.tokens > token_budget:
+                    break
+                recent.append({"role": turn.role, "text": turn.text})
+                used += turn.tokens
+
+        recent.reverse()
+        return {"summary": summary, "turns": recent, "tokens": used}
+
+    def clear(self, key: SessionKey) -> bool:
+        with self._lock:
+            return self._sessions.pop(key, None) is not None
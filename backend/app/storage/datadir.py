@@ -0,0 +1,522 @@
+"""Generation manifests, point-in-time backups and restore for the data dirs.
+
+The vector store never rewrites a file in place. Each save writes a new
+generation of its files next to the old ones:
+
+  healthyfy.g000007.faiss        FAISS index (NumPy path: healthyfy.g000007.embeddings.npy)
+  healthyfy.g000007.chunks       chunk table (app.vector.chunk_table)
+  healthyfy.g000007.tombstones.npy   only while rows are tombstoned
+
+and then flips `healthyfy.manifest.json` (generation, row count, and the
+size and SHA-256 of every file) into place with one atomic rename. A reader
+therefore sees all files of one generation or all files of the next, and
+never a new index paired with old chunks. Files of older generations are
+deleted after the flip. On load the store checks the manifest: every file
+exists with the recorded size, and the row counts of index, chunk table and
+tombstones agree. With VECTOR_VERIFY_CHECKSUMS=1 it also checks the hashes.
+
+Because generation files are immutable, a backup is a set of hard links,
+which is instant and shares disk with the live data:
+
+  <BACKUP_DIR>/<name>/
+    BACKUP.json          name, created_at, generation, size + SHA-256 of every app file
+    vector/              the manifest + hard links to its generation files,
+                         and ingest/checkpoint.json
+    app/                 coach_plans.json, forecast_state/, insights/ (hard links;
+                         those files are only ever replaced), timeseries/
+                         (copied: its columns are appended in place, so both
+                         columns of a series are copied under its append lock
+                         and cut to the same row count)
+
+A backup is built in a temporary directory and renamed into place once
+BACKUP.json is written; anything without BACKUP.json is ignored.
+
+Restore links the backup's vector files in as a new generation, so
+generation numbers only grow, and then flips the manifest. It also
+replaces the app files and, with VECTOR_SNAPSHOTS=1, publishes a snapshot
+of the restored index. Run restore with ingestion stopped, then restart
+the workers. Snapshot workers pick up the restored index on their own.
+
+Run from backend/:
+  python -m app.storage.datadir status
+  python -m app.storage.datadir backup [--name NAME]
+  python -m app.storage.datadir list
+  python -m app.storage.datadir verify [NAME]      # no NAME: the live generation
+  python -m app.storage.datadir restore NAME
+
+Env vars:
+  - BACKUP_DIR (default: <VECTOR_DATA_DIR>/backups) — keep it on the data dir's filesystem so backups can hard-link
+  - VECTOR_VERIFY_CHECKSUMS (default: 0) — hash every manifest file when the vector store loads
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.storage.io import default_data_dir, lock_for
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: saves are only serialized per process
+    fcntl = None  # type: ignore[assignment]
+
+log = logging.getLogger("healthyfy")
+
+MANIFEST = "healthyfy.manifest.json"
+BACKUP_INFO = "BACKUP.json"
+FORMAT = 1
+_GENERATION_FILE = re.compile(r"^healthyfy\.g(\d{6,})\.")
+# Pre-manifest file names, removed by the first generational save.
+LEGACY_FILES = (
+    "healthyfy.faiss",
+    "healthyfy.chunks",
+    "healthyfy.meta.json",
+    "healthyfy.tombstones.npy",
+    "healthyfy.embeddings.npy",
+)
+# App data under default_data_dir(); the directories' files are replaced
+# atomically, except timeseries/ whose columns grow in place.
+APP_FILES = ("coach_plans.json",)
+APP_DIRS = ("forecast_state", "insights")
+APP_APPEND_DIRS = ("timeseries",)
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+class ManifestError(ValueError):
+    """Files on disk don't match the manifest (missing, truncated or from another generation)."""
+
+
+def verify_checksums() -> bool:
+    return os.getenv("VECTOR_VERIFY_CHECKSUMS", "0").lower() in {"1", "true", "yes", "on"}
+
+
+def backup_dir(data_dir: str | Path) -> Path:
+    return Path(os.getenv("BACKUP_DIR") or Path(data_dir) / "backups")
+
+
+def generation_file(generation: int, suffix: str) -> str:
+    return f"healthyfy.g{generation:06d}.{suffix}"
+
+
+def _now_iso() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # pragma: no cover - platforms without directory fds
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_file(path: Path) -> None:
+    with open(path, "rb") as fh:
+        os.fsync(fh.fileno())
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def describe(path: Path) -> Dict[str, Any]:
+    return {"name": path.name, "size": path.stat().st_size, "sha256": file_digest(path)}
+
+
+@contextlib.contextmanager
+def datadir_lock(data_dir: str | Path) -> Iterator[None]:
+    """Serialize manifest flips and backups of one data dir, across threads and processes."""
+    data_dir = Path(data_dir)
+    key = str(data_dir.resolve())
+    with _local_locks_guard:
+        local = _local_locks.setdefault(key, threading.Lock())
+    with local:
+        if fcntl is None:
+            yield
+            return
+        data_dir.mkdir(parents=True, exist_ok=True)
+        with open(data_dir / ".healthyfy.lock", "a+b") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+# --- manifest ---------------------------------------------------------------
+
+
+def read_manifest(data_dir: str | Path) -> Optional[Dict[str, Any]]:
+    path = Path(data_dir) / MANIFEST
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except ValueError as exc:
+        raise ManifestError(f"{path}: unreadable manifest: {exc}") from None
+    if manifest.get("format") != FORMAT or "generation" not in manifest or "files" not in manifest:
+        raise ManifestError(f"{path}: unsupported manifest")
+    return manifest
+
+
+def write_manifest(data_dir: str | Path, manifest: Dict[str, Any]) -> None:
+    """Atomically make `manifest` current. Caller holds `datadir_lock`."""
+    data_dir = Path(data_dir)
+    tmp = data_dir / f".{MANIFEST}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, data_dir / MANIFEST)
+    _fsync_dir(data_dir)
+
+
+def verify_manifest(data_dir: str | Path, manifest: Dict[str, Any], checksums: bool = False) -> None:
+    """Raise ManifestError unless every file the manifest lists is present and intact."""
+    data_dir = Path(data_dir)
+    generation = int(manifest["generation"])
+    for kind, entry in manifest["files"].items():
+        path = data_dir / entry["name"]
+        match = _GENERATION_FILE.match(entry["name"])
+        if match is None or int(match.group(1)) != generation:
+            raise ManifestError(f"{kind} file {entry['name']} is not from generation {generation}")
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            raise ManifestError(f"generation {generation}: {kind} file {entry['name']} is missing") from None
+        if size != entry["size"]:
+            raise ManifestError(f"generation {generation}: {entry['name']} is {size} bytes, manifest says {entry['size']}")
+        if checksums and file_digest(path) != entry["sha256"]:
+            raise ManifestError(f"generation {generation}: {entry['name']} does not match its checksum")
+
+
+def prune_generations(data_dir: str | Path, manifest: Dict[str, Any]) -> int:
+    """Delete generation and legacy files the current manifest doesn't reference."""
+    data_dir = Path(data_dir)
+    keep = {entry["name"] for entry in manifest["files"].values()}
+    removed = 0
+    for path in data_dir.iterdir():
+        stale = path.name in LEGACY_FILES or (_GENERATION_FILE.match(path.name) and path.name not in keep)
+        if stale and path.is_file():
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+# --- backups ----------------------------------------------------------------
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Another filesystem (BACKUP_DIR elsewhere) or no hard links: copy.
+        shutil.copy2(src, dst)
+
+
+def _series_base(path: Path) -> Optional[Path]:
+    """`<dir>/<metric>` for a time-series column file, else None."""
+    from app.storage.timeseries_store import COLUMN_SUFFIXES
+
+    for suffix in COLUMN_SUFFIXES:
+        if path.name.endswith(suffix):
+            return path.with_name(path.name[: -len(suffix)])
+    return None
+
+
+def _copy_series(src: Path, dst: Path) -> List[Path]:
+    """Copy the columns of series `src` to `dst` as whole rows; returns the files written.
+
+    Holds the lock `TimeSeriesStore` appends under, so no row lands between
+    the column copies, and cuts every column to the rows they all have (a
+    torn tail is dropped, not paired with the wrong timestamp).
+    """
+    from app.storage.timeseries_store import COLUMN_SUFFIXES
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    with lock_for(src):
+        columns = [(Path(f"{src}{suffix}"), Path(f"{dst}{suffix}")) for suffix in COLUMN_SUFFIXES]
+        present = [(s, d) for s, d in columns if s.is_file()]
+        if not present:
+            raise FileNotFoundError(src)
+        size = min(s.stat().st_size if s.is_file() else 0 for s, _ in columns) // 8 * 8
+        for s, d in present:
+            with open(s, "rb") as fin, open(d, "wb") as fout:
+                shutil.copyfileobj(fin, fout, length=1 << 20)
+                fout.truncate(size)
+    return [d for _, d in present]
+
+
+def _app_files(app_dir: Path) -> Iterator[tuple[str, Path, bool]]:
+    """(relative path, path, append_only) of the app data worth backing up."""
+    for name in APP_FILES:
+        path = app_dir / name
+        if path.is_file():
+            yield name, path, False
+    for dirname in APP_DIRS + APP_APPEND_DIRS:
+        root = app_dir / dirname
+        if not root.is_dir():
+            continue
+        for path in sorted(root.rglob("*")):
+            if path.is_file() and not path.name.endswith(".tmp"):
+                yield path.relative_to(app_dir).as_posix(), path, dirname in APP_APPEND_DIRS
+
+
+def backup(
+    data_dir: str | Path,
+    app_dir: str | Path | None = None,
+    name: Optional[str] = None,
+    root: str | Path | None = None,
+) -> Dict[str, Any]:
+    """Snapshot the live vector generation and the app data; returns BACKUP.json."""
+    data_dir = Path(data_dir).resolve()
+    app_dir = Path(app_dir or default_data_dir()).resolve()
+    root = Path(root or backup_dir(data_dir))
+    if read_manifest(data_dir) is None and any((data_dir / legacy).exists() for legacy in LEGACY_FILES):
+        # Pre-manifest data dir: one save converts it to a generation.
+        from app.vector.store import FaissVectorStore
+
+        FaissVectorStore(data_dir=data_dir).save()
+
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    tmp = root / f".tmp-{stamp}-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    try:
+        with datadir_lock(data_dir):
+            manifest = read_manifest(data_dir)
+            if manifest is not None:
+                verify_manifest(data_dir, manifest)
+                for entry in manifest["files"].values():
+                    _link_or_copy(data_dir / entry["name"], tmp / "vector" / entry["name"])
+                (tmp / "vector" / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+            checkpoint = data_dir / "ingest" / "checkpoint.json"
+            if checkpoint.is_file():
+                _link_or_copy(checkpoint, tmp / "vector" / "ingest" / "checkpoint.json")
+
+        files: Dict[str, Dict[str, Any]] = {}
+        series_done = set()
+        for rel, path, append_only in _app_files(app_dir):
+            target = tmp / "app" / rel
+            base = _series_base(path) if append_only else None
+            try:
+                if base is not None:
+                    if base in series_done:
+                        continue
+                    series_done.add(base)
+                    written = _copy_series(base, _series_base(target))
+                else:
+                    _link_or_copy(path, target)
+                    written = [target]
+            except FileNotFoundError:  # replaced or removed mid-walk
+                continue
+            for out in written:
+                files[out.relative_to(tmp / "app").as_posix()] = {"size": out.stat().st_size, "sha256": file_digest(out)}
+
+        generation = manifest["generation"] if manifest is not None else None
+        name = name or (f"{stamp}-g{generation:06d}" if generation is not None else stamp)
+        if not re.fullmatch(r"[A-Za-z0-9._-]+", name) or name.startswith("."):
+            raise ValueError(f"invalid backup name: {name!r}")
+        info = {
+            "name": name,
+            "created_at": _now_iso(),
+            "generation": generation,
+            "rows": manifest.get("rows") if manifest is not None else 0,
+            "data_dir": str(data_dir),
+            "app_dir": str(app_dir),
+            "app_files": files,
+        }
+        (tmp / BACKUP_INFO).write_text(json.dumps(info, indent=2), encoding="utf-8")
+        final = root / name
+        if final.exists():
+            raise FileExistsError(f"backup {final} already exists")
+        os.rename(tmp, final)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    log.info("Backed up %s (generation %s) to %s", data_dir, info["generation"], final)
+    return info
+
+
+def list_backups(data_dir: str | Path, root: str | Path | None = None) -> List[Dict[str, Any]]:
+    root = Path(root or backup_dir(data_dir))
+    if not root.is_dir():
+        return []
+    out = []
+    for path in sorted(root.iterdir()):
+        info_path = path / BACKUP_INFO
+        if path.name.startswith(".") or not info_path.is_file():
+            continue
+        info = json.loads(info_path.read_text(encoding="utf-8"))
+        out.append({k: info.get(k) for k in ("name", "created_at", "generation", "rows")} | {"app_files": len(info.get("app_files", {}))})
+    return out
+
+
+def verify_backup(path: Path) -> Dict[str, Any]:
+    """Check every file of a backup against its recorded checksum; returns BACKUP.json."""
+    info_path = path / BACKUP_INFO
+    if not info_path.is_file():
+        raise ManifestError(f"{path}: not a complete backup")
+    info = json.loads(info_path.read_text(encoding="utf-8"))
+    manifest = read_manifest(path / "vector")
+    if manifest is not None:
+        verify_manifest(path / "vector", manifest, checksums=True)
+    for rel, entry in info.get("app_files", {}).items():
+        target = path / "app" / rel
+        if not target.is_file() or target.stat().st_size != entry["size"] or file_digest(target) != entry["sha256"]:
+            raise ManifestError(f"{path}: app file {rel} is missing or corrupt")
+    return info
+
+
+def _replace_tree(src: Path, dst: Path, copy: bool) -> None:
+    staging = dst.with_name(f".restore-{dst.name}.tmp")
+    old = dst.with_name(f".restore-{dst.name}.old")
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.rmtree(old, ignore_errors=True)
+    if src.is_dir():
+        for path in sorted(src.rglob("*")):
+            if path.is_file():
+                target = staging / path.relative_to(src)
+                base = _series_base(path) if copy else None
+                if base is not None:
+                    # Both columns go together on the first file of a series; this also
+                    # realigns backups taken before columns were copied as a pair.
+                    if not target.exists():
+                        _copy_series(base, _series_base(target))
+                else:
+                    _link_or_copy(path, target)
+    if dst.exists():
+        os.rename(dst, old)
+    if staging.exists():
+        os.rename(staging, dst)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def restore(
+    name: str,
+    data_dir: str | Path,
+    app_dir: str | Path | None = None,
+    root: str | Path | None = None,
+) -> Dict[str, Any]:
+    """Make backup `name` the live state; returns the new vector manifest (or {})."""
+    data_dir = Path(data_dir).resolve()
+    app_dir = Path(app_dir or default_data_dir()).resolve()
+    path = Path(root or backup_dir(data_dir)) / name
+    info = verify_backup(path)
+    saved = read_manifest(path / "vector")
+
+    manifest: Dict[str, Any] = {}
+    with datadir_lock(data_dir):
+        current = read_manifest(data_dir)
+        if saved is not None:
+            # Link the backup in as the next generation so numbers only grow.
+            generation = max(int(saved["generation"]), int(current["generation"]) if current else 0) + 1
+            files = {}
+            for kind, entry in saved["files"].items():
+                suffix = _GENERATION_FILE.sub("", entry["name"])
+                target = data_dir / generation_file(generation, suffix)
+                target.unlink(missing_ok=True)
+                _link_or_copy(path / "vector" / entry["name"], target)
+                files[kind] = dict(entry, name=target.name)
+            manifest = dict(saved, generation=generation, files=files, restored_from=name, created_at=_now_iso())
+            write_manifest(data_dir, manifest)
+            prune_generations(data_dir, manifest)
+        checkpoint = path / "vector" / "ingest" / "checkpoint.json"
+        live_checkpoint = data_dir / "ingest" / "checkpoint.json"
+        live_checkpoint.unlink(missing_ok=True)
+        if checkpoint.is_file():
+            _link_or_copy(checkpoint, live_checkpoint)
+
+    for rel in APP_FILES:
+        src, dst = path / "app" / rel, app_dir / rel
+        if src.is_file():
+            staging = dst.with_name(f".restore-{dst.name}.tmp")
+            staging.unlink(missing_ok=True)
+            _link_or_copy(src, staging)
+            os.replace(staging, dst)
+        else:
+            dst.unlink(missing_ok=True)
+    for dirname in APP_DIRS + APP_APPEND_DIRS:
+        _replace_tree(path / "app" / dirname, app_dir / dirname, copy=dirname in APP_APPEND_DIRS)
+
+    from app.vector.snapshot import publish_from_store, snapshot_root, snapshots_enabled
+
+    if manifest and (snapshots_enabled() or (snapshot_root(data_dir) / "CURRENT").exists()):
+        from app.vector.store import FaissVectorStore
+
+        publish_from_store(FaissVectorStore(data_dir=data_dir))
+    log.info("Restored backup %s (generation %s) into %s", name, info.get("generation"), data_dir)
+    return manifest
+
+
+def status(data_dir: str | Path) -> Dict[str, Any]:
+    manifest = read_manifest(data_dir)
+    if manifest is None:
+        return {"generation": None, "legacy_files": [f for f in LEGACY_FILES if (Path(data_dir) / f).exists()]}
+    return {
+        "generation": manifest["generation"],
+        "rows": manifest.get("rows"),
+        "created_at": manifest.get("created_at"),
+        "restored_from": manifest.get("restored_from"),
+        "files": {kind: {"name": e["name"], "size": e["size"]} for kind, e in manifest["files"].items()},
+    }
+
+
+def main() -> None:
+    from app.vector.store import _resolve_data_dir
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "backup", "list", "verify", "restore"])
+    parser.add_argument("name", nargs="?", help="Backup name (verify, restore).")
+    parser.add_argument("--name", dest="backup_name", default=None, help="Name for a new backup.")
+    parser.add_argument("--data-dir", default=None, help="Defaults to VECTOR_DATA_DIR.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    data_dir = _resolve_data_dir(args.data_dir)
+    if args.command == "status":
+        print(json.dumps(status(data_dir), indent=2))
+    elif args.command == "backup":
+        info = backup(data_dir, name=args.backup_name)
+        print(f"backup {info['name']}: generation {info['generation']}, {len(info['app_files'])} app files")
+    elif args.command == "list":
+        for entry in list_backups(data_dir):
+            print(f"{entry['name']}  generation={entry['generation']}  rows={entry['rows']}  created={entry['created_at']}")
+    elif args.command == "verify":
+        if args.name:
+            verify_backup(backup_dir(data_dir) / args.name)
+        else:
+            manifest = read_manifest(data_dir)
+            if manifest is None:
+                raise SystemExit("no manifest: the data dir has not been saved with generations yet")
+            verify_manifest(data_dir, manifest, checksums=True)
+        print("ok")
+    else:
+        if not args.name:
+            parser.error("restore needs a backup name")
+        manifest = restore(args.name, data_dir)
+        print(f"restored {args.name} as generation {manifest.get('generation')}; restart the workers")
+
+
+if __name__ == "__main__":
+    main()
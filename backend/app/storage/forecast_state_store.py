@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.ml.online import OnlineRegressionState
+from app.storage.io import default_data_dir, lock_for, run_io, safe_filename
+
+
+def _default_decay() -> float:
+    return float(os.getenv("FORECAST_DECAY", "1.0"))
+
+
+def _default_window() -> int:
+    return int(os.getenv("FORECAST_WINDOW", "0"))
+
+
+def numeric_metrics(metrics: Dict[str, object]) -> Iterable[Tuple[str, float]]:
+    """Finite numeric values from a free-form check-in metrics dict."""
+    for name, value in (metrics or {}).items():
+        if isinstance(value, bool):
+            continue
+        try:
+            v = float(value)  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            continue
+        if math.isfinite(v):
+            yield str(name), v
+
+
+class ForecastStateStore:
+    """Per user/metric `OnlineRegressionState`, one small JSON file each.
+
+    Updates touch only the affected file, so ingesting an observation costs
+    O(1) regardless of history length or the number of users.
+
+    Env vars:
+      - FORECAST_DECAY (default: 1.0, no decay) — applied to newly created states
+      - FORECAST_WINDOW (default: 0, unbounded) — applied to newly created states
+    """
+
+    def __init__(self, data_dir: str | None = None) -> None:
+        self.root = (Path(data_dir) if data_dir else default_data_dir()) / "forecast_state"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, user_id: str, metric: str) -> Path:
+        return self.root / safe_filename(user_id) / f"{safe_filename(metric)}.json"
+
+    def get(self, user_id: str, metric: str) -> Optional[OnlineRegressionState]:
+        path = self._path(user_id, metric)
+        if not path.exists():
+            return None
+        try:
+            return OnlineRegressionState.from_dict(json.loads(path.read_text(encoding="utf-8")))
+        except Exception:
+            return None
+
+    def _put(self, path: Path, state: OnlineRegressionState) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state.to_dict()), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def observe(
+        self,
+        user_id: str,
+        metric: str,
+        values: Iterable[float],
+        decay: Optional[float] = None,
+        window: Optional[int] = None,
+        reset: bool = False,
+    ) -> OnlineRegressionState:
+        """Append observations (oldest first); `decay`/`window` apply when the state is (re)created."""
+        path = self._path(user_id, metric)
+        with lock_for(path):
+            state = None if reset else self.get(user_id, metric)
+            if state is None:
+                state = OnlineRegressionState(
+                    decay=_default_decay() if decay is None else decay,
+                    window=_default_window() if window is None else window,
+                )
+            for v in values:
+                state.update(v)
+            self._put(path, state)
+        return state
+
+    def observe_metrics(self, user_id: str, metrics: Dict[str, object]) -> Dict[str, OnlineRegressionState]:
+        return {name: self.observe(user_id, name, [v]) for name, v in numeric_metrics(metrics)}
+
+    def observe_metrics_batch(
+        self, user_id: str, rows: List[Dict[str, object]]
+    ) -> Dict[str, OnlineRegressionState]:
+        """Observe many metrics dicts (oldest first) with one state write per metric."""
+        columns: Dict[str, List[float]] = {}
+        for metrics in rows:
+            for name, v in numeric_metrics(metrics):
+                columns.setdefault(name, []).append(v)
+        return {name: self.observe(user_id, name, values) for name, values in columns.items()}
+
+    async def observe_metrics_async(self, user_id: str, metrics: Dict[str, object]) -> Dict[str, OnlineRegressionState]:
+        return await run_io(self.observe_metrics, user_id, metrics)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.ml.insights import PlanInsights
+from app.storage.forecast_state_store import numeric_metrics
+from app.storage.io import default_data_dir, lock_for, run_io, safe_filename
+
+
+class InsightsStore:
+    """One materialized `PlanInsights` JSON file per plan.
+
+    `record_checkin` folds a check-in into the plan's record under the path
+    lock; `get` is a single small file read, independent of history length.
+    """
+
+    def __init__(self, data_dir: str | None = None) -> None:
+        self.root = (Path(data_dir) if data_dir else default_data_dir()) / "insights"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, plan_id: str) -> Path:
+        return self.root / f"{safe_filename(plan_id)}.json"
+
+    def get(self, plan_id: str) -> Optional[PlanInsights]:
+        path = self._path(plan_id)
+        if not path.exists():
+            return None
+        try:
+            return PlanInsights.from_dict(json.loads(path.read_text(encoding="utf-8")))
+        except Exception:
+            return None
+
+    def record_checkin(self, plan_id: str, checkin: Dict[str, Any]) -> PlanInsights:
+        return self.record_checkins(plan_id, [checkin])
+
+    def record_checkins(self, plan_id: str, checkins: List[Dict[str, Any]]) -> PlanInsights:
+        """Fold check-ins (oldest first) into the plan's record with a single write."""
+        path = self._path(plan_id)
+        with lock_for(path):
+            insights = self.get(plan_id) or PlanInsights()
+            for checkin in checkins:
+                insights.update(
+                    at=str(checkin["at"]),
+                    adherence=float(checkin.get("adherence", 0.0) or 0.0),
+                    metrics=dict(numeric_metrics(checkin.get("metrics") or {})),
+                )
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(insights.to_dict()), encoding="utf-8")
+            os.replace(tmp, path)
+        return insights
+
+    async def get_async(self, plan_id: str) -> Optional[PlanInsights]:
+        return await run_io(self.get, plan_id)
+
+    async def record_checkin_async(self, plan_id: str, checkin: Dict[str, Any]) -> PlanInsights:
+        return await run_io(self.record_checkin, plan_id, checkin)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+from urllib.parse import quote
+
+T = TypeVar("T")
+
+# Storage file I/O gets its own bounded pool so it never competes with
+# FastAPI's shared threadpool (used by every sync route).
+_io_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("COACH_IO_WORKERS", "4")),
+    thread_name_prefix="coach-io",
+)
+
+
+async def run_io(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    # Like asyncio.to_thread: the worker sees the caller's context (request trace).
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_io_pool, functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+# Striped: a fixed set of locks picked by path hash, so the table doesn't grow
+# with every plan/metric file ever touched. Unrelated paths can share a stripe;
+# no caller holds two path locks at once, so that only costs some contention.
+_PATH_LOCK_STRIPES = 64
+_path_locks = tuple(threading.Lock() for _ in range(_PATH_LOCK_STRIPES))
+
+
+def lock_for(path: Path) -> threading.Lock:
+    # Read-modify-write of a JSON file must not interleave across threads.
+    return _path_locks[hash(str(path.resolve())) % _PATH_LOCK_STRIPES]
+
+
+def default_data_dir() -> Path:
+    # Prefer explicit env configuration, but fall back to a stable default
+    # anchored at the repository root so local runs from different CWDs
+    # still persist to the same place.
+    return Path(
+        os.getenv("COACH_DATA_DIR")
+        or os.getenv("VECTOR_DATA_DIR")
+        or str(Path(__file__).resolve().parents[3] / "data")
+    )
+
+
+def safe_filename(name: str) -> str:
+    # Percent-encode separators, and a leading dot so "." / ".." can't escape the root.
+    encoded = quote(name, safe="")
+    return "%2E" + encoded[1:] if encoded.startswith(".") else encoded
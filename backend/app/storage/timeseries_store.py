@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from app.lazy import lazy_import
+from app.storage.forecast_state_store import numeric_metrics
+from app.storage.io import default_data_dir, lock_for, safe_filename
+
+# Each (plan, metric) series is two append-only columns of little-endian
+# float64: `<metric>.ts.f8` (UTC epoch seconds) and `<metric>.val.f8`.
+# Appends are an 8-byte write per column; reads are read-only np.memmap views,
+# so forecasting a series never parses JSON or copies the raw values.
+_DTYPE = "<f8"
+_PACK = struct.Struct("<d")
+_TS_SUFFIX = ".ts.f8"
+_VAL_SUFFIX = ".val.f8"
+COLUMN_SUFFIXES = (_TS_SUFFIX, _VAL_SUFFIX)
+
+np = lazy_import("numpy")
+
+
+def _map(path: Path) -> np.ndarray:
+    size = path.stat().st_size if path.exists() else 0
+    count = size // _PACK.size
+    if count == 0:
+        return np.empty(0, dtype=_DTYPE)
+    return np.memmap(path, dtype=_DTYPE, mode="r", shape=(count,))
+
+
+class TimeSeriesStore:
+    """Columnar per-plan, per-metric time series for check-in metrics."""
+
+    def __init__(self, data_dir: str | None = None) -> None:
+        self.root = (Path(data_dir) if data_dir else default_data_dir()) / "timeseries"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _base(self, plan_id: str, metric: str) -> Path:
+        return self.root / safe_filename(plan_id) / safe_filename(metric)
+
+    def _write(self, plan_id: str, metric: str, ts_bytes: bytes, val_bytes: bytes) -> None:
+        base = self._base(plan_id, metric)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        with lock_for(base), open(f"{base}{_VAL_SUFFIX}", "ab") as val_f, open(f"{base}{_TS_SUFFIX}", "ab") as ts_f:
+            # A crash between the two appends, or a short write (ENOSPC), leaves
+            # a torn tail: one column longer, or a partial 8-byte value. Cut both
+            # back to the whole rows they share before appending, or every later
+            # value would be paired with the wrong timestamp.
+            size = min(val_f.tell(), ts_f.tell()) // _PACK.size * _PACK.size
+            for f in (val_f, ts_f):
+                if f.tell() != size:
+                    f.truncate(size)
+            val_f.write(val_bytes)
+            ts_f.write(ts_bytes)
+
+    def append(self, plan_id: str, at_ts: float, value: float, metric: str) -> None:
+        self._write(plan_id, metric, _PACK.pack(float(at_ts)), _PACK.pack(float(value)))
+
+    def append_metrics(self, plan_id: str, at_ts: float, metrics: Dict[str, object]) -> List[str]:
+        written = []
+        for name, value in numeric_metrics(metrics):
+            self.append(plan_id, at_ts, value, name)
+            written.append(name)
+        return written
+
+    def append_rows(self, plan_id: str, rows: List[Tuple[float, Dict[str, object]]]) -> List[str]:
+        """Append many (timestamp, metrics) rows with one write per column."""
+        columns: Dict[str, Tuple[List[float], List[float]]] = {}
+        for at_ts, metrics in rows:
+            for name, value in numeric_metrics(metrics):
+                ts_col, val_col = columns.setdefault(name, ([], []))
+                ts_col.append(at_ts)
+                val_col.append(value)
+        for name, (ts_col, val_col) in columns.items():
+            self._write(
+                plan_id,
+                name,
+                np.asarray(ts_col, dtype=_DTYPE).tobytes(),
+                np.asarray(val_col, dtype=_DTYPE).tobytes(),
+            )
+        return sorted(columns)
+
+    def read(self, plan_id: str, metric: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Zero-copy (timestamps, values) views, oldest first; None if the series doesn't exist."""
+        base = self._base(plan_id, metric)
+        ts_path = Path(f"{base}{_TS_SUFFIX}")
+        if not ts_path.exists():
+            return None
+        ts = _map(ts_path)
+        values = _map(Path(f"{base}{_VAL_SUFFIX}"))
+        n = min(ts.shape[0], values.shape[0])
+        return ts[:n], values[:n]
+
+    def last_timestamp(self, plan_id: str) -> Optional[float]:
+        """Newest timestamp stored for any of the plan's metrics; None without history."""
+        newest: Optional[float] = None
+        for metric in self.metrics(plan_id):
+            series = self.read(plan_id, metric)
+            if series is not None and series[0].shape[0]:
+                last = float(series[0][-1])
+                newest = last if newest is None else max(newest, last)
+        return newest
+
+    def metrics(self, plan_id: str) -> List[str]:
+        plan_dir = self.root / safe_filename(plan_id)
+        if not plan_dir.is_dir():
+            return []
+        return sorted(unquote(p.name[: -len(_TS_SUFFIX)]) for p in plan_dir.glob(f"*{_TS_SUFFIX}"))
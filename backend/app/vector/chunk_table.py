@@ -0,0 +1,368 @@
+"""Columnar storage for retrieval chunks.
+
+A `ChunkTable` holds n chunks as a handful of flat arrays instead of n
+`DocChunk` objects (each with its own `__dict__`, text string and meta dict):
+
+  - ids and texts: one UTF-8 blob each plus uint64 offsets[n + 1]
+  - meta: one int32 code column per key (-1 = key absent), and per key a
+    dictionary of its distinct values, JSON-encoded and decoded on first use
+
+`DocChunk`s are built on demand (`chunk(i)`), so a search materialises only
+the rows it returns. Metadata filters compare integer codes and never
+decode a row.
+
+Tables are immutable: `extend()` and `take()` return a new table, so a
+reader holding the old one is never affected by a concurrent append or
+compaction.
+
+On disk (`write` / `open`) a table is a single file: 8-byte magic, u32
+header length, a small JSON header (row count, meta keys, section table)
+and the 8-byte-aligned sections. `open` maps the file and wraps each
+section in a NumPy view: nothing is parsed per row, and load time does not
+grow with the number of chunks.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from app.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+MAGIC = b"HFYCHNK1"
+_HEADER_LEN = struct.Struct("<I")
+_OFFSETS = "<u8"
+_CODES = "<i4"
+_ABSENT = -1
+
+
+@dataclass
+class DocChunk:
+    id: str
+    text: str
+    meta: dict
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _encode_value(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+class _Strings:
+    """UTF-8 blob + offsets; row i is blob[offsets[i]:offsets[i + 1]]."""
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: Any, offsets: Any) -> None:
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, values: Iterable[str]) -> "_Strings":
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=_OFFSETS)
+        if encoded:
+            offsets[1:] = np.cumsum([len(e) for e in encoded])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[int(self.offsets[i]) : int(self.offsets[i + 1])].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def take(self, rows: Any) -> "_Strings":
+        """Rows `rows` (ascending), copying the blob one contiguous run of rows at a time."""
+        lengths = self.offsets[rows + 1] - self.offsets[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=_OFFSETS)
+        if len(rows):
+            offsets[1:] = np.cumsum(lengths)
+        runs = np.split(rows, np.flatnonzero(np.diff(rows) != 1) + 1) if len(rows) else []
+        parts = [self.blob[int(self.offsets[run[0]]) : int(self.offsets[run[-1] + 1])] for run in runs]
+        return _Strings(np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint8), offsets)
+
+    def concat(self, other: "_Strings") -> "_Strings":
+        offsets = np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]])
+        return _Strings(np.concatenate([self.blob, other.blob]), offsets)
+
+
+class _Dictionary:
+    """Distinct values of one meta key, addressed by int code."""
+
+    __slots__ = ("_encoded", "_codes", "_decoded")
+
+    def __init__(self, encoded: Sequence[str] | _Strings = ()) -> None:
+        self._encoded = encoded
+        self._codes: Optional[Dict[str, int]] = None
+        self._decoded: Dict[int, Any] = {}
+
+    def _materialize(self) -> List[str]:
+        if not isinstance(self._encoded, list):
+            self._encoded = list(self._encoded)
+        return self._encoded
+
+    def __len__(self) -> int:
+        return len(self._encoded)
+
+    def code_of(self, value: Any) -> Optional[int]:
+        if self._codes is None:
+            self._codes = {v: i for i, v in enumerate(self._materialize())}
+        return self._codes.get(_encode_value(value))
+
+    def value(self, code: int) -> Any:
+        if code not in self._decoded:
+            self._decoded[code] = json.loads(self._encoded[code])
+        return self._decoded[code]
+
+    def copy(self) -> "_Dictionary":
+        return _Dictionary(list(self._materialize()))
+
+    def add(self, value: Any) -> int:
+        encoded = _encode_value(value)
+        values = self._materialize()
+        if self._codes is None:
+            self._codes = {v: i for i, v in enumerate(values)}
+        code = self._codes.get(encoded)
+        if code is None:
+            code = self._codes[encoded] = len(values)
+            values.append(encoded)
+        return code
+
+    def strings(self) -> _Strings:
+        return self._encoded if isinstance(self._encoded, _Strings) else _Strings.build(self._encoded)
+
+
+class ChunkTable:
+    def __init__(
+        self,
+        ids: _Strings,
+        texts: _Strings,
+        keys: Sequence[str] = (),
+        codes: Optional[Dict[str, Any]] = None,
+        dictionaries: Optional[Dict[str, _Dictionary]] = None,
+    ) -> None:
+        self._ids = ids
+        self._texts = texts
+        self.keys: Tuple[str, ...] = tuple(keys)
+        self._codes: Dict[str, Any] = codes or {}
+        self._dicts: Dict[str, _Dictionary] = dictionaries or {}
+
+    @classmethod
+    def empty(cls) -> "ChunkTable":
+        return cls(_Strings.build(()), _Strings.build(()))
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[DocChunk]) -> "ChunkTable":
+        return cls.empty().extend(chunks)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # --- row access ---------------------------------------------------------
+
+    def id(self, i: int) -> str:
+        return self._ids[i]
+
+    def text(self, i: int) -> str:
+        return self._texts[i]
+
+    def ids(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def texts(self) -> Iterator[str]:
+        return iter(self._texts)
+
+    def meta(self, i: int) -> dict:
+        out = {}
+        for key in self.keys:
+            code = int(self._codes[key][i])
+            if code != _ABSENT:
+                out[key] = self._dicts[key].value(code)
+        return out
+
+    def chunk(self, i: int) -> DocChunk:
+        return DocChunk(id=self._ids[i], text=self._texts[i], meta=self.meta(i))
+
+    def chunks(self) -> Iterator[DocChunk]:
+        for i in range(len(self)):
+            yield self.chunk(i)
+
+    # --- filtering ----------------------------------------------------------
+
+    def _wanted_codes(self, where: Mapping[str, Any]) -> Dict[str, List[int]]:
+        # Same semantics as matching a meta dict: each key must equal the given
+        # value, or be one of them for a list/tuple/set; None matches "absent".
+        wanted: Dict[str, List[int]] = {}
+        for key, value in where.items():
+            values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+            dictionary = self._dicts.get(key)
+            codes: List[int] = []
+            for v in values:
+                if v is None:
+                    codes.append(_ABSENT)
+                if dictionary is not None:
+                    code = dictionary.code_of(v)
+                    if code is not None:
+                        codes.append(code)
+            wanted[key] = codes
+        return wanted
+
+    def mask(self, where: Mapping[str, Any]) -> Any:
+        """bool[n]: rows whose meta matches `where`."""
+        out = np.ones(len(self), dtype=bool)
+        for key, codes in self._wanted_codes(where).items():
+            column = self._codes.get(key)
+            if column is None:
+                if _ABSENT not in codes:
+                    return np.zeros(len(self), dtype=bool)
+                continue
+            out &= np.isin(column, codes)
+        return out
+
+    def row_filter(self, where: Mapping[str, Any]) -> Callable[[int], bool]:
+        """Predicate for single rows, for when only a few candidates are checked."""
+        wanted = [(self._codes.get(key), frozenset(codes)) for key, codes in self._wanted_codes(where).items()]
+
+        def matches(i: int) -> bool:
+            for column, codes in wanted:
+                code = _ABSENT if column is None else int(column[i])
+                if code not in codes:
+                    return False
+            return True
+
+        return matches
+
+    # --- building -----------------------------------------------------------
+
+    def extend(self, chunks: Iterable[DocChunk]) -> "ChunkTable":
+        """A new table with `chunks` appended."""
+        rows = list(chunks)
+        if not rows:
+            return self
+        n, m = len(self), len(rows)
+        keys = list(self.keys)
+        dicts = {key: d.copy() for key, d in self._dicts.items()}
+        new_codes: Dict[str, Any] = {key: np.full(m, _ABSENT, dtype=_CODES) for key in keys}
+        for j, row in enumerate(rows):
+            for key, value in (row.meta or {}).items():
+                if key not in dicts:
+                    keys.append(key)
+                    dicts[key] = _Dictionary([])
+                    new_codes[key] = np.full(m, _ABSENT, dtype=_CODES)
+                new_codes[key][j] = dicts[key].add(value)
+        codes = {}
+        for key in keys:
+            old = self._codes.get(key)
+            if old is None:
+                old = np.full(n, _ABSENT, dtype=_CODES)
+            codes[key] = np.concatenate([old, new_codes[key]])
+        return ChunkTable(
+            self._ids.concat(_Strings.build(r.id for r in rows)),
+            self._texts.concat(_Strings.build(r.text for r in rows)),
+            keys,
+            codes,
+            dicts,
+        )
+
+    def take(self, rows: Any) -> "ChunkTable":
+        """A new table with only `rows` (ascending row numbers), e.g. the live rows after deletes."""
+        rows = np.asarray(rows, dtype=np.int64)
+        # Dictionaries are shared: tables never mutate them (`extend` copies first).
+        return ChunkTable(
+            self._ids.take(rows),
+            self._texts.take(rows),
+            self.keys,
+            {key: column[rows] for key, column in self._codes.items()},
+            self._dicts,
+        )
+
+    # --- on-disk format -----------------------------------------------------
+
+    def _sections(self) -> List[Tuple[str, Any]]:
+        sections = [
+            ("ids.off", self._ids.offsets),
+            ("ids.bin", self._ids.blob),
+            ("text.off", self._texts.offsets),
+            ("text.bin", self._texts.blob),
+        ]
+        for j, key in enumerate(self.keys):
+            strings = self._dicts[key].strings()
+            sections += [
+                (f"meta.{j}.codes", self._codes[key]),
+                (f"meta.{j}.dict.off", strings.offsets),
+                (f"meta.{j}.dict.bin", strings.blob),
+            ]
+        return sections
+
+    def write(self, path: str | Path) -> None:
+        """Write atomically (temp file + fsync + rename)."""
+        path = Path(path)
+        table: Dict[str, List[Any]] = {}
+        position = 0
+        sections = self._sections()
+        for name, array in sections:
+            table[name] = [position, array.dtype.str, int(array.shape[0])]
+            position = _align(position + array.nbytes)
+        header = json.dumps({"format": 1, "count": len(self), "keys": list(self.keys), "sections": table}).encode("utf-8")
+        base = _align(len(MAGIC) + _HEADER_LEN.size + len(header))
+
+        tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+        with open(tmp, "wb") as fh:
+            fh.write(MAGIC + _HEADER_LEN.pack(len(header)) + header)
+            for name, array in sections:
+                fh.seek(base + table[name][0])
+                fh.write(np.ascontiguousarray(array).tobytes())
+            fh.truncate(base + position)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: str | Path) -> "ChunkTable":
+        """Map a table written by `write`, read-only."""
+        with open(path, "rb") as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a chunk table")
+        (header_len,) = _HEADER_LEN.unpack_from(mm, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LEN.size
+        header = json.loads(mm[start : start + header_len])
+        base = _align(start + header_len)
+
+        def section(name: str) -> Any:
+            offset, dtype, count = header["sections"][name]
+            if count == 0:
+                return np.zeros(0, dtype=dtype)
+            if base + offset + count * np.dtype(dtype).itemsize > len(mm):
+                raise ValueError(f"{path}: section {name} is truncated")
+            return np.frombuffer(mm, dtype=dtype, count=count, offset=base + offset)
+
+        keys = header["keys"]
+        codes = {key: section(f"meta.{j}.codes") for j, key in enumerate(keys)}
+        dicts = {
+            key: _Dictionary(_Strings(section(f"meta.{j}.dict.bin"), section(f"meta.{j}.dict.off")))
+            for j, key in enumerate(keys)
+        }
+        table = cls(
+            _Strings(section("ids.bin"), section("ids.off")),
+            _Strings(section("text.bin"), section("text.off")),
+            keys,
+            codes,
+            dicts,
+        )
+        if len(table) != header["count"]:
+            raise ValueError(f"{path}: header says {header['count']} rows, found {len(table)}")
+        return table
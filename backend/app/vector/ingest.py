@@ -0,0 +1,751 @@
+"""Ingestion of wellness corpora into the vector index.
+
+Files stream through a generator pipeline:
+
+  discover -> parse -> chunk (word windows with overlap) -> normalize
+    -> exact dedupe (content hash) -> batch -> embed + MinHash (process pool)
+    -> near-duplicate dedupe (MinHash LSH) -> append -> checkpoint
+
+Formats: Markdown (.md, .markdown, .txt; optional `key: value` front matter
+becomes chunk meta), HTML (.html, .htm; script/style dropped) and JSONL (one
+document per line: `text` or `content`, optional `id`, `title`, `topic`,
+`meta`). Chunk ids are `<doc id>#<n>`, where the doc id is the file's path
+relative to the ingested directory (plus `:<record id or line>` for JSONL).
+Chunks are upserted by id, so re-ingesting an edited file replaces the
+chunks whose text changed.
+
+Resuming: appended chunks are saved every INGEST_CHECKPOINT_CHUNKS, and a
+file is recorded in `<data dir>/ingest/checkpoint.json` (with its size and
+mtime) once all of its chunks are saved. A rerun skips recorded, unchanged
+files; a file that was cut off midway is read again and the chunks already
+saved from it are dropped as exact duplicates.
+
+Chunks are appended to a private copy of the store, never to the one
+serving searches. With VECTOR_SNAPSHOTS=1 every checkpoint publishes a
+snapshot, so all workers pick up the new chunks. Without it, the process
+that ran the ingestion reloads its store at every checkpoint; other workers
+see the chunks once restarted. Vector writes through /api/admin/vector/*
+are refused while a job runs, since the next checkpoint would overwrite them.
+
+Run from backend/:
+  python -m app.vector.ingest PATH [PATH ...]    # files or directories
+  python -m app.vector.ingest docs/ --workers 8 --no-resume
+
+Env vars:
+  - INGEST_ROOT (default: <VECTOR_DATA_DIR>/inbox) — POST /api/admin/ingest only reads below it
+  - INGEST_WORKERS (default: min(4, CPUs)) — embedding processes; 0 embeds in-process
+  - INGEST_CHUNK_WORDS (default: 160) / INGEST_OVERLAP_WORDS (default: 32)
+  - INGEST_BATCH (default: 256) — chunks per embedding task
+  - INGEST_CHECKPOINT_CHUNKS (default: 5000) — chunks appended between saves
+  - INGEST_NEAR_DUP (default: 0.9; 0 disables) — estimated Jaccard similarity that marks a near-duplicate
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.lazy import lazy_import
+from app.observability.metrics import Counter
+from app.vector.chunk_table import DocChunk
+from app.vector.store import FaissVectorStore, _resolve_data_dir, _stable_hash_embedding, get_vector_store
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: one ingestion per process only
+    fcntl = None  # type: ignore[assignment]
+
+np = lazy_import("numpy")
+
+log = logging.getLogger("healthyfy")
+
+MARKDOWN_SUFFIXES = (".md", ".markdown", ".txt")
+HTML_SUFFIXES = (".html", ".htm")
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+SUFFIXES = MARKDOWN_SUFFIXES + HTML_SUFFIXES + JSONL_SUFFIXES
+
+NUM_PERM = 64
+LSH_BANDS = 8  # 8 bands x 8 rows: candidate pairs from ~0.77 similarity up; verified against INGEST_NEAR_DUP
+SHINGLE_WORDS = 3
+
+INGEST_CHUNKS = Counter(
+    "healthyfy_ingest_chunks_total", "Chunks seen by ingestion, by outcome.", ("outcome",)
+)
+
+
+def ingest_root() -> Path:
+    return Path(os.getenv("INGEST_ROOT") or Path(_resolve_data_dir(None)) / "inbox").resolve()
+
+
+def ingest_workers() -> int:
+    return int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def chunk_words() -> int:
+    return int(os.getenv("INGEST_CHUNK_WORDS", "160"))
+
+
+def overlap_words() -> int:
+    return int(os.getenv("INGEST_OVERLAP_WORDS", "32"))
+
+
+def ingest_batch() -> int:
+    return int(os.getenv("INGEST_BATCH", "256"))
+
+
+def checkpoint_chunks() -> int:
+    return int(os.getenv("INGEST_CHECKPOINT_CHUNKS", "5000"))
+
+
+def near_dup_threshold() -> float:
+    return float(os.getenv("INGEST_NEAR_DUP", "0.9"))
+
+
+class IngestBusyError(RuntimeError):
+    """Another ingestion is already writing to this data dir."""
+
+
+# --- discover / parse -------------------------------------------------------
+
+
+@dataclass
+class SourceFile:
+    path: Path
+    rel: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def key(self) -> str:
+        return str(self.path)
+
+
+@dataclass
+class Document:
+    doc_id: str
+    text: str
+    meta: Dict[str, Any]
+
+
+def discover(paths: Iterable[str | Path]) -> Iterator[SourceFile]:
+    """Supported files under each path (recursively for directories), in name order."""
+    for raw in paths:
+        root = Path(raw).resolve()
+        if root.is_file():
+            files: Iterable[Path] = [root]
+            base = root.parent
+        else:
+            files = sorted(p for p in root.rglob("*") if p.is_file())
+            base = root
+        for path in files:
+            if path.suffix.lower() not in SUFFIXES or any(part.startswith(".") for part in path.relative_to(base).parts):
+                continue
+            st = path.stat()
+            yield SourceFile(path, path.relative_to(base).as_posix(), st.st_size, st.st_mtime_ns)
+
+
+_FRONT_MATTER = re.compile(r"\A---[ \t]*\n(.*?)\n---[ \t]*\n", re.S)
+_MD_FENCE = re.compile(r"^\s*(```|~~~).*$", re.M)
+_MD_IMAGE_OR_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_MD_LINE_MARKER = re.compile(r"^\s{0,3}(#{1,6}|>|[-*+]|\d+[.)])\s+", re.M)
+_MD_EMPHASIS = re.compile(r"(\*\*|__|\*|`)")
+_HTML_TAG = re.compile(r"<[^>]+>")
+_MD_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$", re.M)
+
+
+def parse_markdown(text: str) -> Tuple[str, Dict[str, Any]]:
+    meta: Dict[str, Any] = {}
+    m = _FRONT_MATTER.match(text)
+    if m:
+        for line in m.group(1).splitlines():
+            key, sep, value = line.partition(":")
+            if sep and key.strip():
+                meta[key.strip()] = value.strip().strip("\"'")
+        text = text[m.end() :]
+    if "title" not in meta:
+        heading = _MD_HEADING.search(text)
+        if heading:
+            meta["title"] = heading.group(1)
+    text = _MD_FENCE.sub("", text)
+    text = _MD_IMAGE_OR_LINK.sub(r"\1", text)
+    text = _MD_LINE_MARKER.sub("", text)
+    text = _MD_EMPHASIS.sub("", text)
+    text = _HTML_TAG.sub(" ", text)
+    return text, meta
+
+
+class _HTMLText(HTMLParser):
+    _SKIP = {"script", "style", "noscript", "template", "svg"}
+    _BLOCK = {"p", "div", "br", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "section", "article"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        if tag in self._SKIP:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self.parts.append(data)
+
+
+def parse_html(text: str) -> Tuple[str, Dict[str, Any]]:
+    parser = _HTMLText()
+    parser.feed(text)
+    parser.close()
+    meta = {"title": parser.title.strip()} if parser.title.strip() else {}
+    return "".join(parser.parts), meta
+
+
+def parse(source: SourceFile, on_error: Callable[[str], None] = lambda _: None) -> Iterator[Document]:
+    """Documents in one file; JSONL is read line by line."""
+    suffix = source.path.suffix.lower()
+    base_meta = {"source": source.rel}
+    if suffix in JSONL_SUFFIXES:
+        with open(source.path, encoding="utf-8", errors="replace") as fh:
+            for lineno, line in enumerate(fh, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    text = record.get("text") or record.get("content") or ""
+                except (ValueError, AttributeError) as exc:
+                    on_error(f"{source.rel}:{lineno}: {exc}")
+                    continue
+                meta = dict(base_meta, **(record.get("meta") or {}))
+                for key in ("title", "topic"):
+                    if record.get(key) is not None:
+                        meta[key] = record[key]
+                yield Document(f"{source.rel}:{record.get('id') or lineno}", str(text), meta)
+        return
+    raw = source.path.read_text(encoding="utf-8", errors="replace")
+    text, meta = parse_html(raw) if suffix in HTML_SUFFIXES else parse_markdown(raw)
+    yield Document(source.rel, text, {**base_meta, **meta})
+
+
+# --- chunk / normalize / hash -----------------------------------------------
+
+_CONTROL = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _SPACE.sub(" ", _CONTROL.sub(" ", unicodedata.normalize("NFKC", text))).strip()
+
+
+def chunk(text: str, words: int, overlap: int) -> Iterator[str]:
+    """Windows of `words` words, each starting `words - overlap` after the previous one."""
+    tokens = text.split()
+    if not tokens:
+        return
+    step = max(1, words - max(0, overlap))
+    for start in range(0, len(tokens), step):
+        yield " ".join(tokens[start : start + words])
+        if start + words >= len(tokens):
+            break
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.lower().encode("utf-8"), digest_size=16).digest()
+
+
+def _permutations(num_perm: int = NUM_PERM) -> Tuple[Any, Any]:
+    rng = np.random.default_rng(0x6865616C)
+    a = rng.integers(0, 1 << 64, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 1 << 64, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash(text: str, perms: Tuple[Any, Any]) -> Any:
+    """uint32[NUM_PERM] signature over the word 3-grams of the lowercased text."""
+    a, b = perms
+    words = text.lower().split()
+    shingles = {" ".join(words[i : i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # Multiply-shift: high 32 bits of (a*x + b) mod 2**64 (uint64 arithmetic wraps).
+    values = (hashes[:, None] * a[None, :] + b[None, :]) >> np.uint64(32)
+    return values.min(axis=0).astype(np.uint32)
+
+
+def _prepare(texts: Sequence[str], dim: int, embed: bool = True) -> Tuple[Any, Any]:
+    """Process-pool task: (embeddings or None, MinHash signatures)."""
+    if not texts:
+        return np.zeros((0, dim), dtype=np.float32), np.zeros((0, NUM_PERM), dtype=np.uint32)
+    perms = _permutations()
+    signatures = np.stack([minhash(t, perms) for t in texts])
+    if not embed:
+        return None, signatures
+    vectors = np.stack([_stable_hash_embedding(t, dim) for t in texts]).astype(np.float32)
+    return vectors, signatures
+
+
+class MinHashLSH:
+    """Banded LSH over MinHash signatures; `add_unless_similar` is the dedupe check."""
+
+    def __init__(self, threshold: float, bands: int = LSH_BANDS) -> None:
+        self.threshold = threshold
+        self.bands = bands
+        self._buckets: Dict[int, List[int]] = {}
+        self._signatures: List[Any] = []
+        self._ids: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _keys(self, signature: Any) -> List[int]:
+        rows = len(signature) // self.bands
+        return [hash((band, signature[band * rows : (band + 1) * rows].tobytes())) for band in range(self.bands)]
+
+    def add_unless_similar(self, signature: Any, chunk_id: Optional[str] = None) -> bool:
+        """Index `signature` and return True, or return False if a similar one is indexed.
+
+        A similar signature indexed under the same `chunk_id` doesn't count: that
+        is the previous version of a chunk being updated.
+        """
+        keys = self._keys(signature)
+        seen = set()
+        for key in keys:
+            for idx in self._buckets.get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                if chunk_id is not None and self._ids[idx] == chunk_id:
+                    continue
+                if float(np.mean(self._signatures[idx] == signature)) >= self.threshold:
+                    return False
+        idx = len(self._signatures)
+        self._signatures.append(signature)
+        self._ids.append(chunk_id)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(idx)
+        return True
+
+
+# --- progress / checkpoint --------------------------------------------------
+
+
+@dataclass
+class IngestProgress:
+    state: str = "pending"  # pending | running | done | cancelled | failed
+    files_total: int = 0
+    files_done: int = 0
+    files_skipped: int = 0
+    documents: int = 0
+    chunks_seen: int = 0
+    chunks_added: int = 0
+    duplicates: int = 0
+    near_duplicates: int = 0
+    parse_errors: int = 0
+    bytes_read: int = 0
+    checkpoints: int = 0
+    current_file: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    elapsed_s: float = 0.0
+    error: Optional[str] = None
+    _t0: float = field(default=0.0, repr=False)
+
+    def tick(self) -> None:
+        if self._t0:
+            self.elapsed_s = round(time.perf_counter() - self._t0, 3)
+
+    def as_dict(self) -> Dict[str, Any]:
+        if self.state == "running":
+            self.tick()
+        out = {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+        elapsed = max(self.elapsed_s, 1e-9)
+        out["chunks_per_s"] = round(self.chunks_seen / elapsed, 1) if self.elapsed_s else 0.0
+        out["mb_per_s"] = round(self.bytes_read / 2**20 / elapsed, 3) if self.elapsed_s else 0.0
+        return out
+
+
+class Checkpoint:
+    """Files fully ingested into a data dir: {path: {size, mtime_ns, chunks, at}}."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        try:
+            self.files: Dict[str, Dict[str, Any]] = json.loads(path.read_text(encoding="utf-8")).get("files", {})
+        except FileNotFoundError:
+            self.files = {}
+
+    def is_done(self, source: SourceFile) -> bool:
+        record = self.files.get(source.key)
+        return bool(record) and record["size"] == source.size and record["mtime_ns"] == source.mtime_ns
+
+    def mark(self, source: SourceFile, chunks: int) -> None:
+        self.files[source.key] = {
+            "size": source.size,
+            "mtime_ns": source.mtime_ns,
+            "chunks": chunks,
+            "at": datetime.utcnow().isoformat() + "Z",
+        }
+
+    def clear(self) -> None:
+        self.files = {}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"files": self.files}, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+@contextlib.contextmanager
+def _ingest_lock(directory: Path) -> Iterator[None]:
+    directory.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(directory / ".lock", "a+b") as fh:
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise IngestBusyError(f"another ingestion holds {directory / '.lock'}") from None
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def store_write_lock(data_dir: str | Path | None = None) -> Iterator[None]:
+    """Hold the ingestion lock around a write to the live store (admin upsert/delete/compact).
+
+    An ingestion appends to its own copy of the persisted store and saves it at
+    every checkpoint, which would drop a write made while it runs. Raises
+    IngestBusyError while an ingestion (this process or another) holds the lock.
+    """
+    with _ingest_lock(Path(_resolve_data_dir(data_dir)) / "ingest"):
+        if fcntl is None and running():  # no flock (Windows): at least check this process
+            raise IngestBusyError("an ingestion job is running")
+        yield
+
+
+# --- pipeline ---------------------------------------------------------------
+
+
+class Ingestion:
+    def __init__(
+        self,
+        paths: Sequence[str | Path],
+        data_dir: str | Path | None = None,
+        workers: Optional[int] = None,
+        words: Optional[int] = None,
+        overlap: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        checkpoint_every: Optional[int] = None,
+        near_dup: Optional[float] = None,
+        resume: bool = True,
+    ) -> None:
+        self.paths = [Path(p) for p in paths]
+        self.data_dir = Path(_resolve_data_dir(data_dir))
+        self.workers = ingest_workers() if workers is None else max(0, workers)
+        self.words = words or chunk_words()
+        self.overlap = overlap_words() if overlap is None else overlap
+        self.batch_size = batch_size or ingest_batch()
+        self.checkpoint_every = checkpoint_every or checkpoint_chunks()
+        self.near_dup = near_dup_threshold() if near_dup is None else near_dup
+        self.resume = resume
+        self.progress = IngestProgress()
+        self._cancel = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    # Chunks flow as (DocChunk, file index) so files can be checkpointed once
+    # every chunk they produced has been saved.
+    def _chunks(self, files: List[SourceFile], checkpoint: Checkpoint, seen: set) -> Iterator[Tuple[Optional[DocChunk], int]]:
+        p = self.progress
+        for n, source in enumerate(files):
+            if self._cancel.is_set():
+                return
+            if self.resume and checkpoint.is_done(source):
+                p.files_skipped += 1
+                continue
+            p.current_file = source.rel
+            for doc in parse(source, on_error=self._parse_error):
+                p.documents += 1
+                for i, text in enumerate(chunk(doc.text, self.words, self.overlap)):
+                    text = normalize(text)
+                    if not text:
+                        continue
+                    p.chunks_seen += 1
+                    digest = content_hash(text)
+                    if digest in seen:
+                        p.duplicates += 1
+                        INGEST_CHUNKS.inc(("duplicate",))
+                        continue
+                    seen.add(digest)
+                    meta = dict(doc.meta)
+                    meta["chunk"] = i
+                    yield DocChunk(id=f"{doc.doc_id}#{i}", text=text, meta=meta), n
+            p.bytes_read += source.size
+            yield None, n  # end-of-file marker
+
+    def _parse_error(self, message: str) -> None:
+        self.progress.parse_errors += 1
+        log.warning("Ingestion skipped a record: %s", message)
+
+    def run(self, on_progress: Optional[Callable[[IngestProgress], None]] = None, report_every_s: float = 2.0) -> IngestProgress:
+        from app.vector.snapshot import SnapshotVectorStore, publish, publish_lock, snapshot_root
+
+        p = self.progress
+        p.state = "running"
+        p.started_at = datetime.utcnow().isoformat() + "Z"
+        p._t0 = time.perf_counter()
+        state_dir = self.data_dir / "ingest"
+        pool: Optional[ProcessPoolExecutor] = None
+        try:
+            with _ingest_lock(state_dir):
+                live = get_vector_store(self.data_dir)
+                snapshot_mode = isinstance(live, SnapshotVectorStore)
+                # Append to a private copy of the persisted store: FAISS can't
+                # grow an index that request threads are searching. The live
+                # store picks up each checkpoint (reload or snapshot).
+                store = FaissVectorStore(data_dir=self.data_dir, auto_compact=False)
+                checkpoint = Checkpoint(state_dir / "checkpoint.json")
+                if not self.resume:
+                    checkpoint.clear()
+
+                if self.workers > 0:
+                    pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                indexed = store.live_table()
+                existing = list(indexed.texts())
+                seen = {content_hash(normalize(t)) for t in existing}
+                lsh = MinHashLSH(self.near_dup) if self.near_dup > 0 else None
+                if lsh is not None and existing:
+                    existing_ids = list(indexed.ids())
+                    for i in range(0, len(existing), self.batch_size):
+                        _, signatures = self._compute(pool, existing[i : i + self.batch_size], store.dim, embed=False).result()
+                        for j, signature in enumerate(signatures):
+                            lsh.add_unless_similar(signature, existing_ids[i + j])
+                del existing
+
+                files = list(discover(self.paths))
+                p.files_total = len(files)
+                appended_since_save = 0
+                file_chunks: Dict[int, int] = {}
+                finished: List[int] = []  # files whose every chunk has been appended
+                inflight: Deque[Tuple[Future, List[Tuple[DocChunk, int]], List[int]]] = deque()
+                batch: List[Tuple[DocChunk, int]] = []
+                ended: List[int] = []
+                last_report = time.perf_counter()
+
+                def flush() -> None:
+                    nonlocal appended_since_save
+                    if snapshot_mode:
+                        with publish_lock(snapshot_root(self.data_dir)):
+                            if store.needs_compaction():
+                                store.compact(save=False)
+                            store.save()
+                            publish(snapshot_root(self.data_dir), *store.live_rows())
+                        live.refresh(force=True)
+                    else:
+                        if store.needs_compaction():
+                            store.compact(save=False)
+                        store.save()
+                        live.reload()
+                    for n in finished:
+                        checkpoint.mark(files[n], file_chunks.get(n, 0))
+                    p.files_done += len(finished)
+                    finished.clear()
+                    checkpoint.save()
+                    p.checkpoints += 1
+                    appended_since_save = 0
+
+                def drain_one() -> None:
+                    nonlocal appended_since_save
+                    future, rows, done_files = inflight.popleft()
+                    vectors, signatures = future.result()
+                    keep = []
+                    for j, (row, n) in enumerate(rows):
+                        if lsh is not None and not lsh.add_unless_similar(signatures[j], row.id):
+                            p.near_duplicates += 1
+                            INGEST_CHUNKS.inc(("near_duplicate",))
+                            continue
+                        keep.append(j)
+                        file_chunks[n] = file_chunks.get(n, 0) + 1
+                    if keep:
+                        store.upsert_documents([rows[j][0] for j in keep], vectors=vectors[keep], save=False)
+                        p.chunks_added += len(keep)
+                        appended_since_save += len(keep)
+                        INGEST_CHUNKS.inc(("added",), len(keep))
+                    finished.extend(done_files)
+                    if appended_since_save >= self.checkpoint_every:
+                        flush()
+
+                def submit() -> None:
+                    rows = list(batch)
+                    inflight.append((self._compute(pool, [r.text for r, _ in rows], store.dim), rows, list(ended)))
+                    batch.clear()
+                    ended.clear()
+                    while len(inflight) > max(1, self.workers) * 2:
+                        drain_one()
+
+                for row, n in self._chunks(files, checkpoint, seen):
+                    if row is None:
+                        ended.append(n)
+                    else:
+                        batch.append((row, n))
+                    if len(batch) >= self.batch_size:
+                        submit()
+                    if on_progress is not None and time.perf_counter() - last_report >= report_every_s:
+                        last_report = time.perf_counter()
+                        p.tick()
+                        on_progress(p)
+                if batch or ended:
+                    submit()
+                while inflight:
+                    drain_one()
+                flush()
+            p.state = "cancelled" if self._cancel.is_set() else "done"
+        except Exception as exc:
+            p.state = "failed"
+            p.error = f"{type(exc).__name__}: {exc}"[:500]
+            log.exception("Ingestion failed")
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            p.current_file = None
+            p.finished_at = datetime.utcnow().isoformat() + "Z"
+            p.tick()
+            if on_progress is not None:
+                on_progress(p)
+        return p
+
+    def _compute(self, pool: Optional[ProcessPoolExecutor], texts: List[str], dim: int, embed: bool = True) -> Future:
+        if pool is not None:
+            return pool.submit(_prepare, texts, dim, embed)
+        future: Future = Future()
+        future.set_result(_prepare(texts, dim, embed))
+        return future
+
+
+# --- background jobs (admin endpoint) ----------------------------------------
+
+
+class IngestJob:
+    def __init__(self, ingestion: Ingestion, paths: Sequence[str]) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.paths = list(paths)
+        self.ingestion = ingestion
+        self.thread = threading.Thread(target=ingestion.run, name=f"ingest-{self.id}", daemon=True)
+
+    @property
+    def running(self) -> bool:
+        return self.thread.is_alive()
+
+    def status(self) -> Dict[str, Any]:
+        return {"job_id": self.id, "paths": self.paths, **self.ingestion.progress.as_dict()}
+
+
+_jobs: Dict[str, IngestJob] = {}
+_jobs_lock = threading.Lock()
+MAX_JOBS_KEPT = 20
+
+
+def start_job(paths: Sequence[str], **options: Any) -> IngestJob:
+    with _jobs_lock:
+        if any(job.running for job in _jobs.values()):
+            raise IngestBusyError("an ingestion job is already running")
+        job = IngestJob(Ingestion(paths, **options), paths)
+        _jobs[job.id] = job
+        for old in list(_jobs)[:-MAX_JOBS_KEPT]:
+            if not _jobs[old].running:
+                del _jobs[old]
+        job.thread.start()
+        return job
+
+
+def running() -> bool:
+    """Whether an ingestion job is running in this process."""
+    return any(job.running for job in list(_jobs.values()))
+
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    return _jobs.get(job_id)
+
+
+def list_jobs() -> List[IngestJob]:
+    return list(reversed(list(_jobs.values())))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Files or directories to ingest.")
+    parser.add_argument("--data-dir", default=None, help="Defaults to VECTOR_DATA_DIR.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-words", type=int, default=None)
+    parser.add_argument("--overlap-words", type=int, default=None)
+    parser.add_argument("--near-dup", type=float, default=None, help="0 disables near-duplicate detection.")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore the checkpoint and read every file.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    def report(p: IngestProgress) -> None:
+        d = p.as_dict()
+        print(
+            f"[{d['state']}] files {d['files_done'] + d['files_skipped']}/{d['files_total']} "
+            f"chunks seen={d['chunks_seen']} added={d['chunks_added']} dup={d['duplicates']} "
+            f"near-dup={d['near_duplicates']}  {d['chunks_per_s']} chunks/s  {d['mb_per_s']} MB/s",
+            flush=True,
+        )
+
+    ingestion = Ingestion(
+        args.paths,
+        data_dir=args.data_dir,
+        workers=args.workers,
+        words=args.chunk_words,
+        overlap=args.overlap_words,
+        near_dup=args.near_dup,
+        resume=not args.no_resume,
+    )
+    try:
+        progress = ingestion.run(on_progress=report)
+    except KeyboardInterrupt:
+        ingestion.cancel()
+        raise SystemExit(130)
+    if progress.state != "done":
+        raise SystemExit(f"ingestion {progress.state}: {progress.error or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""Versioned, memory-mapped index snapshots shared by all workers.
+
+Without snapshots every uvicorn/gunicorn worker loads its own
+`FaissVectorStore`: a private copy of the vectors and of every `DocChunk`.
+With VECTOR_SNAPSHOTS=1 one process publishes an immutable snapshot of the
+index to disk, and every worker maps it read-only. The pages live once in
+the OS page cache, whatever the number of workers, and a worker holds only
+the file mappings plus the top-k `DocChunk`s it builds per search.
+
+Layout under `<VECTOR_DATA_DIR>/snapshots/`:
+
+  CURRENT            name of the live version directory, replaced atomically
+  .lock              flock held while publishing
+  v000007/           immutable once renamed into place
+    manifest.json    version, count, dim, created_at
+    vectors.f32      float32[count, dim], row-major
+    chunks.tbl       columnar chunk table (app.vector.chunk_table)
+
+Publishing writes a `.tmp` directory, fsyncs it, renames it to the next
+version and then replaces CURRENT. Each worker re-reads CURRENT at most
+every VECTOR_SNAPSHOT_POLL_S seconds and, when it changed, maps the new
+version and swaps one reference; searches already running finish on the
+old mapping. Versions beyond VECTOR_SNAPSHOT_KEEP are deleted, which is safe
+for workers still mapping them (POSIX keeps unlinked files readable).
+
+Writes (`add_documents`, `upsert_documents`, `delete_documents`) go through
+the persisted `FaissVectorStore` under the publish lock and publish a new
+version, so a worker never keeps a writable copy of the corpus in memory.
+Versions hold only live rows: tombstoned rows are left out when publishing,
+and the persisted index is compacted inline once past VECTOR_COMPACT_RATIO.
+
+Run from backend/:
+  python -m app.vector.snapshot publish    # build a snapshot from the persisted index
+  python -m app.vector.snapshot status
+
+Env vars:
+  - VECTOR_SNAPSHOTS (default: 0) — serve searches from the shared snapshot
+  - VECTOR_SNAPSHOT_POLL_S (default: 2) — how often a worker checks for a new version
+  - VECTOR_SNAPSHOT_KEEP (default: 3) — published versions kept on disk
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+from app.lazy import lazy_import
+from app.observability.metrics import STAGE_SECONDS
+from app.vector.chunk_table import ChunkTable, DocChunk
+from app.vector.store import FaissVectorStore, _stable_hash_embedding
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: publishing is only serialized per process
+    fcntl = None  # type: ignore[assignment]
+
+np = lazy_import("numpy")
+
+log = logging.getLogger("healthyfy")
+
+CURRENT = "CURRENT"
+_PREFIX = "v"
+_local_publish_lock = threading.Lock()
+
+
+def snapshots_enabled() -> bool:
+    return os.getenv("VECTOR_SNAPSHOTS", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def snapshot_poll_s() -> float:
+    return float(os.getenv("VECTOR_SNAPSHOT_POLL_S", "2"))
+
+
+def snapshot_keep() -> int:
+    return max(1, int(os.getenv("VECTOR_SNAPSHOT_KEEP", "3")))
+
+
+def snapshot_root(data_dir: str | Path) -> Path:
+    return Path(data_dir) / "snapshots"
+
+
+def current_version(root: Path) -> Optional[str]:
+    try:
+        name = (root / CURRENT).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return name or None
+
+
+def _versions(root: Path) -> List[str]:
+    if not root.is_dir():
+        return []
+    return sorted(p.name for p in root.iterdir() if p.is_dir() and p.name.startswith(_PREFIX) and p.name[1:].isdigit())
+
+
+@contextlib.contextmanager
+def publish_lock(root: Path) -> Iterator[None]:
+    """Serializes publishers across threads and, where flock exists, processes."""
+    root.mkdir(parents=True, exist_ok=True)
+    with _local_publish_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(root / ".lock", "a+b") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _write_file(path: Path, data: bytes) -> None:
+    with open(path, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def _fsync_dir(path: Path) -> None:
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def publish(root: Path, vectors: Any, table: ChunkTable, keep: Optional[int] = None) -> str:
+    """Write a new immutable version and make it current. Caller holds `publish_lock(root)`."""
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    if vectors.ndim != 2 or vectors.shape[0] != len(table):
+        raise ValueError(f"{vectors.shape[0]} vectors for {len(table)} chunks")
+    existing = _versions(root)
+    number = int(existing[-1][1:]) + 1 if existing else 1
+    name = f"{_PREFIX}{number:06d}"
+    tmp = root / f".{name}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    _write_file(tmp / "vectors.f32", vectors.tobytes())
+    table.write(tmp / "chunks.tbl")
+    manifest = {
+        "version": number,
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+    }
+    _write_file(tmp / "manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
+    _fsync_dir(tmp)
+
+    os.rename(tmp, root / name)
+    pointer = root / f".{CURRENT}.tmp-{os.getpid()}"
+    _write_file(pointer, name.encode("utf-8"))
+    os.replace(pointer, root / CURRENT)
+    _fsync_dir(root)
+
+    for old in _versions(root)[: -(keep or snapshot_keep())]:
+        shutil.rmtree(root / old, ignore_errors=True)
+    log.info("Published vector snapshot %s (%s chunks)", name, manifest["count"])
+    return name
+
+
+def publish_from_store(store: FaissVectorStore, keep: Optional[int] = None) -> str:
+    root = snapshot_root(store.data_dir)
+    with publish_lock(root):
+        return publish(root, *store.live_rows(), keep=keep)
+
+
+def _map_array(path: Path, dtype: str, shape: tuple) -> Any:
+    expected = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    size = path.stat().st_size
+    if size != expected:
+        raise ValueError(f"{path}: {size} bytes, expected {expected}")
+    if expected == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+class Snapshot:
+    """One attached, immutable snapshot version."""
+
+    def __init__(self, directory: Path) -> None:
+        manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+        self.name = directory.name
+        self.version = int(manifest["version"])
+        self.count = int(manifest["count"])
+        self.dim = int(manifest["dim"])
+        self.created_at = manifest.get("created_at")
+        self.vectors = _map_array(directory / "vectors.f32", "<f4", (self.count, self.dim))
+        self.table = ChunkTable.open(directory / "chunks.tbl")
+        if len(self.table) != self.count:
+            raise ValueError(f"{directory}: {len(self.table)} chunks for {self.count} vectors")
+
+    def search(self, q: Any, k: int, where: Mapping[str, Any] | None = None) -> list[DocChunk]:
+        if self.count == 0 or k <= 0:
+            return []
+        sims = self.vectors @ q
+        if where:
+            # Exact filtering: the mask compares dictionary codes, no row is decoded.
+            sims = np.where(self.table.mask(where), sims, -np.inf)
+        k = min(k, self.count)
+        top = np.argpartition(-sims, k - 1)[:k] if k < self.count else np.arange(self.count)
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return [self.table.chunk(int(i)) for i in top if np.isfinite(sims[int(i)])]
+
+
+class _SnapshotIndex:
+    # `index.ntotal` parity with FaissVectorStore (readiness, metrics, seeding).
+    def __init__(self, store: "SnapshotVectorStore") -> None:
+        self._store = store
+
+    @property
+    def ntotal(self) -> int:
+        snap = self._store.snapshot()
+        return snap.count if snap is not None else 0
+
+
+class SnapshotVectorStore:
+    """`FaissVectorStore`-compatible store that searches the current shared snapshot."""
+
+    def __init__(self, dim: int = 384, data_dir: str | Path = "./data", poll_s: Optional[float] = None):
+        self.dim = dim
+        self.data_dir = Path(data_dir)
+        self.root = snapshot_root(self.data_dir)
+        self.poll_s = snapshot_poll_s() if poll_s is None else poll_s
+        self.index = _SnapshotIndex(self)
+        self._snap: Optional[Snapshot] = None
+        self._pointer_stat: Optional[tuple] = None
+        self._checked_at = 0.0
+        self._swap_lock = threading.Lock()
+        self.swaps = 0
+        self.refresh(force=True)
+        if self._snap is None:
+            self._publish_initial()
+
+    def _publish_initial(self) -> None:
+        # The first worker builds the snapshot from the persisted index; the
+        # others wait on the lock and attach to it.
+        with publish_lock(self.root):
+            if current_version(self.root) is None:
+                publish(self.root, *self._writer_rows())
+        self.refresh(force=True)
+
+    def _writer(self) -> FaissVectorStore:
+        # Throwaway writer over the persisted index; compacts inline in `_commit`.
+        return FaissVectorStore(dim=self.dim, data_dir=self.data_dir, auto_compact=False)
+
+    def _writer_rows(self) -> tuple:
+        return self._writer().live_rows()
+
+    def _commit(self, writer: FaissVectorStore) -> None:
+        # Caller holds the publish lock.
+        if writer.needs_compaction():
+            writer.compact(save=False)
+        writer.save()
+        publish(self.root, *writer.live_rows())
+
+    def snapshot(self) -> Optional[Snapshot]:
+        if time.monotonic() - self._checked_at >= self.poll_s:
+            self.refresh()
+        return self._snap
+
+    def refresh(self, force: bool = False) -> bool:
+        """Attach a newer published version if CURRENT changed; True when swapped."""
+        with self._swap_lock:
+            self._checked_at = time.monotonic()
+            try:
+                st = os.stat(self.root / CURRENT)
+            except FileNotFoundError:
+                return False
+            stat_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if not force and stat_key == self._pointer_stat:
+                return False
+            name = current_version(self.root)
+            if name is None or (self._snap is not None and self._snap.name == name):
+                self._pointer_stat = stat_key
+                return False
+            try:
+                snap = Snapshot(self.root / name)
+            except (OSError, ValueError) as exc:
+                # Pruned or half-visible version: keep serving the old one, retry next poll.
+                log.warning("Could not attach vector snapshot %s: %s", name, exc)
+                return False
+            self._snap = snap
+            self._pointer_stat = stat_key
+            self.swaps += 1
+            return True
+
+    def add_documents(self, chunks: Iterable[DocChunk]) -> int:
+        """Append to the persisted index and publish a new version.
+
+        Chunks whose id is already indexed are skipped, so workers seeding an
+        empty index at the same time don't add the seed documents twice.
+        """
+        new_chunks = list(chunks)
+        if not new_chunks:
+            return 0
+        with publish_lock(self.root):
+            writer = self._writer()
+            known = writer.live_ids()
+            fresh = [c for c in new_chunks if c.id not in known]
+            if fresh:
+                writer.add_documents(fresh, save=False)
+                self._commit(writer)
+        self.refresh(force=True)
+        return len(fresh)
+
+    def upsert_documents(self, chunks: Iterable[DocChunk], vectors: Any = None) -> int:
+        """Add or replace chunks by id and publish; returns rows replaced."""
+        new_chunks = list(chunks)
+        if not new_chunks:
+            return 0
+        with publish_lock(self.root):
+            writer = self._writer()
+            replaced = writer.upsert_documents(new_chunks, vectors=vectors, save=False)
+            self._commit(writer)
+        self.refresh(force=True)
+        return replaced
+
+    def delete_documents(self, ids: Iterable[str]) -> int:
+        """Delete chunks by id and publish; returns rows deleted."""
+        with publish_lock(self.root):
+            writer = self._writer()
+            deleted = writer.delete_documents(ids, save=False)
+            if deleted:
+                self._commit(writer)
+        self.refresh(force=True)
+        return deleted
+
+    def compact(self) -> int:
+        """Compact the persisted index. Published versions never hold tombstones."""
+        with publish_lock(self.root):
+            return self._writer().compact()
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snap
+        count = snap.count if snap is not None else 0
+        return {"rows": count, "live": count, "tombstones": 0, "tombstone_ratio": 0.0, "snapshot": self.status()}
+
+    @STAGE_SECONDS.labels("vector", "search").time()
+    def search(self, query: str, k: int = 5, where: Mapping[str, Any] | None = None) -> list[DocChunk]:
+        snap = self.snapshot()
+        if snap is None:
+            return []
+        q = _stable_hash_embedding(query, self.dim).astype(np.float32)
+        return snap.search(q, k, where)
+
+    def status(self) -> Dict[str, Any]:
+        snap = self._snap
+        return {
+            "version": snap.name if snap is not None else None,
+            "count": snap.count if snap is not None else 0,
+            "created_at": snap.created_at if snap is not None else None,
+            "swaps": self.swaps,
+            "poll_s": self.poll_s,
+        }
+
+
+def main() -> None:
+    from app.vector.store import _resolve_data_dir
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["publish", "status"])
+    parser.add_argument("--data-dir", default=None, help="Defaults to VECTOR_DATA_DIR.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    data_dir = _resolve_data_dir(args.data_dir)
+    root = snapshot_root(data_dir)
+    if args.command == "publish":
+        name = publish_from_store(FaissVectorStore(data_dir=data_dir))
+        print(f"published {root / name}")
+        return
+    name = current_version(root)
+    print(f"current: {name or '-'}")
+    for version in _versions(root):
+        manifest = json.loads((root / version / "manifest.json").read_text(encoding="utf-8"))
+        print(f"  {version}  chunks={manifest['count']}  dim={manifest['dim']}  created_at={manifest['created_at']}")
+
+
+if __name__ == "__main__":
+    main()
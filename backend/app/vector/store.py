@@ -1,27 +1,38 @@
 from __future__ import annotations
 
+import contextlib
 import json
+import logging
 import os
-from dataclasses import dataclass
+import threading
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Mapping, Union
 
-import numpy as np
+from app.lazy import lazy_import
+from app.observability.metrics import STAGE_SECONDS, Gauge
+from app.storage import datadir
+from app.vector.chunk_table import ChunkTable, DocChunk
 
-try:
-    import faiss  # type: ignore
+# NumPy and FAISS load when the first store is built (startup warm-up or the
+# first chat request), not when a worker imports the app.
+np = lazy_import("numpy")
+faiss = lazy_import("faiss")
 
-    _HAS_FAISS = True
-except Exception:  # pragma: no cover
-    faiss = None
-    _HAS_FAISS = False
+if TYPE_CHECKING:
+    from app.vector.snapshot import SnapshotVectorStore
 
+log = logging.getLogger("healthyfy")
 
-@dataclass
-class DocChunk:
-    id: str
-    text: str
-    meta: dict
+
+@lru_cache(maxsize=1)
+def _has_faiss() -> bool:
+    try:
+        faiss.IndexFlatIP
+    except Exception:  # pragma: no cover
+        return False
+    return True
 
 
 def _stable_hash_embedding(text: str, dim: int = 384) -> np.ndarray:
@@ -47,19 +58,92 @@ def _stable_hash_embedding(text: str, dim: int = 384) -> np.ndarray:
     return v
 
 
+def _write_npy(path: Path, array: np.ndarray) -> None:
+    with open(path, "wb") as fh:
+        np.save(fh, array)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def compact_ratio() -> float:
+    return float(os.getenv("VECTOR_COMPACT_RATIO", "0.2"))
+
+
+def _exclude_params(deleted: np.ndarray) -> tuple | None:
+    """(packed bitmap, FAISS SearchParameters) skipping tombstoned rows; None without tombstones."""
+    if not _has_faiss() or not deleted.any():
+        return None
+    bits = np.packbits(deleted, bitorder="little")
+    selector = faiss.IDSelectorNot(faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits)))
+    # The selector points into `bits`; the tuple keeps the array alive.
+    return bits, faiss.SearchParameters(sel=selector)
+
+
+class _IndexLock:
+    """Many concurrent searches, or one in-place index mutation.
+
+    FAISS indexes are not safe to `add` to while other threads search them
+    (the flat index reallocates its vector storage). A waiting mutation holds
+    off new searches so a steady search load can't starve it.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting = 0
+
+    @contextlib.contextmanager
+    def shared(self) -> Iterator[None]:
+        with self._cond:
+            while self._writing or self._waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._cond:
+            self._waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
 class FaissVectorStore:
-    def __init__(self, dim: int = 384, data_dir: str | Path = "./data"):
+    def __init__(self, dim: int = 384, data_dir: str | Path = "./data", auto_compact: bool = True):
         self.dim = dim
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        # Files are written per generation and made current by the manifest
+        # (see app.storage.datadir); generation 0 means nothing saved yet.
+        self.generation = 0
+        # Pre-manifest layout, loaded when there is no manifest and replaced by
+        # generation files on the next save. healthyfy.meta.json is the
+        # pre-columnar chunk metadata.
         self.index_path = self.data_dir / "healthyfy.faiss"
+        self.chunks_path = self.data_dir / "healthyfy.chunks"
         self.meta_path = self.data_dir / "healthyfy.meta.json"
+        self.tombstones_path = self.data_dir / "healthyfy.tombstones.npy"
 
         # Used when FAISS isn't available (e.g., Windows local dev).
         self._embeddings_path = self.data_dir / "healthyfy.embeddings.npy"
         self._embeddings: np.ndarray | None = None
 
-        if _HAS_FAISS:
+        if _has_faiss():
             self.index = faiss.IndexFlatIP(dim)
         else:
             # Keep API parity with FAISS's IndexFlatIP for startup checks (index.ntotal)
@@ -68,16 +152,84 @@ class FaissVectorStore:
                     self.ntotal = 0
 
             self.index = _DummyIndex()
-        self._chunks: list[DocChunk] = []
+        self._table = ChunkTable.empty()
+        self._deleted = np.zeros(0, dtype=bool)
+        # id -> live rows, built by the first upsert/delete.
+        self._rows_by_id: dict[str, list[int]] | None = None
+        # Writers (appends, deletes, compaction) are serialized. Deletes and
+        # compaction replace the table/index objects searches read; appends
+        # grow the FAISS index in place, so they also take the index lock
+        # exclusively against searches.
+        self._write_lock = threading.Lock()
+        self._index_lock = _IndexLock()
+        self.auto_compact = auto_compact
+        self._compaction: threading.Thread | None = None
+        self.compactions = 0
+
+        if datadir.read_manifest(self.data_dir) is not None:
+            self._load_generation()
+        else:
+            has_chunks = self.chunks_path.exists() or self.meta_path.exists()
+            if has_chunks and (self.index_path.exists() or (not _has_faiss())):
+                self._load()
+        self._publish_view()
 
-        if self.meta_path.exists() and (self.index_path.exists() or (not _HAS_FAISS)):
-            self._load()
+    def _load_generation(self) -> None:
+        attempts = 5
+        for attempt in range(attempts):
+            manifest = datadir.read_manifest(self.data_dir)
+            try:
+                datadir.verify_manifest(self.data_dir, manifest, checksums=datadir.verify_checksums())
+                self._open_generation(manifest)
+                return
+            except (OSError, RuntimeError, datadir.ManifestError):
+                # A concurrent save may have flipped the manifest and pruned the
+                # generation being opened (FAISS reports that as RuntimeError):
+                # retry on the new one.
+                if attempt == attempts - 1 or datadir.read_manifest(self.data_dir) == manifest:
+                    raise
+
+    def _open_generation(self, manifest: dict[str, Any]) -> None:
+        files = {kind: self.data_dir / entry["name"] for kind, entry in manifest["files"].items()}
+        table = ChunkTable.open(files["chunks"])
+        n = len(table)
+        embeddings = None
+        if _has_faiss() and "index" in files:
+            index = faiss.read_index(str(files["index"]))
+            ntotal = int(index.ntotal)
+        else:
+            # Saved by the other backend: the embeddings are deterministic, rebuild them.
+            embeddings = np.load(files["embeddings"]) if "embeddings" in files else self._embed_all(table)
+            ntotal = int(embeddings.shape[0])
+            if _has_faiss():
+                index = faiss.IndexFlatIP(self.dim)
+                index.add(embeddings)
+                embeddings = None
+            else:
+                index = self.index
+                index.ntotal = ntotal
+        deleted = np.zeros(n, dtype=bool)
+        if "tombstones" in files:
+            saved = np.load(files["tombstones"])
+            if len(saved) != n:
+                raise datadir.ManifestError(f"generation {manifest['generation']}: {len(saved)} tombstones for {n} chunks")
+            deleted[:] = saved
+        if not n == ntotal == int(manifest["rows"]):
+            raise datadir.ManifestError(
+                f"generation {manifest['generation']}: manifest has {manifest['rows']} rows, "
+                f"index {ntotal}, chunk table {n}"
+            )
+        self.index, self._embeddings, self._table, self._deleted = index, embeddings, table, deleted
+        self.generation = int(manifest["generation"])
 
     def _load(self) -> None:
-        meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
-        self._chunks = [DocChunk(**c) for c in meta.get("chunks", [])]
+        if self.chunks_path.exists():
+            self._table = ChunkTable.open(self.chunks_path)
+        else:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            self._table = ChunkTable.from_chunks(DocChunk(**c) for c in meta.get("chunks", []))
 
-        if _HAS_FAISS:
+        if _has_faiss():
             if self.index_path.exists():
                 self.index = faiss.read_index(str(self.index_path))
         else:
@@ -85,68 +237,375 @@ class FaissVectorStore:
             if self._embeddings_path.exists():
                 self._embeddings = np.load(self._embeddings_path)
             else:
-                if self._chunks:
-                    self._embeddings = np.stack(
-                        [_stable_hash_embedding(c.text, self.dim) for c in self._chunks]
-                    ).astype(np.float32)
-                else:
-                    self._embeddings = np.zeros((0, self.dim), dtype=np.float32)
+                self._embeddings = self._embed_all()
             self.index.ntotal = int(self._embeddings.shape[0])
 
+        n = len(self._table)
+        self._deleted = np.zeros(n, dtype=bool)
+        if self.tombstones_path.exists():
+            saved = np.load(self.tombstones_path)
+            self._deleted[: min(n, len(saved))] = saved[:n]
+
+    def _publish_view(self) -> None:
+        # Searches read this one tuple, so swapping in a compacted index and
+        # table together is atomic for them.
+        self._view = (self.index, self._embeddings, self._table, self._deleted, _exclude_params(self._deleted))
+
+    def _embed_all(self, table: ChunkTable | None = None) -> np.ndarray:
+        table = self._table if table is None else table
+        if not len(table):
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([_stable_hash_embedding(t, self.dim) for t in table.texts()]).astype(np.float32)
+
     def _save(self) -> None:
-        payload = {"chunks": [c.__dict__ for c in self._chunks]}
-        self.meta_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        """Write the next generation and flip the manifest to it (caller holds the write lock)."""
+        with datadir.datadir_lock(self.data_dir):
+            current = datadir.read_manifest(self.data_dir)
+            generation = max(self.generation, int(current["generation"]) if current else 0) + 1
 
-        if _HAS_FAISS:
-            faiss.write_index(self.index, str(self.index_path))
-        else:
-            # Cache embeddings for faster startup, but we can always regenerate.
-            if self._embeddings is None:
-                if self._chunks:
-                    self._embeddings = np.stack(
-                        [_stable_hash_embedding(c.text, self.dim) for c in self._chunks]
-                    ).astype(np.float32)
-                else:
-                    self._embeddings = np.zeros((0, self.dim), dtype=np.float32)
-            np.save(self._embeddings_path, self._embeddings)
+            def path(suffix: str) -> Path:
+                return self.data_dir / datadir.generation_file(generation, suffix)
 
-    def add_documents(self, chunks: Iterable[DocChunk]) -> int:
-        new_chunks = list(chunks)
-        if not new_chunks:
-            return 0
+            files = {"chunks": path("chunks")}
+            self._table.write(files["chunks"])
+            if self._deleted.any():
+                files["tombstones"] = path("tombstones.npy")
+                _write_npy(files["tombstones"], self._deleted)
+            if _has_faiss():
+                files["index"] = path("faiss")
+                faiss.write_index(self.index, str(files["index"]))
+                datadir.fsync_file(files["index"])
+            else:
+                # Cache embeddings for faster startup, but we can always regenerate.
+                if self._embeddings is None:
+                    self._embeddings = self._embed_all()
+                files["embeddings"] = path("embeddings.npy")
+                _write_npy(files["embeddings"], self._embeddings)
+            manifest = {
+                "format": datadir.FORMAT,
+                "generation": generation,
+                "created_at": datetime.utcnow().isoformat() + "Z",
+                "rows": len(self._table),
+                "dim": self.dim,
+                "files": {kind: datadir.describe(p) for kind, p in files.items()},
+            }
+            datadir.write_manifest(self.data_dir, manifest)
+            datadir.prune_generations(self.data_dir, manifest)
+            self.generation = generation
+
+    def chunk_table(self) -> ChunkTable:
+        """Every stored row, tombstoned ones included (row i is vector i)."""
+        return self._table
+
+    def vectors(self) -> np.ndarray:
+        """All stored embeddings, float32[ntotal, dim], in chunk order."""
+        if _has_faiss():
+            n = int(self.index.ntotal)
+            return self.index.reconstruct_n(0, n) if n else np.zeros((0, self.dim), dtype=np.float32)
+        if self._embeddings is None:
+            self._embeddings = self._embed_all()
+        return self._embeddings
+
+    def live_table(self) -> ChunkTable:
+        """Rows that are not tombstoned."""
+        _, _, table, deleted, _ = self._view
+        return table.take(np.flatnonzero(~deleted)) if deleted.any() else table
+
+    def live_rows(self) -> tuple[np.ndarray, ChunkTable]:
+        """(vectors, chunk table) of the rows that are not tombstoned, e.g. to publish a snapshot."""
+        with self._write_lock:
+            keep = np.flatnonzero(~self._deleted) if self._deleted.any() else None
+            vectors = self._gather(keep)
+            return vectors, (self._table if keep is None else self._table.take(keep))
+
+    def _gather(self, rows: np.ndarray | None) -> np.ndarray:
+        if rows is None:
+            return self.vectors()
+        if not len(rows):
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if _has_faiss():
+            return self.index.reconstruct_batch(rows.astype(np.int64))
+        return self.vectors()[rows]
+
+    def tombstones(self) -> int:
+        return int(self._deleted.sum())
+
+    def stats(self) -> dict[str, Any]:
+        total = int(self.index.ntotal)
+        deleted = self.tombstones()
+        return {
+            "generation": self.generation,
+            "rows": total,
+            "live": total - deleted,
+            "tombstones": deleted,
+            "tombstone_ratio": round(deleted / total, 4) if total else 0.0,
+            "compact_ratio": compact_ratio(),
+            "compacting": self._compaction is not None and self._compaction.is_alive(),
+            "compactions": self.compactions,
+        }
+
+    def save(self) -> None:
+        with self._write_lock:
+            self._save()
+
+    def reload(self) -> None:
+        """Swap in the generation on disk, e.g. after a bulk writer in this process saved it.
+
+        Searches keep the previous index and table until the new ones are
+        published; unsaved writes to this store are discarded.
+        """
+        with self._write_lock:
+            if datadir.read_manifest(self.data_dir) is None:
+                return
+            self._load_generation()
+            self._rows_by_id = None
+            self._publish_view()
 
-        vecs = np.stack([_stable_hash_embedding(c.text, self.dim) for c in new_chunks]).astype(np.float32)
-        if _HAS_FAISS:
-            self.index.add(vecs)
+    def _id_rows(self) -> dict[str, list[int]]:
+        # Caller holds the write lock.
+        if self._rows_by_id is None:
+            rows: dict[str, list[int]] = {}
+            deleted = self._deleted
+            for i, chunk_id in enumerate(self._table.ids()):
+                if not deleted[i]:
+                    rows.setdefault(chunk_id, []).append(i)
+            self._rows_by_id = rows
+        return self._rows_by_id
+
+    def live_ids(self) -> set[str]:
+        with self._write_lock:
+            return set(self._id_rows())
+
+    def _append(self, chunks: list[DocChunk], vectors: np.ndarray | None) -> None:
+        # Caller holds the write lock.
+        if vectors is None:
+            vecs = np.stack([_stable_hash_embedding(c.text, self.dim) for c in chunks]).astype(np.float32)
+        else:
+            vecs = np.ascontiguousarray(vectors, dtype=np.float32)
+            if vecs.shape != (len(chunks), self.dim):
+                raise ValueError(f"expected vectors of shape {(len(chunks), self.dim)}, got {vecs.shape}")
+        first = len(self._table)
+        if _has_faiss():
+            with self._index_lock.exclusive():
+                self.index.add(vecs)
         else:
             if self._embeddings is None:
                 self._embeddings = np.zeros((0, self.dim), dtype=np.float32)
             self._embeddings = np.vstack([self._embeddings, vecs])
             self.index.ntotal = int(self._embeddings.shape[0])
-        self._chunks.extend(new_chunks)
-        self._save()
+        # A new table object: searches holding the old one are unaffected.
+        self._table = self._table.extend(chunks)
+        self._deleted = np.concatenate([self._deleted, np.zeros(len(chunks), dtype=bool)])
+        if self._rows_by_id is not None:
+            for j, c in enumerate(chunks):
+                self._rows_by_id.setdefault(c.id, []).append(first + j)
+
+    def _mark_deleted(self, rows: list[int]) -> None:
+        # Caller holds the write lock. Copy-on-write, like the chunk table.
+        if rows:
+            deleted = self._deleted.copy()
+            deleted[rows] = True
+            self._deleted = deleted
+
+    def _tombstone(self, ids: Iterable[str]) -> int:
+        # Caller holds the write lock.
+        rows_by_id = self._id_rows()
+        rows = [row for chunk_id in ids for row in rows_by_id.pop(chunk_id, ())]
+        self._mark_deleted(rows)
+        return len(rows)
+
+    def add_documents(self, chunks: Iterable[DocChunk], vectors: np.ndarray | None = None, save: bool = True) -> int:
+        """Append chunks, embedding them unless `vectors` (float32[len, dim]) is given.
+
+        Bulk writers (ingestion) pass `save=False` and call `save()` at their
+        checkpoints instead of rewriting the index files for every batch.
+        """
+        new_chunks = list(chunks)
+        if not new_chunks:
+            return 0
+        with self._write_lock:
+            self._append(new_chunks, vectors)
+            self._publish_view()
+            if save:
+                self._save()
         return len(new_chunks)
 
-    def search(self, query: str, k: int = 5) -> list[DocChunk]:
-        if self.index.ntotal == 0:
+    def upsert_documents(self, chunks: Iterable[DocChunk], vectors: np.ndarray | None = None, save: bool = True) -> int:
+        """Add chunks, replacing any live rows with the same ids; returns rows replaced.
+
+        Replaced rows are tombstoned and skipped by searches right away; their
+        space is reclaimed by compaction. Searches wait while the new vectors
+        are added to the index.
+        """
+        new_chunks = list(chunks)
+        if not new_chunks:
+            return 0
+        with self._write_lock:
+            rows_by_id = self._id_rows()
+            first = len(self._table)
+            # Append first: if embedding, the shape check or the index add
+            # raises, the old rows are still live and nothing has changed.
+            self._append(new_chunks, vectors)
+            old_rows: list[int] = []
+            for chunk_id in dict.fromkeys(c.id for c in new_chunks):
+                rows = rows_by_id[chunk_id]
+                old_rows.extend(r for r in rows if r < first)
+                rows_by_id[chunk_id] = [r for r in rows if r >= first]
+            self._mark_deleted(old_rows)
+            replaced = len(old_rows)
+            self._publish_view()
+            if save:
+                self._save()
+        self._maybe_compact()
+        return replaced
+
+    def delete_documents(self, ids: Iterable[str], save: bool = True) -> int:
+        """Tombstone every live row whose id is in `ids`; returns rows deleted."""
+        with self._write_lock:
+            deleted = self._tombstone(dict.fromkeys(ids))
+            if deleted:
+                self._publish_view()
+                if save:
+                    self._save()
+        if deleted:
+            self._maybe_compact()
+        return deleted
+
+    def needs_compaction(self) -> bool:
+        ratio = compact_ratio()
+        total = int(self.index.ntotal)
+        return ratio > 0 and total > 0 and self.tombstones() / total >= ratio
+
+    def _maybe_compact(self) -> None:
+        if not self.auto_compact or not self.needs_compaction():
+            return
+        with self._write_lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            self._compaction = threading.Thread(target=self.compact, name="vector-compaction", daemon=True)
+            self._compaction.start()
+
+    def compact(self, save: bool = True) -> int:
+        """Rebuild the index and chunk table without tombstoned rows; returns rows dropped.
+
+        Writers wait for it; searches keep using the previous index and table
+        until the rebuilt ones are swapped in.
+        """
+        with self._write_lock:
+            deleted = self._deleted
+            dropped = int(deleted.sum())
+            if not dropped:
+                return 0
+            keep = np.flatnonzero(~deleted)
+            vectors = self._gather(keep)
+            table = self._table.take(keep)
+            if _has_faiss():
+                index = faiss.IndexFlatIP(self.dim)
+                if len(keep):
+                    index.add(vectors)
+                self.index = index
+            else:
+                self._embeddings = vectors
+                self.index.ntotal = int(vectors.shape[0])
+            self._table = table
+            self._deleted = np.zeros(len(keep), dtype=bool)
+            self._rows_by_id = None
+            self._publish_view()
+            if save:
+                self._save()
+            self.compactions += 1
+        log.info("Compacted vector index in %s: dropped %s tombstoned rows, %s remain", self.data_dir, dropped, len(keep))
+        return dropped
+
+    @STAGE_SECONDS.labels("vector", "search").time()
+    def search(self, query: str, k: int = 5, where: Mapping[str, Any] | None = None) -> list[DocChunk]:
+        """Top-k chunks for `query`, skipping deleted and replaced rows.
+
+        `where` filters on chunk metadata: each key must equal the given value,
+        or be one of them when a list/tuple/set is given.
+        """
+        index, embeddings, table, deleted, exclude = self._view
+        if index.ntotal == 0:
             return []
         q = _stable_hash_embedding(query, self.dim).astype(np.float32)
 
-        if _HAS_FAISS:
-            scores, idx = self.index.search(np.expand_dims(q, 0), k)
+        if _has_faiss():
+            # Over-fetch when filtering so post-filtering can still fill k slots.
+            fetch = k if not where else min(int(index.ntotal), max(k * 4, 16))
+            with self._index_lock.shared():
+                if exclude is None:
+                    scores, idx = index.search(np.expand_dims(q, 0), fetch)
+                else:
+                    scores, idx = index.search(np.expand_dims(q, 0), fetch, params=exclude[1])
+            matches = table.row_filter(where) if where else None
             result: list[DocChunk] = []
             for i in idx[0]:
-                if i < 0 or i >= len(self._chunks):
+                i = int(i)
+                if i < 0 or i >= len(table):
+                    continue
+                if matches is not None and not matches(i):
                     continue
-                result.append(self._chunks[i])
+                result.append(table.chunk(i))
+                if len(result) >= k:
+                    break
             return result
 
-        if self._embeddings is None:
-            self._embeddings = np.stack(
-                [_stable_hash_embedding(c.text, self.dim) for c in self._chunks]
-            ).astype(np.float32)
-            self.index.ntotal = int(self._embeddings.shape[0])
+        if embeddings is None:
+            embeddings = self._embeddings = self._embed_all()
+            self.index.ntotal = int(embeddings.shape[0])
 
-        sims = self._embeddings @ q
+        sims = embeddings @ q
+        n = min(sims.shape[0], len(deleted))
+        if deleted[:n].any():
+            sims[:n][deleted[:n]] = -np.inf
+        if where:
+            mask = table.mask(where)
+            sims = np.where(mask[: sims.shape[0]], sims, -np.inf)
         top_idx = np.argsort(-sims)[:k]
-        return [self._chunks[int(i)] for i in top_idx if 0 <= int(i) < len(self._chunks)]
+        return [
+            table.chunk(int(i))
+            for i in top_idx
+            if 0 <= int(i) < len(table) and np.isfinite(sims[int(i)])
+        ]
+
+
+VectorStore = Union[FaissVectorStore, "SnapshotVectorStore"]
+
+_shared_stores: dict[str, VectorStore] = {}
+_shared_lock = threading.Lock()
+
+
+def _resolve_data_dir(data_dir: str | Path | None) -> str:
+    return str(Path(data_dir or os.getenv("VECTOR_DATA_DIR", "./data")).resolve())
+
+
+def loaded_vector_store(data_dir: str | Path | None = None) -> VectorStore | None:
+    """The shared store if it has been loaded already; never loads (readiness checks)."""
+    return _shared_stores.get(_resolve_data_dir(data_dir))
+
+
+def vector_backend() -> str:
+    return "faiss" if _has_faiss() else "numpy"
+
+
+def get_vector_store(data_dir: str | Path | None = None) -> VectorStore:
+    """Process-wide store per data dir, so requests don't reload the index from disk.
+
+    With VECTOR_SNAPSHOTS=1 this is a `SnapshotVectorStore` over the shared
+    memory-mapped snapshot (see app.vector.snapshot) instead of a private copy.
+    """
+    resolved = _resolve_data_dir(data_dir)
+    store = _shared_stores.get(resolved)
+    if store is None:
+        with _shared_lock:
+            store = _shared_stores.get(resolved)
+            if store is None:
+                from app.vector.snapshot import SnapshotVectorStore, snapshots_enabled
+
+                store = (SnapshotVectorStore if snapshots_enabled() else FaissVectorStore)(data_dir=resolved)
+                _shared_stores[resolved] = store
+    return store
+
+
+VECTORS = Gauge("healthyfy_vector_index_vectors", "Vectors in each loaded index.", ("data_dir",))
+VECTORS.add_callback(lambda: {(path,): int(s.index.ntotal) for path, s in list(_shared_stores.items())})
@@ -0,0 +1,91 @@
+"""Offline `/api/chat` throughput benchmark.
+
+Run from backend/:  python -m bench.chat_offline --requests 5000
+
+Measures two numbers:
+  - orchestrator: `AgentOrchestrator.handle` called directly (reply rendering cost)
+  - http: full `POST /api/chat` through the ASGI stack (in-process, no sockets)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+MESSAGES = [
+    "Give me a strength workout",
+    "What should I eat for more protein?",
+    "I feel stressed, help me breathe",
+    "Journal prompt please",
+    "Tips for living with thyroid issues",
+    "Hello there",
+]
+CONTEXTS = [
+    {},
+    {"fitness_level": "intermediate", "diet_preference": "vegan"},
+    {"diet_preference": "balanced", "allergies": "peanuts"},
+]
+
+
+def _payloads(n: int) -> list[dict]:
+    return [
+        {"message": MESSAGES[i % len(MESSAGES)], "user_context": CONTEXTS[i % len(CONTEXTS)]}
+        for i in range(n)
+    ]
+
+
+async def bench_orchestrator(n: int) -> float:
+    from app.agents.orchestrator import AgentOrchestrator
+
+    orch = AgentOrchestrator()
+    payloads = _payloads(n)
+    start = time.perf_counter()
+    for p in payloads:
+        await orch.handle(p["message"], p["user_context"])
+    return n / (time.perf_counter() - start)
+
+
+async def bench_http(n: int, concurrency: int) -> float:
+    import httpx
+
+    from app.main import create_app
+
+    app = create_app()
+    payloads = _payloads(n)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue: asyncio.Queue[dict] = asyncio.Queue()
+        for p in payloads:
+            queue.put_nowait(p)
+
+        async def worker() -> None:
+            while not queue.empty():
+                p = queue.get_nowait()
+                resp = await client.post("/api/chat", json=p)
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return n / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    # Offline mode only; keep benchmark writes out of the real data dir.
+    os.environ.pop("LLM_API_KEY", None)
+    os.environ.setdefault("VECTOR_DATA_DIR", tempfile.mkdtemp(prefix="healthyfy-bench-"))
+
+    rps_orch = asyncio.run(bench_orchestrator(args.requests))
+    rps_http = asyncio.run(bench_http(args.requests, args.concurrency))
+    print(f"orchestrator: {rps_orch:,.0f} req/s")
+    print(f"http /api/chat: {rps_http:,.0f} req/s (concurrency={args.concurrency})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Chunk metadata benchmark: JSON + list of DocChunk vs. the columnar ChunkTable.
+
+Run from backend/:  python -m bench.chunk_table --chunks 200000
+
+Writes the same synthetic corpus both ways into a temporary directory, then
+for each representation reports:
+  - file size
+  - load time (`json.loads` + one `DocChunk(**c)` per row vs. `ChunkTable.open`)
+  - Python heap allocated by the load (tracemalloc; mapped file pages are not
+    heap and are shared through the page cache)
+  - time to filter every row on `{"topic": [...]}` (the chat retrieval filter)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+from app.vector.chunk_table import ChunkTable, DocChunk
+
+TOPICS = ["sleep", "stress", "movement", "nutrition", "habits", "hydration", "mindfulness", "recovery"]
+WHERE = {"topic": ["sleep", "stress"]}
+
+
+def _corpus(n: int) -> list[DocChunk]:
+    return [
+        DocChunk(
+            id=f"doc{i // 8}#c{i % 8}",
+            text=f"Chunk {i}: practical, non-medical guidance about {TOPICS[i % len(TOPICS)]} "
+            f"with a few sentences of body text to resemble a real retrieval chunk ({i * 7919 % 100003}).",
+            meta={"topic": TOPICS[i % len(TOPICS)], "source": f"guide-{i % 40}", "lang": "en"},
+        )
+        for i in range(n)
+    ]
+
+
+def _measure(fn: Callable[[], Any]) -> Tuple[Any, float, float]:
+    tracemalloc.start()
+    t = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed * 1000.0, current / 2**20
+
+
+def _meta_matches(meta: dict) -> bool:
+    return meta.get("topic") in WHERE["topic"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200000)
+    args = parser.parse_args()
+
+    corpus = _corpus(args.chunks)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp) / "healthyfy.meta.json"
+        table_path = Path(tmp) / "healthyfy.chunks"
+        json_path.write_text(json.dumps({"chunks": [c.__dict__ for c in corpus]}, ensure_ascii=False), encoding="utf-8")
+        ChunkTable.from_chunks(corpus).write(table_path)
+        del corpus
+
+        chunks, json_ms, json_mib = _measure(
+            lambda: [DocChunk(**c) for c in json.loads(json_path.read_text(encoding="utf-8"))["chunks"]]
+        )
+        t = time.perf_counter()
+        json_hits = sum(1 for c in chunks if _meta_matches(c.meta))
+        json_filter_ms = (time.perf_counter() - t) * 1000.0
+        del chunks
+
+        table, table_ms, table_mib = _measure(lambda: ChunkTable.open(table_path))
+        t = time.perf_counter()
+        table_hits = int(table.mask(WHERE).sum())
+        table_filter_ms = (time.perf_counter() - t) * 1000.0
+        assert json_hits == table_hits
+
+        print(f"chunks: {args.chunks}")
+        print(f"{'':12} {'file MiB':>9} {'load ms':>9} {'heap MiB':>9} {'filter ms':>10}")
+        for name, path, load_ms, heap, filter_ms in (
+            ("json+list", json_path, json_ms, json_mib, json_filter_ms),
+            ("ChunkTable", table_path, table_ms, table_mib, table_filter_ms),
+        ):
+            size = os.path.getsize(path) / 2**20
+            print(f"{name:12} {size:9.1f} {load_ms:9.1f} {heap:9.1f} {filter_ms:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
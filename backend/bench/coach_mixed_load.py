@@ -0,0 +1,159 @@
+"""Mixed-load benchmark: coach traffic vs. sync routes sharing the threadpool.
+
+Run from backend/:  python -m bench.coach_mixed_load --coach-concurrency 80
+
+Coach storage is slowed down artificially (--io-latency-ms) to model a busy
+disk. While coach clients hammer check-ins and state reads, probe clients call
+the sync `/api/fitness/plan` route and record its latency. The run is repeated
+against a sync-`def` copy of the coach routes ("legacy", the pre-async shape)
+and against the real async routes. For each, it reports the probe p50/p95 and
+the peak number of FastAPI/AnyIO default threadpool tokens in use (limit 40).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+# Module-level so FastAPI can resolve the postponed annotation on legacy_checkin.
+from app.api.coach import CheckinRequest
+
+
+def _install_slow_io(latency_s: float) -> None:
+    from app.storage.coach_store import CoachStore
+
+    load, save = CoachStore._load_all, CoachStore._save_all
+
+    def slow_load(self):
+        time.sleep(latency_s)
+        return load(self)
+
+    def slow_save(self, payload):
+        time.sleep(latency_s)
+        return save(self, payload)
+
+    CoachStore._load_all = slow_load
+    CoachStore._save_all = slow_save
+
+
+def _legacy_router():
+    """The coach routes as they were before: sync `def`, store I/O on the shared pool."""
+    from fastapi import APIRouter
+
+    from app.agents.goal_coach_agent import adapt_plan_from_checkin
+    from app.storage.coach_store import CoachStore
+
+    router = APIRouter()
+
+    @router.post("/legacy/coach/checkin")
+    def legacy_checkin(req: CheckinRequest):
+        store = CoachStore()
+        plan = store.get_plan(req.plan_id)
+        checkin = {"at": datetime.utcnow().isoformat() + "Z", "adherence": req.adherence, "metrics": req.metrics, "notes": req.notes}
+        updated = asyncio.run(
+            adapt_plan_from_checkin(
+                goal=plan.goal,
+                prior_plan_steps=plan.plan_steps,
+                prior_next_actions=plan.next_actions,
+                checkin=checkin,
+                llm=None,
+            )
+        )
+        store.update_plan(plan_id=req.plan_id, plan_steps=updated.plan_steps, next_actions=updated.next_actions, checkin=checkin)
+        return {"ok": True}
+
+    @router.get("/legacy/coach/state/{plan_id}")
+    def legacy_state(plan_id: str):
+        return {"plan": CoachStore().get_plan(plan_id)}
+
+    return router
+
+
+async def _run(mode: str, args: argparse.Namespace) -> dict[str, float]:
+    import anyio.to_thread
+    import httpx
+
+    from app.main import create_app
+
+    app = create_app()
+    app.include_router(_legacy_router(), prefix="/api")
+    prefix = "/api/legacy/coach" if mode == "legacy" else "/api/coach"
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        created = await client.post("/api/coach/goal", json={"goal": "walk more every day"})
+        plan_id = created.json()["plan_id"]
+
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        deadline = time.perf_counter() + args.seconds
+        probe_ms: list[float] = []
+        coach_done = 0
+        peak_tokens = 0.0
+
+        async def coach_client(i: int) -> None:
+            nonlocal coach_done
+            while time.perf_counter() < deadline:
+                if i % 2:
+                    resp = await client.post(f"{prefix}/checkin", json={"plan_id": plan_id, "adherence": 0.7, "metrics": {"steps": 5000}})
+                else:
+                    resp = await client.get(f"{prefix}/state/{plan_id}")
+                resp.raise_for_status()
+                coach_done += 1
+
+        async def probe_client() -> None:
+            while time.perf_counter() < deadline:
+                t = time.perf_counter()
+                resp = await client.post("/api/fitness/plan", json={"goal": "strength", "level": "beginner"})
+                resp.raise_for_status()
+                probe_ms.append((time.perf_counter() - t) * 1000.0)
+                await asyncio.sleep(0.01)
+
+        async def sampler() -> None:
+            nonlocal peak_tokens
+            while time.perf_counter() < deadline:
+                peak_tokens = max(peak_tokens, limiter.borrowed_tokens)
+                await asyncio.sleep(0.005)
+
+        await asyncio.gather(
+            *(coach_client(i) for i in range(args.coach_concurrency)),
+            *(probe_client() for _ in range(args.probes)),
+            sampler(),
+        )
+
+    probe_ms.sort()
+    return {
+        "coach_rps": coach_done / args.seconds,
+        "probe_p50_ms": statistics.median(probe_ms) if probe_ms else 0.0,
+        "probe_p95_ms": probe_ms[int(len(probe_ms) * 0.95) - 1] if probe_ms else 0.0,
+        "peak_threadpool_tokens": peak_tokens,
+        "threadpool_limit": limiter.total_tokens,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--coach-concurrency", type=int, default=80)
+    parser.add_argument("--probes", type=int, default=4)
+    parser.add_argument("--io-latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    os.environ.pop("LLM_API_KEY", None)
+    os.environ["COACH_DATA_DIR"] = tempfile.mkdtemp(prefix="healthyfy-bench-")
+    os.environ.setdefault("VECTOR_DATA_DIR", os.environ["COACH_DATA_DIR"])
+    _install_slow_io(args.io_latency_ms / 1000.0)
+
+    for mode in ("legacy", "async"):
+        r = asyncio.run(_run(mode, args))
+        print(
+            f"{mode:>6}: coach {r['coach_rps']:8.1f} req/s | sync probe p50 {r['probe_p50_ms']:7.1f} ms "
+            f"p95 {r['probe_p95_ms']:7.1f} ms | peak threadpool {r['peak_threadpool_tokens']:.0f}/{r['threadpool_limit']:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Connection-pool benchmark: sync get_db shape vs. the async engine.
+
+Run from backend/:  python -m bench.db_pool --concurrency 100 --requests 20
+
+Uses a temporary SQLite file as a local stand-in for MySQL (needs aiosqlite).
+Each "request" checks out a session and runs two small queries against
+`mood_entries`. `--query-latency-ms` makes every statement (and every
+pre-ping) call a `pause()` SQL function that sleeps in the driver's thread,
+modelling a network round-trip without blocking the event loop.
+
+Configurations:
+  - legacy-sync:    sync engine, default pool (5 + 10), pool_pre_ping, run on a
+                    40-thread pool like FastAPI's default threadpool
+  - async-preping:  async engine, default pool, pool_pre_ping
+  - async-tuned:    async engine with `pool_kwargs()` (DB_POOL_* env, recycle, no ping)
+
+For each it reports throughput, request p50/p95, peak checked-out connections
+and the number of pings issued.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import MoodEntry, User
+from app.db.session import Base, pool_kwargs
+
+
+class _Probe:
+    def __init__(self) -> None:
+        self.pings = 0
+        self.peak_checked_out = 0
+
+
+def _pause(ms: float) -> int:
+    time.sleep(ms / 1000.0)
+    return 0
+
+
+def _instrument(sync_engine, latency_ms: float, probe: _Probe) -> None:
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "connect")
+    def _connect(dbapi_connection, _record) -> None:
+        dbapi_connection.create_function("pause", 1, _pause)
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def _checkout(*_args: Any) -> None:
+        probe.peak_checked_out = max(probe.peak_checked_out, sync_engine.pool.checkedout())
+
+    dialect = sync_engine.dialect
+    dialect._dialect_specific_select_one = f"SELECT pause({latency_ms})"
+    ping = dialect.do_ping
+
+    def counted_ping(dbapi_connection) -> bool:
+        probe.pings += 1
+        return ping(dbapi_connection)
+
+    dialect.do_ping = counted_ping
+
+
+def _seed(path: str, users: int = 50, per_user: int = 40) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all(User(id=i, email=f"u{i}@example.com") for i in range(1, users + 1))
+        db.add_all(
+            MoodEntry(user_id=u, mood="ok", note="") for u in range(1, users + 1) for _ in range(per_user)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def _query(user_id: int, latency_ms: float):
+    rtt = func.pause(latency_ms) == 0
+    return (
+        select(func.count()).select_from(MoodEntry).where(MoodEntry.user_id == user_id, rtt),
+        select(MoodEntry.mood).where(MoodEntry.user_id == user_id, rtt).order_by(MoodEntry.id.desc()).limit(5),
+    )
+
+
+def _summary(name: str, latencies: List[float], elapsed: float, probe: _Probe) -> Dict[str, Any]:
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "config": name,
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p95_ms": round(q[94] * 1000, 2),
+        "peak_conns": probe.peak_checked_out,
+        "pings": probe.pings,
+    }
+
+
+async def _run_sync(path: str, concurrency: int, requests: int, latency_ms: float) -> Dict[str, Any]:
+    engine = create_engine(f"sqlite:///{path}", pool_pre_ping=True, pool_size=5, max_overflow=10)
+    probe = _Probe()
+    _instrument(engine, latency_ms, probe)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    pool = ThreadPoolExecutor(max_workers=40)
+    loop = asyncio.get_running_loop()
+    latencies: List[float] = []
+
+    def handle(user_id: int) -> None:
+        db = Session()
+        try:
+            count_q, recent_q = _query(user_id, latency_ms)
+            db.execute(count_q).scalar_one()
+            db.execute(recent_q).all()
+        finally:
+            db.close()
+
+    async def client(cid: int) -> None:
+        for r in range(requests):
+            t0 = time.perf_counter()
+            await loop.run_in_executor(pool, handle, (cid + r) % 50 + 1)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    pool.shutdown()
+    engine.dispose()
+    return _summary("legacy-sync", latencies, elapsed, probe)
+
+
+async def _run_async(
+    name: str, path: str, concurrency: int, requests: int, latency_ms: float, **engine_kwargs: Any
+) -> Dict[str, Any]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", **engine_kwargs)
+    probe = _Probe()
+    _instrument(engine.sync_engine, latency_ms, probe)
+    Session = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    latencies: List[float] = []
+
+    async def client(cid: int) -> None:
+        for r in range(requests):
+            t0 = time.perf_counter()
+            async with Session() as db:
+                count_q, recent_q = _query((cid + r) % 50 + 1, latency_ms)
+                (await db.execute(count_q)).scalar_one()
+                (await db.execute(recent_q)).all()
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    await engine.dispose()
+    return _summary(name, latencies, elapsed, probe)
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    latency_ms = args.query_latency_ms
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        _seed(path)
+        tuned = pool_kwargs(f"sqlite:///{path}")
+        results = [
+            await _run_sync(path, args.concurrency, args.requests, latency_ms),
+            await _run_async(
+                "async-preping", path, args.concurrency, args.requests, latency_ms,
+                pool_pre_ping=True, pool_size=5, max_overflow=10,
+            ),
+            await _run_async("async-tuned", path, args.concurrency, args.requests, latency_ms, **tuned),
+        ]
+
+    print(f"tuned pool: {tuned}")
+    print(f"{'config':<15} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'peak conns':>11} {'pings':>7}")
+    for r in results:
+        print(
+            f"{r['config']:<15} {r['req_per_s']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+            f"{r['peak_conns']:>11} {r['pings']:>7}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client.")
+    parser.add_argument("--query-latency-ms", type=float, default=2.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Forecast model throughput: fits per second per registry model.
+
+Run from backend/:  python -m bench.forecast_models --series 2000 --length 90
+
+Each model fits a (series x length) batch in one call (the vectorized path
+`auto` uses for backtests); `single` times one-series-per-call requests, which
+is what `/api/ml/forecast` does.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+
+def _synthetic(m: int, n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    weekly = np.array([0, 0, 0, 0, 0, 2500, 3000], dtype=np.float64)
+    trend = rng.normal(20, 10, size=(m, 1)) * t
+    return 6000 + trend + weekly[t % 7] + rng.normal(0, 300, size=(m, n))
+
+
+def main() -> None:
+    from app.ml.models import MODELS, forecast_with_model
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, default=2000)
+    parser.add_argument("--length", type=int, default=90)
+    parser.add_argument("--horizon", type=int, default=7)
+    parser.add_argument("--single", type=int, default=200, help="Series timed one call at a time.")
+    args = parser.parse_args()
+
+    Y = _synthetic(args.series, args.length)
+    print(f"batch of {args.series} series x {args.length} points, horizon {args.horizon}")
+    for key, model in MODELS.items():
+        start = time.perf_counter()
+        model.fit(Y, args.horizon)
+        elapsed = time.perf_counter() - start
+        print(f"  {key:>10} batch : {args.series / elapsed:12,.0f} fits/s")
+
+    rows = [list(r) for r in Y[: args.single]]
+    for key in (*MODELS.keys(), "auto"):
+        start = time.perf_counter()
+        for r in rows:
+            forecast_with_model(r, args.horizon, key)
+        elapsed = time.perf_counter() - start
+        print(f"  {key:>10} single: {len(rows) / elapsed:12,.0f} fits/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Worker boot import-time benchmark with a regression threshold.
+
+Run from backend/:  python -m bench.import_time --runs 5 --budget-ms 900
+
+Imports `app.main` in fresh interpreters under `python -X importtime` and
+parses the per-module `import time: self | cumulative | name` lines (stderr).
+Reports the median total for `app.main` and the heaviest top-level packages,
+and exits non-zero when:
+  - the median exceeds `--budget-ms`, or
+  - a dependency that should load lazily (`--deferred`, default numpy, faiss,
+    pymysql, httpx) is imported at boot.
+
+The budget is machine-dependent; set it from a run on the target hardware.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DEFERRED = ("numpy", "faiss", "pymysql", "httpx")
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure(target: str) -> Dict[str, Tuple[int, int]]:
+    """One cold import of `target`: {module: (self_us, cumulative_us)}."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {target} failed:\n{proc.stderr[-2000:]}")
+    modules: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            modules[m.group(4)] = (int(m.group(1)), int(m.group(2)))
+    if target not in modules:
+        raise SystemExit(f"no importtime line for {target} (already imported by site?)")
+    return modules
+
+
+def top_level(modules: Dict[str, Tuple[int, int]]) -> Dict[str, int]:
+    """Self time summed per top-level package, in microseconds."""
+    totals: Dict[str, int] = {}
+    for name, (self_us, _) in modules.items():
+        root = name.split(".", 1)[0]
+        totals[root] = totals.get(root, 0) + self_us
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=900.0, help="Fail if the median import exceeds this.")
+    parser.add_argument("--deferred", default=",".join(DEFERRED), help="Modules that must not load at import.")
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    totals_ms: List[float] = []
+    packages: Dict[str, List[int]] = {}
+    loaded: set[str] = set()
+    for _ in range(max(1, args.runs)):
+        modules = measure(args.target)
+        totals_ms.append(modules[args.target][1] / 1000.0)
+        for root, us in top_level(modules).items():
+            packages.setdefault(root, []).append(us)
+        loaded.update(modules)
+
+    median = statistics.median(totals_ms)
+    print(f"import {args.target}: median {median:.1f}ms  min {min(totals_ms):.1f}ms  max {max(totals_ms):.1f}ms  (runs={len(totals_ms)})")
+    print("heaviest packages (median self time):")
+    heaviest = sorted(((statistics.median(v) / 1000.0, k) for k, v in packages.items()), reverse=True)
+    for ms, root in heaviest[: args.top]:
+        print(f"  {root:<24} {ms:8.1f}ms")
+
+    failures: List[str] = []
+    eager = [name for name in (p.strip() for p in args.deferred.split(",")) if name and name in loaded]
+    if eager:
+        failures.append(f"imported at boot but should be lazy: {', '.join(eager)}")
+    if median > args.budget_ms:
+        failures.append(f"median {median:.1f}ms exceeds budget {args.budget_ms:.1f}ms")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    if failures:
+        raise SystemExit(1)
+    print(f"ok: within {args.budget_ms:.1f}ms budget, deferred modules not loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Local fake OpenAI-compatible LLM server for benchmarks.
+
+Run from backend/:  python -m bench.llm_stub --port 8099 --latency-ms 300 --error-rate 0.02
+then point the app at it:  LLM_BASE_URL=http://127.0.0.1:8099/v1 LLM_API_KEY=bench
+
+Serves `GET /v1/models` and `POST /v1/chat/completions`:
+  - waits `latency_ms` (+/- uniform `jitter_ms`) before the first byte
+  - fails a request with `error_status` (default 503) at `error_rate`
+  - answers Goal Coach prompts (they ask for `plan_steps`) with a JSON plan,
+    everything else with a short text reply
+  - with `"stream": true` in the request, sends SSE `chat.completion.chunk`
+    events; with `--stream-chunks N` it also trickles non-streaming bodies in
+    N pieces, `--chunk-ms` apart, to model token generation time
+
+`LLMStub.start()` runs the server on a background thread on a free loopback
+port (see bench.suite); the same object counts requests and injected errors.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+_PLAN = {
+    "title": "Benchmark plan",
+    "plan_steps": ["Walk 20 minutes after lunch", "Lights out by 23:00", "Drink a glass of water with each meal"],
+    "next_actions": ["Schedule three walks this week", "Set a bedtime reminder"],
+    "reasoning_summary": "Small, consistent steps.",
+}
+_REPLY = (
+    "Here is a simple next step: pick one small habit you can repeat daily this week, "
+    "track it, and review how it felt on Sunday. This is general wellness information, not medical advice."
+)
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 300.0
+    jitter_ms: float = 50.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    stream_chunks: int = 0
+    chunk_ms: float = 20.0
+    seed: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    errors: int = 0
+    streamed: int = 0
+    by_kind: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "errors": self.errors, "streamed": self.streamed, "by_kind": dict(self.by_kind)}
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    return "\n".join(str(m.get("content") or "") for m in body.get("messages") or [] if isinstance(m, dict))
+
+
+def _split(text: str, parts: int) -> List[str]:
+    step = max(1, -(-len(text) // max(1, parts)))
+    return [text[i : i + step] for i in range(0, len(text), step)]
+
+
+class LLMStub:
+    """ASGI app; also owns the uvicorn server thread when started with `start()`."""
+
+    def __init__(self, config: StubConfig | None = None):
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self._rng = random.Random(self.config.seed)
+        self._server: Any = None
+        self._thread: threading.Thread | None = None
+        self.base_url = ""
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        path = scope["path"].rstrip("/")
+        if scope["method"] == "GET" and path.endswith("/models"):
+            await self._json(send, 200, {"object": "list", "data": [{"id": "bench-stub", "object": "model"}]})
+        elif scope["method"] == "POST" and path.endswith("/chat/completions"):
+            await self._completion(receive, send)
+        else:
+            await self._json(send, 404, {"error": {"message": f"no route {path}"}})
+
+    async def _completion(self, receive, send) -> None:
+        raw = b""
+        while True:
+            message = await receive()
+            raw += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        body = json.loads(raw or b"{}")
+        prompt = _prompt_text(body)
+        kind = "plan" if "plan_steps" in prompt else "chat"
+        cfg, stats = self.config, self.stats
+        stats.requests += 1
+        stats.by_kind[kind] = stats.by_kind.get(kind, 0) + 1
+
+        delay = cfg.latency_ms + self._rng.uniform(-cfg.jitter_ms, cfg.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000.0)
+        if self._rng.random() < cfg.error_rate:
+            stats.errors += 1
+            await self._json(send, cfg.error_status, {"error": {"message": "injected failure", "type": "bench_stub"}})
+            return
+
+        content = json.dumps(_PLAN) if kind == "plan" else _REPLY
+        usage = {"prompt_tokens": max(1, len(prompt) // 4), "completion_tokens": max(1, len(content) // 4)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if body.get("stream"):
+            stats.streamed += 1
+            await self._sse(send, content, body.get("model") or "bench-stub")
+            return
+        payload = {
+            "id": f"chatcmpl-bench-{stats.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or "bench-stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+        if cfg.stream_chunks > 1:
+            stats.streamed += 1
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+            for piece in _split(json.dumps(payload), cfg.stream_chunks):
+                await send({"type": "http.response.body", "body": piece.encode(), "more_body": True})
+                await asyncio.sleep(cfg.chunk_ms / 1000.0)
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await self._json(send, 200, payload)
+
+    async def _sse(self, send, content: str, model: str) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        for piece in _split(content, max(1, self.config.stream_chunks or 8)):
+            event = {"object": "chat.completion.chunk", "model": model, "choices": [{"index": 0, "delta": {"content": piece}}]}
+            await send({"type": "http.response.body", "body": f"data: {json.dumps(event)}\n\n".encode(), "more_body": True})
+            await asyncio.sleep(self.config.chunk_ms / 1000.0)
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+    @staticmethod
+    async def _json(send, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode()
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": data})
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on a background thread; returns the `LLM_BASE_URL` to use."""
+        import uvicorn
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        self._server = uvicorn.Server(uvicorn.Config(self, log_level="warning", lifespan="on", access_log=False))
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [sock]}, name="llm-stub", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10.0
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("LLM stub did not start")
+            time.sleep(0.01)
+        self.base_url = f"http://{host}:{sock.getsockname()[1]}/v1"
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+        self._server = self._thread = None
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = StubConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="Stub time to first byte.")
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Share of stub calls that fail.")
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--stream-chunks", type=int, default=defaults.stream_chunks, help="Trickle bodies in N pieces.")
+    parser.add_argument("--chunk-ms", type=float, default=defaults.chunk_ms)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def stub_config(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        stream_chunks=args.stream_chunks,
+        chunk_ms=args.chunk_ms,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    stub = LLMStub(stub_config(args))
+    url = stub.start(args.host, args.port)
+    print(f"LLM stub on {url} ({stub.config.as_dict()}); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(5.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+        print(json.dumps(stub.stats.as_dict()))
+
+
+if __name__ == "__main__":
+    main()
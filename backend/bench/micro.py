@@ -0,0 +1,89 @@
+"""Micro-benchmarks for the per-request hot functions.
+
+Run from backend/:  python -m bench.micro --repeat 7
+
+  - embed:      `_stable_hash_embedding` (query embedding without a model)
+  - guardrails: `enforce_guardrails` on safe and red-flag messages
+  - domain:     `_detect_domain_rule_based` (chat routing)
+  - forecast:   `forecast_linear` on 30- and 365-point series
+
+Each function runs over a fixed input set; the loop count is calibrated to
+about `--target-ms` per repeat. Reports median and best ns per call over
+`--repeat` repeats (bench.suite stores the median in its baseline).
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+MESSAGES = [
+    "Give me a strength workout for three days a week",
+    "What should I eat for more protein? I am vegetarian.",
+    "I feel stressed at work, help me breathe",
+    "Can you give me a journal prompt?",
+    "Tips for living with thyroid issues",
+    "I have chest pain and my left arm is numb",
+    "How much ibuprofen should I take for my back?",
+    "Hello there",
+    "I can't sleep and I keep waking up at 3am, any routine ideas?",
+    "I want to stop eating so much sugar in the evening",
+]
+
+
+def _series(n: int) -> List[float]:
+    return [60.0 + 0.05 * i + (i * 7919 % 13) / 6.0 for i in range(n)]
+
+
+def cases() -> Dict[str, tuple[Callable[[Any], Any], Sequence[Any]]]:
+    from app.agents.orchestrator import _detect_domain_rule_based
+    from app.ml.forecast import forecast_linear
+    from app.rules.safety_guardrails import enforce_guardrails
+    from app.vector.store import _stable_hash_embedding
+
+    return {
+        "embed": (_stable_hash_embedding, MESSAGES),
+        "guardrails": (enforce_guardrails, MESSAGES),
+        "domain": (_detect_domain_rule_based, MESSAGES),
+        "forecast_30": (lambda s: forecast_linear(s, 7), [_series(30)]),
+        "forecast_365": (lambda s: forecast_linear(s, 30), [_series(365)]),
+    }
+
+
+def _time(fn: Callable[[Any], Any], inputs: Sequence[Any], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        for x in inputs:
+            fn(x)
+    return time.perf_counter() - start
+
+
+def measure(fn: Callable[[Any], Any], inputs: Sequence[Any], repeat: int, target_ms: float) -> Dict[str, float]:
+    _time(fn, inputs, 1)  # warm-up: lazy imports, caches
+    loops = 1
+    while (elapsed := _time(fn, inputs, loops)) < target_ms / 1000.0 / 4:
+        loops *= 4
+    loops = max(1, int(loops * target_ms / 1000.0 / max(elapsed, 1e-9)))
+    calls = loops * len(inputs)
+    per_call = [_time(fn, inputs, loops) / calls * 1e9 for _ in range(max(1, repeat))]
+    return {"ns_per_call": statistics.median(per_call), "best_ns_per_call": min(per_call), "calls": calls}
+
+
+def run(repeat: int = 7, target_ms: float = 50.0) -> Dict[str, Dict[str, float]]:
+    return {name: measure(fn, inputs, repeat, target_ms) for name, (fn, inputs) in cases().items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--target-ms", type=float, default=50.0, help="Approximate time per repeat.")
+    args = parser.parse_args()
+
+    print(f"{'':14} {'median ns':>11} {'best ns':>11} {'calls':>9}")
+    for name, r in run(args.repeat, args.target_ms).items():
+        print(f"{name:14} {r['ns_per_call']:11,.0f} {r['best_ns_per_call']:11,.0f} {r['calls']:9,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""API load test + micro-benchmarks, compared against a stored JSON baseline.
+
+Run from backend/:
+  python -m bench.suite                         # run, compare with bench/baseline.json
+  python -m bench.suite --save-baseline         # run and store the result as the baseline
+  python -m bench.suite --routes chat,coach_state --requests 500 --concurrency 32
+  python -m bench.suite --latency-ms 800 --error-rate 0.05 --stream-chunks 16
+  python -m bench.suite --offline --skip-micro  # no LLM (deterministic replies only)
+
+The app runs in-process (`httpx.ASGITransport`, startup/shutdown hooks
+included) on throwaway data dirs and a SQLite database. Unless --offline,
+its LLM client points at bench.llm_stub on a loopback port, with the stub's
+latency, jitter, error rate and streaming set from the command line.
+
+Setup creates --plans coach plans and bulk-loads --history check-ins for each
+(untimed). Then every selected route gets --warmup untimed requests and
+--requests timed ones from --concurrency closed-loop clients, one route at a
+time. Per route it records throughput, mean/p50/p95/p99/max latency, error
+share (non-2xx or transport error) and how many LLM stub calls it made. Then
+it runs bench.micro.
+
+Regressions, compared with the baseline (exit status 1 if any):
+  - p50 more than --tolerance slower, p95/p99 more than --tail-tolerance
+    (and at least --floor-ms in absolute terms)
+  - throughput more than --tolerance lower
+  - error share up by more than 1 percentage point
+  - a micro-benchmark more than --tolerance slower
+
+Results depend on the machine and on the load settings; a config that differs
+from the baseline's is reported next to the comparison. Store a baseline from
+a run on the target hardware first.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bench import micro
+from bench.llm_stub import LLMStub, add_stub_arguments, stub_config
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+MESSAGES = micro.MESSAGES
+GOALS = ["Walk 8k steps a day", "Sleep 7 hours on weeknights", "Cook dinner at home four times a week", "Meditate 10 minutes daily"]
+QUERIES = ["sleep routine", "stress breathing", "protein breakfast", "hydration tips", "beginner strength workout"]
+FORECAST_MODELS = ["linear", "holt", "theil_sen", "auto"]
+
+
+@dataclass
+class Route:
+    name: str
+    method: str
+    # (request index, setup context) -> (path, JSON body or None)
+    build: Callable[[int, Dict[str, Any]], Tuple[str, Optional[Any]]]
+
+
+def _plan(i: int, ctx: Dict[str, Any]) -> str:
+    return ctx["plans"][i % len(ctx["plans"])]
+
+
+def _checkin(i: int, plan_id: str) -> Dict[str, Any]:
+    return {
+        "plan_id": plan_id,
+        "adherence": round((i * 37 % 100) / 100.0, 2),
+        "metrics": {"minutes": 10 + i % 40, "water": 4 + i % 5},
+        "notes": "benchmark check-in",
+    }
+
+
+ROUTES = [
+    Route("chat", "POST", lambda i, ctx: ("/api/chat", {"message": MESSAGES[i % len(MESSAGES)], "user_context": {}})),
+    Route("wellness_retrieve", "POST", lambda i, ctx: ("/api/wellness/retrieve", {"query": QUERIES[i % len(QUERIES)], "k": 4})),
+    Route("coach_goal", "POST", lambda i, ctx: ("/api/coach/goal", {"user_id": f"bench{i % 50}", "goal": GOALS[i % len(GOALS)]})),
+    Route("coach_checkin", "POST", lambda i, ctx: ("/api/coach/checkin", _checkin(i, _plan(i, ctx)))),
+    Route(
+        "coach_checkins_bulk",
+        "POST",
+        lambda i, ctx: ("/api/coach/checkins/bulk", {"checkins": [_checkin(i * 20 + j, _plan(i + j, ctx)) for j in range(20)]}),
+    ),
+    Route("coach_state", "GET", lambda i, ctx: (f"/api/coach/state/{_plan(i, ctx)}", None)),
+    Route("coach_insights", "GET", lambda i, ctx: (f"/api/coach/{_plan(i, ctx)}/insights", None)),
+    Route("coach_forecast", "GET", lambda i, ctx: (f"/api/coach/{_plan(i, ctx)}/forecast?metric=minutes&horizon=7", None)),
+    Route(
+        "ml_forecast",
+        "POST",
+        lambda i, ctx: (
+            "/api/ml/forecast",
+            {"series": micro._series(30 + i % 60), "horizon": 7, "model": FORECAST_MODELS[i % len(FORECAST_MODELS)]},
+        ),
+    ),
+    Route("fitness_plan", "POST", lambda i, ctx: ("/api/fitness/plan", {"goal": GOALS[i % len(GOALS)], "level": "beginner"})),
+    Route("nutrition_plan", "POST", lambda i, ctx: ("/api/nutrition/plan", {"preference": "vegetarian", "allergies": "peanuts"})),
+    Route("mental_breathing", "POST", lambda i, ctx: ("/api/mental/breathing", {"minutes": 1 + i % 5})),
+    Route("mental_journal_prompt", "GET", lambda i, ctx: ("/api/mental/journal-prompt", None)),
+    Route("chronic_support", "POST", lambda i, ctx: ("/api/chronic/support", {"condition": "thyroid"})),
+]
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    # Nearest-rank on an ascending list.
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q / 100.0 * len(ordered)) - 1)]
+
+
+async def _drive(client, route: Route, ctx: Dict[str, Any], n: int, concurrency: int) -> Tuple[List[float], Dict[str, int], float]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = itertools.count()
+
+    async def worker() -> None:
+        while (i := next(counter)) < n:
+            path, body = route.build(i, ctx)
+            t = time.perf_counter()
+            try:
+                resp = await client.request(route.method, path, json=body)
+                status = str(resp.status_code)
+            except Exception as exc:
+                status = type(exc).__name__
+            latencies.append((time.perf_counter() - t) * 1000.0)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def _summary(latencies: List[float], statuses: Dict[str, int], elapsed: float, llm_calls: int) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": len(ordered),
+        "throughput_rps": len(ordered) / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50_ms": _percentile(ordered, 50),
+        "p95_ms": _percentile(ordered, 95),
+        "p99_ms": _percentile(ordered, 99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+        "error_rate": errors / len(ordered) if ordered else 0.0,
+        "statuses": statuses,
+        "llm_calls": llm_calls,
+    }
+
+
+async def _setup(client, ctx: Dict[str, Any], plans: int, history: int) -> None:
+    async def create(i: int) -> str:
+        resp = await client.post("/api/coach/goal", json={"user_id": f"bench{i}", "goal": GOALS[i % len(GOALS)]})
+        resp.raise_for_status()
+        return resp.json()["plan_id"]
+
+    ctx["plans"] = list(await asyncio.gather(*(create(i) for i in range(max(1, plans)))))
+    now = time.time()
+    checkins = [
+        {**_checkin(i, plan_id), "at": datetime.fromtimestamp(now - (history - i) * 86400, tz=timezone.utc).isoformat()}
+        for plan_id in ctx["plans"]
+        for i in range(history)
+    ]
+    if checkins:
+        resp = await client.post("/api/coach/checkins/bulk", json={"checkins": checkins})
+        resp.raise_for_status()
+
+
+async def run_load(args: argparse.Namespace, routes: List[Route], stub: Optional[LLMStub]) -> Dict[str, Dict[str, Any]]:
+    import httpx
+
+    from app.main import app
+
+    # Injected stub failures would log one warning per fallback; keep the table readable.
+    logging.getLogger("healthyfy").setLevel(logging.ERROR)
+    results: Dict[str, Dict[str, Any]] = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+            ctx: Dict[str, Any] = {}
+            await _setup(client, ctx, args.plans, args.history)
+            for route in routes:
+                await _drive(client, route, ctx, args.warmup, args.concurrency)
+                calls = stub.stats.requests if stub else 0
+                latencies, statuses, elapsed = await _drive(client, route, ctx, args.requests, args.concurrency)
+                llm_calls = (stub.stats.requests - calls) if stub else 0
+                results[route.name] = _summary(latencies, statuses, elapsed, llm_calls)
+                r = results[route.name]
+                print(
+                    f"{route.name:22} {r['throughput_rps']:9.1f} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} "
+                    f"{r['p99_ms']:9.2f} {r['error_rate']:7.1%} {llm_calls:6}",
+                    flush=True,
+                )
+    return results
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    found: List[str] = []
+    for key in sorted(set(baseline.get("config", {})) | set(current["config"])):
+        old, new = baseline.get("config", {}).get(key), current["config"].get(key)
+        if old != new and key != "routes":
+            print(f"note: config {key} differs from baseline ({old!r} -> {new!r})")
+
+    def slower(name: str, metric: str, old: float, new: float, tolerance: float, floor: float) -> None:
+        if new > old * (1.0 + tolerance) and new - old >= floor:
+            found.append(f"{name} {metric}: {old:,.2f} -> {new:,.2f} (+{(new / old - 1.0) if old else math.inf:.0%})")
+
+    for name, new in current["routes"].items():
+        old = baseline.get("routes", {}).get(name)
+        if old is None:
+            continue
+        slower(name, "p50_ms", old["p50_ms"], new["p50_ms"], args.tolerance, args.floor_ms)
+        for metric in ("p95_ms", "p99_ms"):
+            slower(name, metric, old[metric], new[metric], args.tail_tolerance, args.floor_ms)
+        if new["throughput_rps"] * (1.0 + args.tolerance) < old["throughput_rps"]:
+            found.append(f"{name} throughput_rps: {old['throughput_rps']:,.1f} -> {new['throughput_rps']:,.1f}")
+        if new["error_rate"] > old["error_rate"] + 0.01:
+            found.append(f"{name} error_rate: {old['error_rate']:.1%} -> {new['error_rate']:.1%}")
+    for name, new in current.get("micro", {}).items():
+        old = baseline.get("micro", {}).get(name)
+        if old is not None:
+            slower(f"micro {name}", "ns_per_call", old["ns_per_call"], new["ns_per_call"], args.tolerance, 0.0)
+    return found
+
+
+def _isolate(args: argparse.Namespace) -> Optional[LLMStub]:
+    """Throwaway data dirs and DB; LLM pointed at the stub (or unset with --offline)."""
+    data = tempfile.mkdtemp(prefix="healthyfy-bench-")
+    os.environ["VECTOR_DATA_DIR"] = data
+    os.environ["COACH_DATA_DIR"] = data
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(data) / 'bench.db'}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    if args.offline:
+        os.environ.pop("LLM_API_KEY", None)
+        return None
+    stub = LLMStub(stub_config(args))
+    os.environ["LLM_BASE_URL"] = stub.start()
+    os.environ["LLM_API_KEY"] = "bench"
+    os.environ["LLM_MODEL"] = "bench-stub"
+    return stub
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", default="", help=f"Comma-separated subset of: {', '.join(r.name for r in ROUTES)}")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per route.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--plans", type=int, default=20, help="Coach plans created during setup.")
+    parser.add_argument("--history", type=int, default=30, help="Check-ins bulk-loaded per plan during setup.")
+    parser.add_argument("--offline", action="store_true", help="No LLM; routes use their deterministic fallbacks.")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--micro-repeat", type=int, default=7)
+    add_stub_arguments(parser)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run to --baseline.")
+    parser.add_argument("--out", type=Path, help="Also write this run's results here.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown for p50, throughput and micro.")
+    parser.add_argument("--tail-tolerance", type=float, default=0.5, help="Allowed slowdown for p95/p99.")
+    parser.add_argument("--floor-ms", type=float, default=1.0, help="Ignore latency changes smaller than this.")
+    args = parser.parse_args()
+
+    selected = [n.strip() for n in args.routes.split(",") if n.strip()]
+    unknown = sorted(set(selected) - {r.name for r in ROUTES})
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(unknown)}")
+    routes = [r for r in ROUTES if not selected or r.name in selected]
+
+    stub = _isolate(args)
+    config = {
+        "routes": [r.name for r in routes],
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "plans": args.plans,
+        "history": args.history,
+        "llm": None if stub is None else stub.config.as_dict(),
+    }
+    print(f"{'route':22} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'llm':>6}")
+    try:
+        route_results = asyncio.run(run_load(args, routes, stub))
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    micro_results: Dict[str, Dict[str, float]] = {}
+    if not args.skip_micro:
+        micro_results = micro.run(args.micro_repeat)
+        print(f"\n{'micro':22} {'ns/call':>11}")
+        for name, r in micro_results.items():
+            print(f"{name:22} {r['ns_per_call']:11,.0f}")
+
+    current = {
+        "created_at": datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + "Z",
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": config,
+        "routes": route_results,
+        "micro": micro_results,
+        "llm_stub": None if stub is None else stub.stats.as_dict(),
+    }
+    if args.out:
+        args.out.write_text(json.dumps(current, indent=2), encoding="utf-8")
+
+    regressions: List[str] = []
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        print(f"\ncompared with {args.baseline} ({baseline.get('created_at')})")
+        regressions = compare(baseline, current, args)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if not regressions:
+            print("ok: no regressions")
+    elif not args.save_baseline:
+        print(f"\nno baseline at {args.baseline}; store one with --save-baseline")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Point the app at throwaway data dirs and SQLite before anything imports it."""
+from __future__ import annotations
+
+import os
+import tempfile
+
+import pytest
+
+_DATA = tempfile.mkdtemp(prefix="healthyfy-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DATA}/app.db")
+os.environ.setdefault("VECTOR_DATA_DIR", os.path.join(_DATA, "vector"))
+os.environ.setdefault("COACH_DATA_DIR", os.path.join(_DATA, "app"))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
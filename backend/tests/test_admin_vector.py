@@ -0,0 +1,39 @@
+"""Admin vector writes are refused while an ingestion holds the ingest lock."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from app.vector import ingest
+from app.vector.store import _resolve_data_dir
+
+HEADERS = {"X-Debug-Token": "t"}
+
+
+@pytest.fixture(autouse=True)
+def _debug_token(monkeypatch):
+    monkeypatch.setenv("DEBUG_TOKEN", "t")
+
+
+def test_writes_wait_for_no_ingestion(client):
+    chunk = {"id": "admin-test#0", "text": "a short walk after every meal", "meta": {"topic": "habits"}}
+    state_dir = Path(_resolve_data_dir(None)) / "ingest"
+    # What an ingestion (in this process or another one) holds while it runs.
+    with ingest._ingest_lock(state_dir):
+        assert client.post("/api/admin/vector/upsert", json={"chunks": [chunk]}, headers=HEADERS).status_code == 409
+        assert client.post("/api/admin/vector/delete", json={"ids": ["admin-test#0"]}, headers=HEADERS).status_code == 409
+        assert client.post("/api/admin/vector/compact", headers=HEADERS).status_code == 409
+
+    resp = client.post("/api/admin/vector/upsert", json={"chunks": [chunk]}, headers=HEADERS)
+    assert resp.status_code == 200, resp.text
+    resp = client.post("/api/admin/vector/delete", json={"ids": ["admin-test#0"]}, headers=HEADERS)
+    assert resp.json()["deleted"] == 1
+    assert client.post("/api/admin/vector/compact", headers=HEADERS).status_code == 200
+
+
+def test_an_ingestion_cannot_start_during_a_write(tmp_path):
+    with ingest.store_write_lock(tmp_path):
+        with pytest.raises(ingest.IngestBusyError):
+            with ingest._ingest_lock(tmp_path / "ingest"):
+                pass
@@ -0,0 +1,51 @@
+"""Coach check-ins: body limits of the bulk route and the reserved `adherence` metric."""
+from __future__ import annotations
+
+import json
+
+from app.api import coach
+from app.storage.timeseries_store import TimeSeriesStore
+
+BULK = "/api/coach/checkins/bulk"
+
+
+def _plan(client) -> str:
+    resp = client.post("/api/coach/goal", json={"user_id": "tests", "goal": "Walk more every day"})
+    assert resp.status_code == 200, resp.text
+    return resp.json()["plan_id"]
+
+
+def _adherence(plan_id: str) -> list[float]:
+    _, values = TimeSeriesStore().read(plan_id, "adherence")
+    return [float(v) for v in values]
+
+
+def test_metric_named_adherence_does_not_replace_it(client):
+    plan_id = _plan(client)
+    resp = client.post("/api/coach/checkin", json={"plan_id": plan_id, "adherence": 0.9, "metrics": {"adherence": 0.0}})
+    assert resp.status_code == 200, resp.text
+    items = [{"plan_id": plan_id, "adherence": 0.8, "metrics": {"adherence": 0.1, "steps": 4000}}]
+    assert client.post(BULK, json={"checkins": items}).status_code == 200
+    assert _adherence(plan_id) == [0.9, 0.8]
+
+
+def test_json_bulk_body_over_the_limit_is_refused(client, monkeypatch):
+    plan_id = _plan(client)
+    body = json.dumps({"checkins": [{"plan_id": plan_id, "adherence": 0.5}] * 50}).encode()
+    monkeypatch.setattr(coach, "BULK_MAX_JSON_BYTES", len(body) - 1)
+    assert client.post(BULK, content=body, headers={"content-type": "application/json"}).status_code == 413
+
+    def chunked():
+        yield body[: len(body) // 2]
+        yield body[len(body) // 2 :]
+
+    assert client.post(BULK, content=chunked(), headers={"content-type": "application/json"}).status_code == 413
+    monkeypatch.setattr(coach, "BULK_MAX_JSON_BYTES", len(body))
+    resp = client.post(BULK, content=body, headers={"content-type": "application/json"})
+    assert resp.status_code == 200, resp.text
+
+
+def test_ndjson_line_over_the_limit_is_refused(client, monkeypatch):
+    monkeypatch.setattr(coach, "BULK_MAX_LINE_BYTES", 64)
+    line = json.dumps({"plan_id": "x" * 100, "adherence": 0.5}).encode()
+    assert client.post(BULK, content=line + b"\n", headers={"content-type": "application/x-ndjson"}).status_code == 413
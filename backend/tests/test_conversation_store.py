@@ -0,0 +1,67 @@
+"""ConversationStore keys, ring-buffer eviction and summary folding."""
+from __future__ import annotations
+
+import asyncio
+
+from app.storage.conversation_store import ConversationStore
+
+
+def _store(**kwargs) -> ConversationStore:
+    defaults = {"max_sessions": 10, "max_turns": 3, "summary_token_cap": 1000}
+    return ConversationStore(**{**defaults, **kwargs})
+
+
+def test_keys_with_colons_do_not_collide():
+    store = _store()
+    store.append(ConversationStore.key("a:b", "c"), "user", "first user")
+    store.append(ConversationStore.key("a", "b:c"), "user", "second user")
+    assert len(store) == 2
+    assert store.context(ConversationStore.key("a:b", "c"), 1000)["turns"] == [{"role": "user", "text": "first user"}]
+    assert store.context(ConversationStore.key("a", "b:c"), 1000)["turns"] == [{"role": "user", "text": "second user"}]
+
+
+def test_ring_buffer_keeps_newest_turns_and_folds_overflow_into_summary():
+    store = _store()
+    key = ConversationStore.key("u", "s")
+    for i in range(5):
+        store.append(key, "user", f"Turn {i}. Extra detail here.")
+    ctx = store.context(key, 1000)
+    assert [t["text"] for t in ctx["turns"]] == [f"Turn {i}. Extra detail here." for i in (2, 3, 4)]
+    # Evicted turns survive as first-sentence gists, oldest first.
+    assert ctx["summary"] == "user: Turn 0. | user: Turn 1."
+
+
+def test_summary_is_folded_after_the_loop_turn():
+    async def run() -> tuple[str, str]:
+        store = _store(max_turns=1)
+        key = ConversationStore.key("u", "s")
+        store.append(key, "user", "hello there")
+        store.append(key, "assistant", "hi back")
+        before = store.context(key, 1000)["summary"]
+        await asyncio.sleep(0)
+        return before, store.context(key, 1000)["summary"]
+
+    before, after = asyncio.run(run())
+    assert before == ""
+    assert after == "user: hello there"
+
+
+def test_summary_drops_oldest_lines_past_the_token_cap():
+    store = _store(max_turns=1, summary_token_cap=8)
+    key = ConversationStore.key("u", "s")
+    for i in range(6):
+        store.append(key, "user", f"note {i}")
+    summary = store.context(key, 1000)["summary"]
+    assert summary.split(" | ")[-1] == "user: note 4"
+    assert "note 0" not in summary
+
+
+def test_least_recently_used_session_is_evicted():
+    store = _store(max_sessions=2)
+    a, b, c = (ConversationStore.key("u", s) for s in "abc")
+    store.append(a, "user", "x")
+    store.append(b, "user", "y")
+    store.context(a, 100)
+    store.append(c, "user", "z")
+    assert store.context(b, 100) is None
+    assert store.context(a, 100) is not None and store.context(c, 100) is not None
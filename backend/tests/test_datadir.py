@@ -0,0 +1,56 @@
+"""Backups copy both columns of a time series as aligned rows."""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+from app.storage.datadir import backup, restore
+from app.storage.timeseries_store import TimeSeriesStore
+
+
+def _sizes(root: Path) -> dict:
+    return {p.relative_to(root).as_posix(): p.stat().st_size for p in sorted(root.rglob("*.f8"))}
+
+
+def test_backup_cuts_a_torn_series_to_its_shared_rows(tmp_path):
+    app_dir, data_dir = tmp_path / "app", tmp_path / "vector"
+    store = TimeSeriesStore(str(app_dir))
+    for i in range(3):
+        store.append("plan", 1000.0 + i, 70.0 + i, "weight")
+    with open(app_dir / "timeseries" / "plan" / "weight.ts.f8", "ab") as fh:
+        fh.write(b"\x00" * 11)  # one extra row plus a partial value
+
+    info = backup(data_dir, app_dir=app_dir, name="torn")
+    assert {rel: entry["size"] for rel, entry in info["app_files"].items()} == {
+        "timeseries/plan/weight.ts.f8": 24,
+        "timeseries/plan/weight.val.f8": 24,
+    }
+
+    restore("torn", data_dir, app_dir=app_dir)
+    assert _sizes(app_dir) == {"timeseries/plan/weight.ts.f8": 24, "timeseries/plan/weight.val.f8": 24}
+    ts, values = store.read("plan", "weight")
+    assert list(ts) == [1000.0, 1001.0, 1002.0] and list(values) == [70.0, 71.0, 72.0]
+
+
+def test_backups_taken_during_appends_keep_columns_aligned(tmp_path):
+    app_dir, data_dir = tmp_path / "app", tmp_path / "vector"
+    store = TimeSeriesStore(str(app_dir))
+    store.append("plan", 0.0, 0.0, "steps")
+    stop = threading.Event()
+
+    def writer():
+        i = 1
+        while not stop.is_set():
+            store.append_rows("plan", [(float(i), {"steps": float(i)}), (float(i + 1), {"steps": float(i + 1)})])
+            i += 2
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        infos = [backup(data_dir, app_dir=app_dir, name=f"b{n}") for n in range(20)]
+    finally:
+        stop.set()
+        thread.join()
+    for info in infos:
+        files = info["app_files"]
+        assert files["timeseries/plan/steps.ts.f8"]["size"] == files["timeseries/plan/steps.val.f8"]["size"]
@@ -0,0 +1,32 @@
+"""/api/admin fails closed without DEBUG_TOKEN; /debug keeps its loopback fallback."""
+from __future__ import annotations
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.debug import require_admin_token, require_debug_access
+
+
+def _request(host: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "client": (host, 50000)})
+
+
+def test_admin_refuses_loopback_without_a_token(monkeypatch):
+    monkeypatch.delenv("DEBUG_TOKEN", raising=False)
+    with pytest.raises(HTTPException) as exc:
+        require_admin_token(_request("127.0.0.1"), None)
+    assert exc.value.status_code == 403
+    require_debug_access(_request("127.0.0.1"), None)  # /debug still answers loopback
+
+
+def test_admin_requires_the_configured_token(monkeypatch):
+    monkeypatch.setenv("DEBUG_TOKEN", "secret")
+    with pytest.raises(HTTPException):
+        require_admin_token(_request("127.0.0.1"), "wrong")
+    require_admin_token(_request("203.0.113.5"), "secret")
+
+
+def test_admin_route_without_a_token(client, monkeypatch):
+    monkeypatch.delenv("DEBUG_TOKEN", raising=False)
+    assert client.get("/api/admin/vector").status_code == 403
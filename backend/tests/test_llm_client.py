@@ -0,0 +1,27 @@
+"""The shared LLM connection pool is closed with the event loop it belongs to."""
+from __future__ import annotations
+
+import asyncio
+
+from app.llm import llm_client
+
+
+async def _client():
+    return llm_client.http_client()
+
+
+def test_pool_is_closed_when_its_loop_ends_and_replaced_on_the_next():
+    first = asyncio.run(_client())
+    assert first.is_closed
+    second = asyncio.run(_client())
+    assert second is not first and second.is_closed
+
+
+def test_same_loop_reuses_the_pool():
+    async def twice():
+        a, b = llm_client.http_client(), llm_client.http_client()
+        assert a is b and not a.is_closed
+        await llm_client.close_http_client()
+        return a
+
+    assert asyncio.run(twice()).is_closed
@@ -0,0 +1,92 @@
+"""/api/ml/forecast/batch: JSON, .npy and .npz bodies, and the inputs it refuses."""
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pytest
+
+from app.api import ml
+from app.ml.forecast import forecast_linear
+
+PATH = "/api/ml/forecast/batch"
+NPY = {"content-type": "application/x-npy"}
+NPZ = {"content-type": "application/x-npz"}
+
+
+def _npy(array) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, array)
+    return buf.getvalue()
+
+
+def _npz(**arrays) -> bytes:
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def _forecasts(resp):
+    assert resp.status_code == 200, resp.text
+    return np.array([r["forecast"] for r in resp.json()["results"]])
+
+
+def test_json_ragged_batch_matches_single_series(client):
+    series = [[1.0, 2.0, 3.0], [], [5.0], [2.0, None, 6.0, 8.0]]
+    got = _forecasts(client.post(PATH, json={"series": series, "horizon": 3}))
+    assert got == pytest.approx(np.array([forecast_linear(s, 3).forecast for s in series]))
+
+
+def test_json_batch_is_not_padded_to_the_longest_series(client, monkeypatch):
+    monkeypatch.setattr(ml, "BATCH_MAX_POINTS", 20)
+    series = [[float(i) for i in range(10)]] + [[]] * 5000
+    assert len(_forecasts(client.post(PATH, json={"series": series, "horizon": 2}))) == 5001
+    assert client.post(PATH, json={"series": [[1.0] * 21], "horizon": 2}).status_code == 422
+
+
+def test_npy_and_npz_bodies_agree(client):
+    padded = np.array([[1.0, 2.0, 3.0, np.nan], [2.0, 4.0, 6.0, 8.0]])
+    from_npy = _forecasts(client.post(f"{PATH}?horizon=2", content=_npy(padded), headers=NPY))
+    from_lengths = _forecasts(
+        client.post(f"{PATH}?horizon=2", content=_npz(values=padded, lengths=np.array([3, 4])), headers=NPZ)
+    )
+    flat = np.array([1.0, 2.0, 3.0, 2.0, 4.0, 6.0, 8.0])
+    from_offsets = _forecasts(
+        client.post(f"{PATH}?horizon=2", content=_npz(values=flat, offsets=np.array([0, 3, 7])), headers=NPZ)
+    )
+    assert from_npy == pytest.approx(from_lengths) and from_npy == pytest.approx(from_offsets)
+    assert from_npy[1] == pytest.approx([10.0, 12.0])
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        _npy(np.zeros((2, 3), dtype=[("a", "i4"), ("b", "f8")])),
+        _npy(np.array([[1 + 2j, 3 + 0j]])),
+        _npy(np.array([[True, False]])),
+        _npy(np.array([["1", "2"]])),
+    ],
+    ids=["structured", "complex", "bool", "string"],
+)
+def test_npy_non_numeric_dtypes_are_rejected(client, body):
+    assert client.post(PATH, content=body, headers=NPY).status_code == 422
+
+
+@pytest.mark.parametrize(
+    "arrays",
+    [
+        {"values": np.array([1 + 1j, 2 + 0j]), "offsets": np.array([0, 2])},
+        {"values": np.array([1.0, 2.0]), "offsets": np.zeros(2, dtype=[("a", "i4")])},
+        {"values": np.array([[1.0, 2.0]]), "lengths": np.array([1 + 0j])},
+    ],
+    ids=["complex-values", "structured-offsets", "complex-lengths"],
+)
+def test_npz_non_numeric_dtypes_are_rejected(client, arrays):
+    assert client.post(PATH, content=_npz(**arrays), headers=NPZ).status_code == 422
+
+
+def test_infinities_and_mismatched_containers_are_rejected(client):
+    bad = np.array([[1.0, np.inf, 3.0]])
+    assert client.post(PATH, content=_npy(bad), headers=NPY).status_code == 422
+    assert client.post(PATH, content=b'{"series": [[1, Infinity]]}', headers={"content-type": "application/json"}).status_code == 422
+    assert client.post(PATH, content=_npy(np.ones((1, 2))), headers=NPZ).status_code == 415
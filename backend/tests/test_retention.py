@@ -0,0 +1,179 @@
+"""Habit check-in storage: partition/retention planning, the DATE migration and upsert replay.
+
+Run from backend/:  python -m pytest -q
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db import queries
+from app.db.migrations import run_migrations
+from app.db.models import HabitCheckin
+from app.db.queries import upsert_checkins
+from app.db.retention import partition_init_ddl, plan_partitioned, purge_before
+from app.db.session import Base
+
+REORGANIZE = "ALTER TABLE habit_checkins REORGANIZE PARTITION pmax INTO ("
+
+
+# --- partition planning ----------------------------------------------------
+
+
+def test_partition_init_ddl_covers_first_month_to_ahead_plus_pmax():
+    pk, partition = partition_init_ddl(date(2025, 11, 17), date(2026, 1, 5), ahead=2)
+    assert pk == "ALTER TABLE habit_checkins DROP PRIMARY KEY, ADD PRIMARY KEY (id, day)"
+    assert partition.startswith("ALTER TABLE habit_checkins PARTITION BY RANGE COLUMNS(day) (")
+    assert [line.strip().rstrip(",") for line in partition.splitlines()[1:-1]] == [
+        "PARTITION p202511 VALUES LESS THAN ('2025-12-01')",
+        "PARTITION p202512 VALUES LESS THAN ('2026-01-01')",
+        "PARTITION p202601 VALUES LESS THAN ('2026-02-01')",
+        "PARTITION p202602 VALUES LESS THAN ('2026-03-01')",
+        "PARTITION p202603 VALUES LESS THAN ('2026-04-01')",
+        "PARTITION pmax VALUES LESS THAN (MAXVALUE)",
+    ]
+
+
+def test_plan_drops_a_month_only_once_it_ends_on_or_before_the_cutoff():
+    existing = ["p202501", "p202502", "p202603", "pmax"]
+    today = date(2026, 3, 15)
+    on_cutoff = plan_partitioned(existing, today, keep_days=(today - date(2025, 2, 1)).days, ahead=0)
+    assert on_cutoff.cutoff == date(2025, 2, 1)
+    assert on_cutoff.statements == ["ALTER TABLE habit_checkins DROP PARTITION p202501"]
+
+    day_before = plan_partitioned(existing, today, keep_days=(today - date(2025, 1, 31)).days, ahead=0)
+    assert day_before.cutoff == date(2025, 1, 31)
+    assert day_before.statements == []
+
+
+def test_plan_splits_pmax_up_to_the_months_ahead():
+    plan = plan_partitioned(["p202602", "p202603", "pmax"], date(2026, 3, 15), keep_days=3650, ahead=2)
+    assert len(plan.statements) == 1
+    stmt = plan.statements[0]
+    assert stmt.startswith(REORGANIZE)
+    assert "PARTITION p202604 VALUES LESS THAN ('2026-05-01')" in stmt
+    assert "PARTITION p202605 VALUES LESS THAN ('2026-06-01')" in stmt
+    assert "p202606" not in stmt
+    assert stmt.rstrip().endswith("PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+
+    covered = plan_partitioned(["p202603", "p202604", "p202605", "pmax"], date(2026, 3, 15), keep_days=3650, ahead=2)
+    assert covered.statements == []
+
+
+def test_plan_with_no_monthly_partitions_starts_at_the_current_month():
+    for existing in ([], ["pmax"]):
+        plan = plan_partitioned(existing, date(2026, 3, 15), keep_days=30, ahead=1)
+        assert len(plan.statements) == 1
+        stmt = plan.statements[0]
+        assert stmt.startswith(REORGANIZE)
+        assert "p202602" not in stmt
+        assert "PARTITION p202603 VALUES LESS THAN ('2026-04-01')" in stmt
+        assert "PARTITION p202604 VALUES LESS THAN ('2026-05-01')" in stmt
+
+
+# --- migration and purge on SQLite ---------------------------------------------------
+
+
+def _legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE habit_checkins ("
+                " id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, habit_id INTEGER NOT NULL,"
+                " date_ymd VARCHAR(10) NOT NULL, completed BOOLEAN NOT NULL, created_at DATETIME)"
+            )
+        )
+        conn.execute(text("CREATE INDEX ix_habit_checkins_user_habit_date ON habit_checkins (user_id, habit_id, date_ymd)"))
+        conn.execute(text("CREATE INDEX ix_habit_checkins_date_ymd ON habit_checkins (date_ymd)"))
+        conn.execute(
+            text("INSERT INTO habit_checkins (id, user_id, habit_id, date_ymd, completed) VALUES (:i, :u, :h, :d, :c)"),
+            [
+                {"i": 1, "u": 1, "h": 10, "d": "2026-01-01", "c": 1},
+                {"i": 2, "u": 1, "h": 10, "d": "2026-01-01", "c": 0},  # duplicate day, newer row
+                {"i": 3, "u": 1, "h": 10, "d": "2026-01-02", "c": 1},
+                {"i": 4, "u": 2, "h": 10, "d": "2026-01-01", "c": 1},
+                {"i": 5, "u": 1, "h": 10, "d": "2026-01-02", "c": 0},  # duplicate day, newer row
+                {"i": 6, "u": 1, "h": 11, "d": "2026-01-01", "c": 1},
+            ],
+        )
+    return engine
+
+
+def test_date_migration_keeps_newest_row_per_day_and_is_idempotent(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    assert run_migrations(engine) == [1]
+
+    with engine.connect() as conn:
+        columns = {c["name"] for c in inspect(conn).get_columns("habit_checkins")}
+        indexes = {ix["name"]: ix for ix in inspect(conn).get_indexes("habit_checkins")}
+        rows = conn.execute(text("SELECT id, user_id, habit_id, day, completed FROM habit_checkins ORDER BY id")).all()
+    assert "date_ymd" not in columns and "day" in columns
+    assert set(indexes) == {"ux_habit_checkins_user_habit_day"}
+    assert indexes["ux_habit_checkins_user_habit_day"]["unique"]
+    assert [tuple(r) for r in rows] == [
+        (2, 1, 10, "2026-01-01", 0),
+        (4, 2, 10, "2026-01-01", 1),
+        (5, 1, 10, "2026-01-02", 0),
+        (6, 1, 11, "2026-01-01", 1),
+    ]
+
+    assert run_migrations(engine) == []
+    engine.dispose()
+
+
+def test_purge_before_deletes_only_expired_rows_in_batches(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    run_migrations(engine)
+    assert purge_before(engine, date(2026, 1, 2), batch=1) == 3
+    with engine.connect() as conn:
+        assert [r[0] for r in conn.execute(text("SELECT id FROM habit_checkins"))] == [5]
+    assert purge_before(engine, date(2026, 1, 2), batch=1) == 0
+    engine.dispose()
+
+
+# --- upsert replay -----------------------------------------------------------------
+
+
+@pytest.mark.parametrize("native", [True, False], ids=["native", "portable"])
+def test_upsert_replay_leaves_one_row_per_day_with_the_latest_completed(tmp_path, monkeypatch, native):
+    if not native:
+        monkeypatch.setattr(queries, "NATIVE_UPSERT_DIALECTS", ())
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'upsert.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        created = datetime(2026, 1, 1, 8, 0)
+        batch = [
+            {"user_id": 1, "habit_id": 10, "day": date(2026, 1, 1), "completed": True, "created_at": created},
+            {"user_id": 1, "habit_id": 10, "day": date(2026, 1, 2), "completed": True, "created_at": created},
+            # Same key twice in one batch: the later row wins.
+            {"user_id": 1, "habit_id": 10, "day": date(2026, 1, 2), "completed": False, "created_at": created},
+        ]
+        async with Session() as db:
+            assert await upsert_checkins(db, batch) == 2
+            await db.commit()
+        async with Session() as db:
+            assert await upsert_checkins(db, batch) == 2
+            await db.commit()
+        replay = [dict(batch[0], completed=False, created_at=datetime(2026, 2, 1, 9, 0))]
+        async with Session() as db:
+            await upsert_checkins(db, replay)
+            await db.commit()
+        async with Session() as db:
+            count = (await db.execute(select(func.count()).select_from(HabitCheckin))).scalar_one()
+            rows = (await db.execute(select(HabitCheckin).order_by(HabitCheckin.day))).scalars().all()
+        await engine.dispose()
+        return count, [(r.day, r.completed, r.created_at) for r in rows]
+
+    count, rows = asyncio.run(scenario())
+    assert count == 2
+    assert rows == [
+        (date(2026, 1, 1), False, datetime(2026, 1, 1, 8, 0)),
+        (date(2026, 1, 2), False, datetime(2026, 1, 1, 8, 0)),
+    ]
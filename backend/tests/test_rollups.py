@@ -0,0 +1,47 @@
+"""Habit streak rollups: first check-ins create rows through insert-if-absent."""
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db import rollups
+from app.db.models import HabitStreak
+from app.db.rollups import _insert_missing_stmt, apply_checkins
+from app.db.session import Base
+
+
+def test_mysql_insert_if_absent_is_a_no_op_update():
+    sql = str(_insert_missing_stmt("mysql", 1, [10, 11]).compile(dialect=mysql.dialect()))
+    assert sql.startswith("INSERT INTO habit_streaks")
+    assert "ON DUPLICATE KEY UPDATE user_id = VALUES(user_id)" in sql
+
+
+@pytest.mark.parametrize("native", [True, False], ids=["native", "portable"])
+def test_first_and_repeated_checkins_share_one_rollup_row(tmp_path, monkeypatch, native):
+    if not native:
+        monkeypatch.setattr(rollups, "_insert_missing_stmt", lambda *args: None)
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'rollups.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        for day in (date(2026, 1, 1), date(2026, 1, 2), date(2026, 1, 2)):
+            async with Session() as db:
+                rows = [{"habit_id": 10, "day": day, "completed": True}, {"habit_id": 11, "day": day, "completed": True}]
+                rollups = await apply_checkins(db, 1, rows)
+                assert sorted(rollups) == [10, 11]
+                await db.commit()
+        async with Session() as db:
+            count = (await db.execute(select(func.count()).select_from(HabitStreak))).scalar_one()
+            r = (await db.execute(select(HabitStreak).where(HabitStreak.habit_id == 10))).scalar_one()
+        await engine.dispose()
+        return count, (r.current_streak, r.longest_streak, r.completed_days, r.last_completed)
+
+    count, streak = asyncio.run(scenario())
+    assert count == 2
+    assert streak == (2, 2, 2, date(2026, 1, 2))
@@ -0,0 +1,83 @@
+"""FaissVectorStore upsert/delete/compaction, including writes that fail halfway."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.vector.store import DocChunk, FaissVectorStore
+
+
+def _chunk(chunk_id: str, text: str) -> DocChunk:
+    return DocChunk(id=chunk_id, text=text, meta={"topic": "test"})
+
+
+def _ids(store: FaissVectorStore, query: str) -> list[str]:
+    return [c.id for c in store.search(query, k=10)]
+
+
+@pytest.fixture()
+def store(tmp_path):
+    s = FaissVectorStore(data_dir=tmp_path, auto_compact=False)
+    s.add_documents([_chunk("a", "walk after lunch"), _chunk("b", "drink water"), _chunk("c", "sleep by eleven")])
+    return s
+
+
+def test_upsert_replaces_rows_and_survives_reload(store, tmp_path):
+    assert store.upsert_documents([_chunk("a", "stretch every morning"), _chunk("d", "eat more greens")]) == 1
+    assert store.tombstones() == 1
+    found = store.search("stretch every morning", k=10)
+    assert [c.id for c in found].count("a") == 1
+    assert next(c.text for c in found if c.id == "a") == "stretch every morning"
+    assert store.upsert_documents([_chunk("a", "stretch twice a day")]) == 1
+
+    reloaded = FaissVectorStore(data_dir=tmp_path, auto_compact=False)
+    assert reloaded.live_ids() == {"a", "b", "c", "d"}
+    assert reloaded.tombstones() == 2
+
+
+def test_delete_tombstones_and_compaction_reclaims(store, tmp_path):
+    assert store.delete_documents(["b", "missing"]) == 1
+    assert "b" not in _ids(store, "drink water")
+    assert store.delete_documents(["b"]) == 0
+
+    assert store.compact() == 1
+    assert store.tombstones() == 0 and int(store.index.ntotal) == 2
+    assert set(_ids(store, "walk after lunch")) == {"a", "c"}
+    assert store.compact() == 0
+
+    reloaded = FaissVectorStore(data_dir=tmp_path, auto_compact=False)
+    assert reloaded.live_ids() == {"a", "c"} and int(reloaded.index.ntotal) == 2
+
+
+def test_upsert_with_bad_vectors_keeps_the_old_rows(store, tmp_path):
+    with pytest.raises(ValueError):
+        store.upsert_documents([_chunk("a", "replacement")], vectors=np.zeros((1, 3), dtype=np.float32))
+    assert store.tombstones() == 0
+    assert store.live_ids() == {"a", "b", "c"}
+    assert "a" in _ids(store, "walk after lunch")
+    store.save()
+    assert FaissVectorStore(data_dir=tmp_path, auto_compact=False).live_ids() == {"a", "b", "c"}
+
+
+class _FailingIndex:
+    def __init__(self, index):
+        self._index = index
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+    def add(self, vectors):
+        raise RuntimeError("index add failed")
+
+
+def test_upsert_when_the_index_add_fails_keeps_the_old_rows(store):
+    real = store.index
+    store.index = _FailingIndex(real)
+    try:
+        with pytest.raises(RuntimeError):
+            store.upsert_documents([_chunk("b", "replacement")])
+    finally:
+        store.index = real
+    assert store.tombstones() == 0 and int(store.index.ntotal) == 3
+    assert store.upsert_documents([_chunk("b", "drink more water")]) == 1
+    assert store.live_ids() == {"a", "b", "c"}